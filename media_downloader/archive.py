@@ -0,0 +1,118 @@
+"""Index of media already downloaded under an output root.
+
+Keyed by ``<extractor key>:<media id>`` (see
+:func:`~media_downloader.links.canonical_media_id`) and download kind, so a
+video fetched once under ``%(uploader)s - %(title)s`` is recognised when it is
+requested again — even when a retry used the ``%(id)s`` template —
+before any network transfer. Lookups are primary-key reads on a SQLite table,
+independent of how many entries the archive holds.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from media_downloader.cache import open_state_database
+
+logger = logging.getLogger("MediaDownloader.archive")
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    media_id: str
+    kind: str
+    path: str
+    size_bytes: int
+    digest: str | None
+
+
+class DownloadArchive:
+    """Persistent ``(media id, kind) -> (path, size, digest)`` index.
+
+    Entries whose file has disappeared or changed size are dropped on lookup, so
+    deleting a download is enough to fetch it again.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+
+    def _open(self) -> sqlite3.Connection:
+        connection = open_state_database(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS archive (media_id TEXT NOT NULL,"
+            " kind TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL,"
+            " digest TEXT, recorded REAL NOT NULL, PRIMARY KEY (media_id, kind))"
+            " WITHOUT ROWID"
+        )
+        return connection
+
+    def lookup(self, media_id: str, kind: str) -> ArchiveEntry | None:
+        """The archived download of ``media_id``, if its file is still intact."""
+        if not self.path.exists():
+            return None
+        try:
+            with closing(self._open()) as connection:
+                row = connection.execute(
+                    "SELECT path, size, digest FROM archive"
+                    " WHERE media_id = ? AND kind = ?",
+                    (media_id, kind),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("Archive unavailable: error_type=%s", type(e).__name__)
+            return None
+        if row is None:
+            return None
+        entry = ArchiveEntry(media_id, kind, row[0], row[1], row[2])
+        try:
+            intact = os.path.getsize(entry.path) == entry.size_bytes
+        except OSError:
+            intact = False
+        if not intact:
+            self.forget(media_id, kind)
+            return None
+        return entry
+
+    def record(
+        self,
+        media_ids: list[str],
+        kind: str,
+        path: str,
+        *,
+        digest: str | None = None,
+    ) -> None:
+        """Archive ``path`` under every ID it is known by."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        now = time.time()
+        rows = [
+            (media_id, kind, path, size, digest, now)
+            for media_id in dict.fromkeys(media_ids)
+            if media_id
+        ]
+        if not rows:
+            return
+        try:
+            with closing(self._open()) as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            logger.debug("Archive unavailable: error_type=%s", type(e).__name__)
+
+    def forget(self, media_id: str, kind: str) -> None:
+        try:
+            with closing(self._open()) as connection:
+                connection.execute(
+                    "DELETE FROM archive WHERE media_id = ? AND kind = ?",
+                    (media_id, kind),
+                )
+        except sqlite3.Error as e:
+            logger.debug("Archive unavailable: error_type=%s", type(e).__name__)
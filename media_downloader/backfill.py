@@ -0,0 +1,407 @@
+"""Bulk ingestion of media already downloaded under the output root.
+
+``media-downloader-backfill`` walks the output root (or a directory beneath it)
+for audio and video that predates native ingestion, hashes the files on a
+thread pool and feeds them to the knowledge graph through the batched ingest
+queue. Metadata comes from yt-dlp ``.info.json`` sidecars where present, so no
+network access is needed. Progress is checkpointed in
+``<output root>/.media-downloader/backfill.sqlite3``: a rerun skips every file
+already ingested unless it has changed size or modification time since.
+
+The checkpoint also keeps each file's SHA-256 and, for files of at least
+``MEDIA_DOWNLOADER_TREE_DIGEST_MIN_MB`` (default 256), its ``sha256-tree1``
+digest, computed in the same read and recorded on the asset as well.
+``--verify`` re-hashes checkpointed files against them; large files are
+checked by tree digest, on several threads each.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import mimetypes
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from media_downloader.cache import STATE_DIRECTORY, open_state_database, state_directory
+from media_downloader.digest import (
+    file_and_tree_digest,
+    file_digest,
+    tree_chunk_size,
+    tree_digest,
+)
+from media_downloader.kg_media import (
+    IngestBatcher,
+    IngestQueue,
+    media_store_available,
+    trim_info,
+)
+from media_downloader.security import (
+    MediaSecurityError,
+    contained_output_path,
+    public_source_url,
+    resolve_output_directory,
+)
+
+logger = logging.getLogger("MediaDownloader.backfill")
+
+# Sidecars larger than this are not metadata worth parsing.
+_MAX_SIDECAR_BYTES = 16 * 1024 * 1024
+# Checkpoint rows written per transaction.
+_CHECKPOINT_BATCH = 256
+
+
+def _tree_digest_min_bytes() -> int:
+    try:
+        megabytes = float(os.environ.get("MEDIA_DOWNLOADER_TREE_DIGEST_MIN_MB", 256))
+    except ValueError:
+        megabytes = 256.0
+    return int(megabytes * 1024 * 1024)
+
+
+def _file_digests(path: str, size: int) -> tuple[tuple[str, int], str | None]:
+    """``((sha256, size), tree)``; ``tree`` only for files worth a tree digest."""
+    if size >= _tree_digest_min_bytes():
+        return file_and_tree_digest(path)
+    return file_digest(path), None
+
+
+def iter_media_files(directory: Path, root: Path) -> Iterator[Path]:
+    """Audio and video files under ``directory``, in a stable order.
+
+    Symbolic links are not followed into directories, and files resolving
+    outside ``root`` are skipped.
+    """
+    for current, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if d != STATE_DIRECTORY)
+        for name in sorted(filenames):
+            mime = mimetypes.guess_type(name)[0] or ""
+            if not mime.startswith(("audio/", "video/")):
+                continue
+            try:
+                path = contained_output_path(os.path.join(current, name), root)
+            except MediaSecurityError:
+                logger.warning("Backfill skipped a file outside the output root")
+                continue
+            if path.is_file():
+                yield path
+
+
+def sidecar_info(path: Path) -> dict[str, Any] | None:
+    """Trimmed info from the yt-dlp ``.info.json`` written beside ``path``."""
+    for sidecar in (path.with_suffix(".info.json"), Path(f"{path}.info.json")):
+        try:
+            if sidecar.is_symlink() or sidecar.stat().st_size > _MAX_SIDECAR_BYTES:
+                continue
+            with open(sidecar, encoding="utf-8") as fh:
+                info = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if isinstance(info, dict):
+            return trim_info(info)
+    return None
+
+
+class BackfillCheckpoint:
+    """Files already ingested, with the size, mtime and digests they had then.
+
+    Holds one connection for the whole walk; lookups are primary-key reads and
+    new rows are written in batches of ``_CHECKPOINT_BATCH``.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self._connection: sqlite3.Connection | None = None
+        self._pending: list[tuple] = []
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = open_state_database(self.path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS done (path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, asset_id TEXT,"
+                " sha256 TEXT, tree_digest TEXT) WITHOUT ROWID"
+            )
+            columns = {
+                row[1] for row in self._connection.execute("PRAGMA table_info(done)")
+            }
+            for column in ("sha256", "tree_digest"):
+                if column not in columns:  # checkpoint from an older release
+                    self._connection.execute(
+                        f"ALTER TABLE done ADD COLUMN {column} TEXT"
+                    )
+        return self._connection
+
+    def done(self, path: Path, stat: os.stat_result) -> bool:
+        try:
+            row = (
+                self._open()
+                .execute("SELECT size, mtime_ns FROM done WHERE path = ?", (str(path),))
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.debug("Checkpoint unavailable: error_type=%s", type(e).__name__)
+            return False
+        return row == (stat.st_size, stat.st_mtime_ns)
+
+    def record(
+        self,
+        path: Path,
+        stat: os.stat_result,
+        asset_id: str,
+        sha256: str | None = None,
+        tree: str | None = None,
+    ) -> None:
+        self._pending.append(
+            (str(path), stat.st_size, stat.st_mtime_ns, asset_id, sha256, tree)
+        )
+        if len(self._pending) >= _CHECKPOINT_BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            connection = self._open()
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR REPLACE INTO done VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning("Checkpoint unavailable: error_type=%s", type(e).__name__)
+
+    def entries(self) -> list[tuple[Path, int, int, str | None, str | None]]:
+        """``(path, size, mtime_ns, sha256, tree_digest)`` of every ingested file."""
+        try:
+            return [
+                (Path(row[0]), *row[1:])
+                for row in self._open().execute(
+                    "SELECT path, size, mtime_ns, sha256, tree_digest FROM done"
+                )
+            ]
+        except sqlite3.Error as e:
+            logger.warning("Checkpoint unavailable: error_type=%s", type(e).__name__)
+            return []
+
+    def close(self) -> None:
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def backfill(
+    directory: Path,
+    root: Path,
+    *,
+    workers: int | None = None,
+    batch_items: int | None = None,
+    media_store: Any | None = None,
+    report_every: float = 10.0,
+) -> dict[str, Any]:
+    """Ingest every media file under ``directory`` not yet checkpointed.
+
+    Returns ``{files, bytes, skipped, failed, seconds, files_per_second,
+    mb_per_second}``; nothing is ingested when no engine is reachable.
+    """
+    stats: dict[str, Any] = {"files": 0, "bytes": 0, "skipped": 0, "failed": 0}
+    started = time.monotonic()
+    if media_store is None and not media_store_available():
+        logger.warning("Backfill: no reachable knowledge-graph engine")
+        return _rates(stats, started)
+    workers = workers or min(8, os.cpu_count() or 1)
+    checkpoint = BackfillCheckpoint(state_directory(root) / "backfill.sqlite3")
+    queue = IngestQueue(
+        IngestBatcher(media_store, max_items=batch_items), workers=workers
+    )
+    window = workers * queue.batcher.max_items * 2
+    hashing: deque = deque()
+    ingesting: deque = deque()
+    last_report = started
+
+    def _collect(path, stat, future, digest, tree):
+        if future.result() is None:
+            stats["failed"] += 1
+            return
+        checkpoint.record(path, stat, future.result()["asset_id"], digest[0], tree)
+        stats["files"] += 1
+        stats["bytes"] += stat.st_size
+
+    def _submit(path, stat, digest_future):
+        try:
+            digest, tree = digest_future.result()
+        except OSError:
+            stats["failed"] += 1
+            return
+        # Without a sidecar the file name is the best title there is.
+        info = sidecar_info(path) or {"title": path.stem}
+        if tree is not None:
+            info["tree_digest"] = tree
+        future = queue.submit(
+            str(path),
+            info=info,
+            source_url=public_source_url(str(info.get("webpage_url") or "")),
+            source="media-downloader-backfill",
+            digest=digest,
+        )
+        ingesting.append((path, stat, future, digest, tree))
+        while len(ingesting) > window:
+            _collect(*ingesting.popleft())
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="backfill-hash") as pool:
+        try:
+            for path in iter_media_files(directory, root):
+                try:
+                    stat = path.stat()
+                except OSError:  # removed or unreadable since the walk saw it
+                    stats["failed"] += 1
+                    continue
+                if checkpoint.done(path, stat):
+                    stats["skipped"] += 1
+                    continue
+                hashing.append(
+                    (path, stat, pool.submit(_file_digests, str(path), stat.st_size))
+                )
+                while len(hashing) > workers * 2:
+                    _submit(*hashing.popleft())
+                if time.monotonic() - last_report >= report_every:
+                    last_report = time.monotonic()
+                    _log_progress(_rates(dict(stats), started))
+            while hashing:
+                _submit(*hashing.popleft())
+            queue.flush()
+            while ingesting:
+                _collect(*ingesting.popleft())
+        finally:
+            checkpoint.close()
+            queue.close()
+    return _rates(stats, started)
+
+
+def verify(root: Path, *, workers: int | None = None) -> dict[str, Any]:
+    """Re-hash every checkpointed file against the digests recorded for it.
+
+    Returns ``{verified, mismatched, changed, missing, unrecorded,
+    mismatched_paths}``. Files modified since they were ingested count as
+    ``changed`` (the next backfill re-ingests them) and are not hashed; rows
+    from before digests were recorded count as ``unrecorded``.
+    """
+    stats: dict[str, Any] = dict.fromkeys(
+        ("verified", "mismatched", "changed", "missing", "unrecorded"), 0
+    )
+    stats["mismatched_paths"] = []
+    path = state_directory(root) / "backfill.sqlite3"
+    if not path.exists():
+        return stats
+    checkpoint = BackfillCheckpoint(path)
+    try:
+        entries = checkpoint.entries()
+    finally:
+        checkpoint.close()
+
+    def _check(entry) -> str:
+        file_path, size, mtime_ns, sha256, tree = entry
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return "missing"
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return "changed"
+        chunk_size = tree_chunk_size(tree) if tree else None
+        try:
+            if chunk_size is not None:
+                ok = tree_digest(str(file_path), chunk_size=chunk_size) == tree
+            elif sha256:
+                ok = file_digest(str(file_path))[0] == sha256
+            else:
+                return "unrecorded"
+        except OSError:
+            return "missing"
+        return "verified" if ok else "mismatched"
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(workers, thread_name_prefix="backfill-verify") as pool:
+        for entry, outcome in zip(entries, pool.map(_check, entries), strict=True):
+            stats[outcome] += 1
+            if outcome == "mismatched":
+                stats["mismatched_paths"].append(str(entry[0].relative_to(root)))
+    return stats
+
+
+def _rates(stats: dict[str, Any], started: float) -> dict[str, Any]:
+    seconds = max(time.monotonic() - started, 1e-9)
+    stats["seconds"] = round(seconds, 3)
+    stats["files_per_second"] = round(stats["files"] / seconds, 2)
+    stats["mb_per_second"] = round(stats["bytes"] / seconds / 1024 / 1024, 2)
+    return stats
+
+
+def _log_progress(stats: dict[str, Any]) -> None:
+    logger.info(
+        "Backfill: %s files ingested (%s skipped, %s failed), %s files/s, %s MB/s",
+        stats["files"],
+        stats["skipped"],
+        stats["failed"],
+        stats["files_per_second"],
+        stats["mb_per_second"],
+    )
+
+
+def backfill_main():
+    parser = argparse.ArgumentParser(
+        description="Ingest media already downloaded under the output root "
+        "into the knowledge graph."
+    )
+    parser.add_argument(
+        "-d", "--directory", help="Directory beneath the output root to backfill"
+    )
+    parser.add_argument("--workers", type=int, help="Parallel hashing/ingest workers")
+    parser.add_argument(
+        "--batch-items", type=int, help="Files committed per KG transaction"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Re-hash files already backfilled and report any whose bytes changed",
+    )
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+    logger.addHandler(handler)
+
+    root, directory = resolve_output_directory(args.directory)
+    if args.verify:
+        stats = verify(root, workers=args.workers)
+        logger.info(
+            "Verify: %s files match, %s mismatched, %s changed, %s missing,"
+            " %s without a recorded digest",
+            stats["verified"],
+            stats["mismatched"],
+            stats["changed"],
+            stats["missing"],
+            stats["unrecorded"],
+        )
+        for path in stats["mismatched_paths"]:
+            print(path)
+        sys.exit(1 if stats["mismatched"] else 0)
+    _log_progress(
+        backfill(directory, root, workers=args.workers, batch_items=args.batch_items)
+    )
+
+
+if __name__ == "__main__":
+    backfill_main()
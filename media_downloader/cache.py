@@ -0,0 +1,357 @@
+"""On-disk caches kept beside downloads, under ``<output root>/.media-downloader``.
+
+Each cache is a small SQLite database opened per operation, so instances are cheap
+to pickle into worker processes and safe to share between them. Every cache is
+best-effort: a locked, corrupt or unwritable database is logged and treated as a
+miss, never as a download failure.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from media_downloader.security import MediaSecurityError
+
+logger = logging.getLogger("MediaDownloader.cache")
+
+STATE_DIRECTORY = ".media-downloader"
+
+
+def state_directory(output_root: str | os.PathLike) -> Path:
+    """The directory holding on-disk state for ``output_root``."""
+    path = Path(output_root) / STATE_DIRECTORY
+    if path.is_symlink():
+        raise MediaSecurityError("Media state directory may not be a symbolic link")
+    return path
+
+
+def _env_megabytes(name: str, default: float) -> int:
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        value = default
+    return max(0, int(value * 1024 * 1024))
+
+
+def open_state_database(
+    path: Path, *, check_same_thread: bool = True
+) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(
+        path, timeout=30, isolation_level=None, check_same_thread=check_same_thread
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _evict_lru(
+    connection: sqlite3.Connection, table: str, key: str, max_bytes: int
+) -> None:
+    """Delete least-recently-accessed rows of ``table`` until it fits ``max_bytes``."""
+    (total,) = connection.execute(
+        f"SELECT COALESCE(SUM(size), 0) FROM {table}"
+    ).fetchone()
+    if total <= max_bytes:
+        return
+    doomed = []
+    for row_key, size in connection.execute(
+        f"SELECT {key}, size FROM {table} ORDER BY accessed"
+    ):
+        doomed.append((row_key,))
+        total -= size
+        if total <= max_bytes:
+            break
+    connection.executemany(f"DELETE FROM {table} WHERE {key} = ?", doomed)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A stored metadata body and the validators needed to revalidate it."""
+
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    content_type: str | None
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class MetadataCache:
+    """Conditional-GET cache of metadata pages, keyed by validated URL.
+
+    Only responses carrying an ``ETag`` or ``Last-Modified`` validator are kept,
+    so every reuse is confirmed by the origin with a ``304``. Entries are evicted
+    least-recently-used once the stored bodies exceed ``max_bytes``
+    (``MEDIA_DOWNLOADER_METADATA_CACHE_MB``, default 64; 0 disables the cache).
+    """
+
+    def __init__(self, path: str | os.PathLike, *, max_bytes: int | None = None):
+        self.path = Path(path)
+        if max_bytes is None:
+            max_bytes = _env_megabytes("MEDIA_DOWNLOADER_METADATA_CACHE_MB", 64)
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _open(self) -> sqlite3.Connection:
+        connection = open_state_database(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+            " content_type TEXT, body BLOB NOT NULL, size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)"
+        )
+        return connection
+
+    def lookup(self, url: str) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        try:
+            with closing(self._open()) as connection:
+                row = connection.execute(
+                    "SELECT body, etag, last_modified, content_type"
+                    " FROM metadata WHERE url = ?",
+                    (url,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("Metadata cache unavailable: error_type=%s", type(e).__name__)
+            return None
+        return CachedResponse(*row) if row else None
+
+    def touch(self, url: str) -> None:
+        """Mark ``url`` as just revalidated, protecting it from eviction."""
+        if not self.enabled:
+            return
+        try:
+            with closing(self._open()) as connection:
+                connection.execute(
+                    "UPDATE metadata SET accessed = ? WHERE url = ?",
+                    (time.time(), url),
+                )
+        except sqlite3.Error as e:
+            logger.debug("Metadata cache unavailable: error_type=%s", type(e).__name__)
+
+    def store(
+        self,
+        url: str,
+        body: bytes,
+        *,
+        etag: str | None,
+        last_modified: str | None,
+        content_type: str | None = None,
+    ) -> None:
+        if not self.enabled or not (etag or last_modified):
+            return
+        if len(body) > self.max_bytes:
+            return
+        try:
+            with closing(self._open()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        url,
+                        etag,
+                        last_modified,
+                        content_type,
+                        body,
+                        len(body),
+                        time.time(),
+                    ),
+                )
+                _evict_lru(connection, "metadata", "url", self.max_bytes)
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.debug("Metadata cache unavailable: error_type=%s", type(e).__name__)
+
+
+# Keys that are large, per-download or recomputed when the info is processed.
+_INFO_DROPPED_KEYS = frozenset(
+    {
+        "automatic_captions",
+        "subtitles",
+        "thumbnails",
+        "heatmap",
+        "requested_formats",
+        "requested_downloads",
+        "requested_subtitles",
+        "filepath",
+        "_filename",
+    }
+)
+
+
+def cacheable_info(info: dict) -> bool:
+    """Whether an unprocessed yt-dlp info dict can be stored and replayed.
+
+    Only single videos qualify, and only when no format carries cookies or
+    lazily generated fragments, which would not survive a JSON round trip.
+    """
+    if info.get("_type", "video") != "video" or not info.get("formats"):
+        return False
+    for media_format in info["formats"]:
+        if "cookies" in media_format:
+            return False
+        headers = media_format.get("http_headers") or {}
+        if any(name.lower() == "cookie" for name in headers):
+            return False
+        fragments = media_format.get("fragments")
+        if fragments is not None and not isinstance(fragments, (list, tuple)):
+            return False
+    return True
+
+
+class InfoCache:
+    """Persistent cache of unprocessed yt-dlp info dicts keyed by media ID.
+
+    Entries expire after ``ttl`` seconds (``MEDIA_DOWNLOADER_INFO_CACHE_TTL``,
+    default 1800 — signed format URLs go stale within hours) and the compressed
+    bodies are held under ``max_bytes`` (``MEDIA_DOWNLOADER_INFO_CACHE_MB``,
+    default 64; 0 disables the cache) by LRU eviction. Hit and miss counts are
+    kept in the database so they add up across worker processes.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        *,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+    ):
+        self.path = Path(path)
+        if ttl is None:
+            try:
+                ttl = float(os.environ.get("MEDIA_DOWNLOADER_INFO_CACHE_TTL", 1800))
+            except ValueError:
+                ttl = 1800.0
+        self.ttl = ttl
+        if max_bytes is None:
+            max_bytes = _env_megabytes("MEDIA_DOWNLOADER_INFO_CACHE_MB", 64)
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def _open(self) -> sqlite3.Connection:
+        connection = open_state_database(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS info (media_id TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL, size INTEGER NOT NULL, stored REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS info_accessed ON info (accessed)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY,"
+            " value INTEGER NOT NULL)"
+        )
+        return connection
+
+    def get(self, media_id: str) -> dict | None:
+        """The cached info for ``media_id``, or ``None`` when absent or expired."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with closing(self._open()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                row = connection.execute(
+                    "SELECT body, stored FROM info WHERE media_id = ?", (media_id,)
+                ).fetchone()
+                if row is not None and row[1] + self.ttl <= now:
+                    connection.execute(
+                        "DELETE FROM info WHERE media_id = ?", (media_id,)
+                    )
+                    row = None
+                if row is not None:
+                    connection.execute(
+                        "UPDATE info SET accessed = ? WHERE media_id = ?",
+                        (now, media_id),
+                    )
+                connection.execute(
+                    "INSERT INTO counters VALUES (?, 1)"
+                    " ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                    ("hits" if row is not None else "misses",),
+                )
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.debug("Info cache unavailable: error_type=%s", type(e).__name__)
+            return None
+        if row is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError):
+            self.discard(media_id)
+            return None
+
+    def put(self, media_id: str, info: dict) -> None:
+        """Store a JSON-safe (``YoutubeDL.sanitize_info``) info dict."""
+        if not self.enabled:
+            return
+        trimmed = {k: v for k, v in info.items() if k not in _INFO_DROPPED_KEYS}
+        body = zlib.compress(json.dumps(trimmed, separators=(",", ":")).encode())
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with closing(self._open()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?, ?)",
+                    (media_id, body, len(body), now, now),
+                )
+                _evict_lru(connection, "info", "media_id", self.max_bytes)
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.debug("Info cache unavailable: error_type=%s", type(e).__name__)
+
+    def discard(self, media_id: str, *, stored_before: float | None = None) -> None:
+        """Drop ``media_id`` (only if it was stored before ``stored_before``)."""
+        if not self.enabled:
+            return
+        query, params = "DELETE FROM info WHERE media_id = ?", (media_id,)
+        if stored_before is not None:
+            query, params = query + " AND stored < ?", (media_id, stored_before)
+        try:
+            with closing(self._open()) as connection:
+                connection.execute(query, params)
+        except sqlite3.Error as e:
+            logger.debug("Info cache unavailable: error_type=%s", type(e).__name__)
+
+    def stats(self) -> dict[str, int]:
+        """``{entries, bytes, hits, misses}`` across every process using the cache."""
+        stats = {"entries": 0, "bytes": 0, "hits": 0, "misses": 0}
+        if not self.enabled or not self.path.exists():
+            return stats
+        try:
+            with closing(self._open()) as connection:
+                stats["entries"], stats["bytes"] = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM info"
+                ).fetchone()
+                stats.update(connection.execute("SELECT name, value FROM counters"))
+        except sqlite3.Error as e:
+            logger.debug("Info cache unavailable: error_type=%s", type(e).__name__)
+        return stats
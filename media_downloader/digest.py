@@ -0,0 +1,332 @@
+"""Content digests of downloaded media, computed while the bytes arrive.
+
+yt-dlp writes a download to ``<name>.part`` and reports progress after every
+block. :class:`DigestTee` hashes the bytes appended since the previous report,
+while they are still in the page cache, so the finished file never has to be
+read back from disk to learn its SHA-256. Post-processing that rewrites the
+file (format merges, audio transcodes) makes the streamed digest stale; the
+``after_move`` post-processor then hashes the final file once, so the recorded
+digest is always of the file that was kept.
+
+Finished files are read through :func:`iter_buffers` (or whole, through
+:func:`mapped_file`): ``memoryview`` slices of a read-only memory map, handed
+to hashers and uploaders without being copied into ``bytes`` first, with
+buffered reads where a file cannot be mapped.
+
+Large files already on disk also get a :func:`tree_digest`, which spreads
+hashing over threads. Its format (``sha256-tree1``) is stable:
+
+* the file is cut into consecutive ``chunk_size`` slices (the last may be
+  shorter; an empty file is one empty slice) and each slice is SHA-256 hashed;
+* the root is ``SHA-256(b"sha256-tree1\\0" || chunk_size || size || leaves)``
+  with ``chunk_size`` and ``size`` as 8-byte big-endian integers and ``leaves``
+  the concatenated 32-byte slice digests, in order;
+* it is written ``sha256-tree1:<chunk_size>:<root hex>``.
+
+The value depends only on the bytes and ``chunk_size``, never on the number of
+threads, so it can be compared across machines; new digests use
+``MEDIA_DOWNLOADER_TREE_CHUNK_MB`` (default 16).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from yt_dlp.postprocessor.common import PostProcessor
+
+logger = logging.getLogger("MediaDownloader.digest")
+
+# Read granularity when catching up with a growing or finished file.
+_CHUNK_BYTES = 1024 * 1024
+
+
+def _map_readonly(fh) -> mmap.mmap | None:
+    """A read-only map of ``fh``, or ``None`` (empty file, no mmap support)."""
+    try:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def _unmap(mapped: mmap.mmap, view: memoryview) -> None:
+    view.release()
+    try:
+        mapped.close()
+    except BufferError:
+        # A consumer kept a slice; the map is closed when that is freed.
+        pass
+
+
+def iter_buffers(
+    file_path: str, chunk_size: int = _CHUNK_BYTES
+) -> Iterator[memoryview | bytes]:
+    """The bytes of ``file_path`` in ``chunk_size`` pieces, without copying.
+
+    Pieces are ``memoryview`` slices of a read-only memory map. Pages already
+    handed out are dropped from this process's mapping (they stay in the page
+    cache), so resident memory stays near one piece however large the file.
+    Files that cannot be mapped are read into ``bytes`` chunks instead.
+    """
+    with open(file_path, "rb") as fh:
+        mapped = _map_readonly(fh)
+        if mapped is None:
+            while chunk := fh.read(chunk_size):
+                yield chunk
+            return
+        dontneed = getattr(mmap, "MADV_DONTNEED", None)
+        if chunk_size % mmap.PAGESIZE:
+            dontneed = None
+        if dontneed is not None:
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset : offset + chunk_size]
+                if dontneed is not None:
+                    mapped.madvise(
+                        dontneed, offset, min(chunk_size, len(view) - offset)
+                    )
+        finally:
+            _unmap(mapped, view)
+
+
+@contextmanager
+def mapped_file(file_path: str) -> Iterator[memoryview | bytes]:
+    """All of ``file_path`` as a read-only ``memoryview`` of a memory map.
+
+    Its pages come from the page cache as they are read instead of being
+    copied into this process. Files that cannot be mapped (empty ones) are
+    read into ``bytes``. The view is released when the block exits.
+    """
+    with open(file_path, "rb") as fh:
+        mapped = _map_readonly(fh)
+        if mapped is None:
+            yield fh.read()
+            return
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            _unmap(mapped, view)
+
+
+def file_digest(file_path: str) -> tuple[str, int]:
+    """SHA-256 and size of ``file_path``, read in bounded chunks."""
+    hasher = hashlib.sha256()
+    size = 0
+    for chunk in iter_buffers(file_path):
+        hasher.update(chunk)
+        size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+TREE_DIGEST_FORMAT = "sha256-tree1"
+
+
+def _tree_chunk_size() -> int:
+    try:
+        megabytes = float(os.environ.get("MEDIA_DOWNLOADER_TREE_CHUNK_MB", 16))
+    except ValueError:
+        megabytes = 16.0
+    return max(64 * 1024, int(megabytes * 1024 * 1024))
+
+
+def tree_chunk_size(tree: str) -> int | None:
+    """The slice size a ``sha256-tree1`` digest was computed with, if well formed."""
+    name, _, rest = tree.partition(":")
+    chunk_size = rest.partition(":")[0]
+    if name != TREE_DIGEST_FORMAT or not chunk_size.isdigit():
+        return None
+    return int(chunk_size)
+
+
+def _hash_tree(fh, chunk_size: int, workers: int, flat: Any | None) -> str:
+    """``sha256-tree1`` digest of ``fh``, also feeding every byte to ``flat``.
+
+    Slices are hashed on ``workers`` threads straight from a read-only memory
+    map (``hashlib`` drops the GIL while hashing a buffer) while the calling
+    thread feeds ``flat`` from the same pages; where the file cannot be mapped,
+    slices are read with ``os.pread`` instead.
+    """
+    size = os.fstat(fh.fileno()).st_size
+    offsets = range(0, max(size, 1), chunk_size)
+    mapped = _map_readonly(fh)
+    view = memoryview(mapped) if mapped is not None else None
+
+    def _slice(offset: int) -> memoryview | bytes:
+        if view is None:
+            return os.pread(fh.fileno(), chunk_size, offset)
+        return view[offset : offset + chunk_size]
+
+    def _leaf(offset: int) -> bytes:
+        return hashlib.sha256(_slice(offset)).digest()
+
+    try:
+        if workers == 1 or len(offsets) == 1:
+            leaves = []
+            for offset in offsets:
+                piece = _slice(offset)
+                leaves.append(hashlib.sha256(piece).digest())
+                if flat is not None:
+                    flat.update(piece)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                pending = pool.map(_leaf, offsets)
+                if flat is not None:
+                    for offset in offsets:
+                        flat.update(_slice(offset))
+                leaves = list(pending)
+    finally:
+        if view is not None:
+            _unmap(mapped, view)
+    root = hashlib.sha256(TREE_DIGEST_FORMAT.encode() + b"\0")
+    root.update(chunk_size.to_bytes(8, "big") + size.to_bytes(8, "big"))
+    for leaf in leaves:
+        root.update(leaf)
+    return f"{TREE_DIGEST_FORMAT}:{chunk_size}:{root.hexdigest()}"
+
+
+def tree_digest(
+    file_path: str, *, chunk_size: int | None = None, workers: int | None = None
+) -> str:
+    """``sha256-tree1`` digest of ``file_path``, hashing slices on ``workers`` threads."""
+    with open(file_path, "rb") as fh:
+        return _hash_tree(
+            fh,
+            chunk_size or _tree_chunk_size(),
+            workers or min(8, os.cpu_count() or 1),
+            None,
+        )
+
+
+def file_and_tree_digest(
+    file_path: str, *, chunk_size: int | None = None, workers: int | None = None
+) -> tuple[tuple[str, int], str]:
+    """``((sha256, size), tree)`` of ``file_path`` from a single read of it.
+
+    The flat SHA-256 stays on one core; the ``sha256-tree1`` slices are hashed
+    alongside it on ``workers`` threads, so on a multi-core host the tree
+    digest costs little extra wall time.
+    """
+    flat = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        tree = _hash_tree(
+            fh,
+            chunk_size or _tree_chunk_size(),
+            workers or min(8, os.cpu_count() or 1),
+            flat,
+        )
+    return (flat.hexdigest(), size), tree
+
+
+@dataclass
+class _Partial:
+    hasher: Any = field(default_factory=hashlib.sha256)
+    offset: int = 0
+
+    def advance(self, path: str) -> None:
+        """Hash whatever was appended to ``path`` since the last call."""
+        with open(path, "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size < self.offset:
+                # The download restarted from scratch (no range support).
+                self.hasher, self.offset = hashlib.sha256(), 0
+            fh.seek(self.offset)
+            while self.offset < size:
+                chunk = fh.read(min(_CHUNK_BYTES, size - self.offset))
+                if not chunk:
+                    break
+                self.hasher.update(chunk)
+                self.offset += len(chunk)
+
+
+class DigestTee:
+    """A yt-dlp progress hook hashing each file as it is written.
+
+    ``digests`` maps every finished file, by device and inode so that moving
+    it out of staging keeps its entry, to its ``(sha256, size)``;
+    :meth:`digest_of` returns it while the file is unchanged (same size and
+    modification time). Hashing is best-effort: an unreadable ``.part`` file
+    just leaves the digest to be computed afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partials: dict[str, _Partial] = {}
+        self.digests: dict[tuple[int, int], tuple[str, int]] = {}
+        self._stamps: dict[tuple[int, int], tuple[int, int]] = {}
+
+    def progress_hook(self, d: dict) -> None:
+        status, filename = d.get("status"), d.get("filename")
+        if not filename or status not in ("downloading", "finished"):
+            return
+        key = os.path.abspath(filename)
+        with self._lock:
+            partial = self._partials.setdefault(key, _Partial())
+            try:
+                if status == "downloading":
+                    partial.advance(d.get("tmpfilename") or filename)
+                    return
+                partial.advance(filename)
+            except OSError as e:
+                logger.debug("Digest tee skipped: error_type=%s", type(e).__name__)
+                self._partials.pop(key, None)
+                return
+            del self._partials[key]
+            self.record(filename, (partial.hasher.hexdigest(), partial.offset))
+
+    def record(self, path: str, digest: tuple[str, int]) -> None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        key = (stat.st_dev, stat.st_ino)
+        self.digests[key] = digest
+        self._stamps[key] = (stat.st_size, stat.st_mtime_ns)
+
+    def digest_of(self, path: str) -> tuple[str, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (stat.st_dev, stat.st_ino)
+        if self._stamps.get(key) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return self.digests.get(key)
+
+
+class DigestPP(PostProcessor):
+    """``after_move`` post-processor recording the digest of the final file.
+
+    Reuses the :class:`DigestTee` digest when the kept file is the one that was
+    streamed, and hashes the file otherwise (merged or transcoded output).
+    The result is stored as ``info["__media_digest"] = (sha256, size)``.
+    """
+
+    def __init__(self, tee: DigestTee, downloader=None):
+        super().__init__(downloader)
+        self.tee = tee
+
+    def run(self, info):
+        path = info.get("filepath")
+        if path and os.path.exists(path):
+            digest = self.tee.digest_of(path)
+            if digest is None:
+                try:
+                    digest = file_digest(path)
+                except OSError as e:
+                    logger.debug("Digest skipped: error_type=%s", type(e).__name__)
+            if digest is not None:
+                self.tee.record(path, digest)
+                info["__media_digest"] = digest
+        return [], info
@@ -6,6 +6,10 @@
 commit, via the agent-utilities ``MediaStore``. This makes the raw bytes — not just
 a filesystem path — durable, deduped, and queryable inside the knowledge graph.
 
+Bytes the graph already holds are not sent again: when the store can look blobs
+up by digest, the file is hashed locally first and a known digest only gains a
+``:MediaOccurrence`` node recording where this copy came from.
+
 Entirely best-effort and dependency-guarded: if agent-utilities' KG stack or a live
 engine is not present, every entry point here **no-ops** (returns ``None``), so the
 downloader keeps working with zero KG infrastructure. This is the native ingestion
@@ -15,16 +19,32 @@
 
 from __future__ import annotations
 
+import atexit
+import hashlib
+import importlib.util
 import logging
 import mimetypes
 import os
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any
 
+from media_downloader.digest import (
+    file_digest,
+    iter_buffers,
+    mapped_file,
+)
 from media_downloader.security import public_source_url
 
 logger = logging.getLogger("MediaDownloader.kg")
 
-# yt-dlp info keys worth carrying onto the :MediaAsset node.
+# Info keys worth carrying onto the :MediaAsset node (yt-dlp's, plus the
+# ``sha256-tree1`` digest backfill records for large files).
 _INFO_FIELDS = (
     "id",
     "title",
@@ -36,11 +56,21 @@
     "resolution",
     "fps",
     "upload_date",
+    "tree_digest",
 )
 
+# Upload/hash granularity for streaming ingest; bounds ingest memory per worker.
+_CHUNK_BYTES = 1024 * 1024
 
-def _media_store() -> Any | None:
-    """Build a ``MediaStore`` over a live engine, or ``None`` when unavailable."""
+
+@lru_cache(maxsize=1)
+def kg_stack_installed() -> bool:
+    """Whether agent-utilities, which provides the KG engine, is importable."""
+    return importlib.util.find_spec("agent_utilities") is not None
+
+
+def _connect_media_store() -> tuple[Any, Any] | None:
+    """Build ``(engine, MediaStore)`` over a live engine, or ``None``."""
     try:
         from agent_utilities.knowledge_graph.core.graph_compute import (
             GraphComputeEngine,
@@ -54,12 +84,119 @@ def _media_store() -> Any | None:
         if getattr(engine, "_client", None) is None:
             logger.debug("KG media ingest: no live engine client")
             return None
-        return MediaStore(engine)
+        return engine, MediaStore(engine)
     except Exception as e:  # noqa: BLE001 — no reachable engine
         logger.debug("Operation failed: error_type=%s", type(e).__name__)
         return None
 
 
+class _MediaStoreHandle:
+    """Process-wide ``MediaStore``, connected once and reconnected when unhealthy.
+
+    A failed connection is remembered for ``retry_interval`` seconds
+    (``MEDIA_DOWNLOADER_KG_RETRY_SECONDS``, default 60), so a batch without an
+    engine probes for one at most once per interval instead of once per file.
+    """
+
+    def __init__(self, retry_interval: float | None = None):
+        if retry_interval is None:
+            try:
+                retry_interval = float(
+                    os.environ.get("MEDIA_DOWNLOADER_KG_RETRY_SECONDS", 60)
+                )
+            except ValueError:
+                retry_interval = 60.0
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._engine: Any | None = None
+        self._store: Any | None = None
+        self._unavailable_until = 0.0
+        self.connects = 0
+
+    def get(self) -> Any | None:
+        with self._lock:
+            if self._store is not None:
+                if getattr(self._engine, "_client", None) is not None:
+                    return self._store
+                logger.debug("KG media ingest: engine client lost; reconnecting")
+                self._engine = self._store = None
+            if time.monotonic() < self._unavailable_until:
+                return None
+            self.connects += 1
+            connected = _connect_media_store()
+            if connected is None:
+                self._unavailable_until = time.monotonic() + self.retry_interval
+                return None
+            self._engine, self._store = connected
+            return self._store
+
+    def invalidate(self, store: Any) -> None:
+        """Drop ``store`` after a failure so the next ingest reconnects."""
+        with self._lock:
+            if store is self._store:
+                self._engine = self._store = None
+
+
+_STORE_HANDLE = _MediaStoreHandle()
+
+
+def _media_store() -> Any | None:
+    """The shared ``MediaStore`` over a live engine, or ``None`` when unavailable."""
+    return _STORE_HANDLE.get()
+
+
+def media_store_available() -> bool:
+    """Whether a live engine is reachable for ingestion right now."""
+    return _media_store() is not None
+
+
+def _store_fields(
+    file_path: str, info: dict[str, Any] | None, source_url: str, source: str
+) -> dict[str, Any]:
+    """Keyword arguments describing ``file_path`` to ``MediaStore.store_media``."""
+    info = info or {}
+    mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    if mime.startswith("audio"):
+        media_type = "audio"
+    elif mime.startswith("video"):
+        media_type = "video"
+    elif mime.startswith("image"):
+        media_type = "image"
+    else:
+        media_type = "file"
+
+    extra = {k: info[k] for k in _INFO_FIELDS if info.get(k) is not None}
+    if extra.get("webpage_url"):
+        extra["webpage_url"] = public_source_url(str(extra["webpage_url"]))
+    if source_url:
+        extra["source_url"] = public_source_url(source_url)
+    name = info.get("title") or (
+        f"media-{info['id']}" if info.get("id") else "downloaded-media"
+    )
+    return {
+        "media_type": media_type,
+        "mime_type": mime,
+        "source": source,
+        "name": name,
+        "extra": extra,
+    }
+
+
+def _asset(stored: Any, size: int, digest: str, media_type: str) -> dict[str, Any]:
+    logger.info(
+        "KG media ingest: stored media bytes (%s bytes) as asset %s digest %s",
+        size,
+        stored.asset_id,
+        digest[:16],
+    )
+    return {
+        "asset_id": stored.asset_id,
+        "digest": digest,
+        "size_bytes": size,
+        "media_type": media_type,
+    }
+
+
 def ingest_media_file(
     file_path: str | None,
     *,
@@ -67,12 +204,15 @@ def ingest_media_file(
     source_url: str = "",
     source: str = "media-downloader",
     media_store: Any | None = None,
+    digest: tuple[str, int] | None = None,
 ) -> dict[str, Any] | None:
     """Store a downloaded file as a blob + ``:MediaAsset`` in the knowledge graph.
 
     Returns ``{asset_id, digest, size_bytes, media_type}`` on success, or ``None``
     when there is no engine, no file, or the store failed (never raises).
     ``media_store`` may be injected (tests); otherwise one is built on demand.
+    ``digest`` is the file's ``(sha256, size)`` when already known (computed
+    while downloading), which spares re-reading it for the dedupe lookup.
     """
     if not file_path or not os.path.exists(file_path):
         return None
@@ -80,59 +220,530 @@ def ingest_media_file(
     if store is None:
         return None
 
-    info = info or {}
-    mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
-    if mime.startswith("audio"):
-        media_type = "audio"
-    elif mime.startswith("video"):
-        media_type = "video"
-    elif mime.startswith("image"):
-        media_type = "image"
-    else:
-        media_type = "file"
-
+    fields = _store_fields(file_path, info, source_url, source)
     try:
-        with open(file_path, "rb") as fh:
-            data = fh.read()
+        size = os.path.getsize(file_path)
+        if digest is not None and digest[1] != size:
+            digest = None
+        if _can_dedupe(store):
+            if digest is None:
+                digest = file_digest(file_path)
+            asset = _attach_occurrence(store, digest[0], size, fields)
+            if asset is not None:
+                return asset
+        if callable(getattr(store, "store_media_stream", None)):
+            stored, size, digest = _store_streaming(store, file_path, fields)
+        else:
+            stored, size, digest = _store_bytes(store, file_path, fields)
     except OSError as e:
         logger.warning(
             "KG media ingest: cannot read media bytes (%s)", type(e).__name__
         )
         return None
-
-    extra = {k: info[k] for k in _INFO_FIELDS if info.get(k) is not None}
-    if extra.get("webpage_url"):
-        extra["webpage_url"] = public_source_url(str(extra["webpage_url"]))
-    if source_url:
-        extra["source_url"] = public_source_url(source_url)
-    name = info.get("title") or (
-        f"media-{info['id']}" if info.get("id") else "downloaded-media"
-    )
-
-    try:
-        stored = store.store_media(
-            data,
-            media_type=media_type,
-            mime_type=mime,
-            source=source,
-            name=name,
-            extra=extra,
-        )
     except Exception as e:  # noqa: BLE001 — engine/store failure is non-fatal
         logger.warning("Operation failed: error_type=%s", type(e).__name__)
+        if media_store is None:
+            _STORE_HANDLE.invalidate(store)
         return None
     if stored is None:
         return None
+    return _asset(stored, size, digest, fields["media_type"])
+
+
+def _can_dedupe(store: Any) -> bool:
+    return callable(getattr(store, "find_media_by_digest", None)) and callable(
+        getattr(store, "store_media_occurrence", None)
+    )
+
 
+def _occurrence_properties(fields: dict[str, Any], digest: str) -> dict[str, Any]:
+    """Properties of a ``:MediaOccurrence`` satisfying its governance shape."""
+    extra = fields["extra"]
+    return {
+        "name": fields["name"],
+        "mediaDigest": digest,
+        "mediaType": fields["media_type"],
+        "sourceRecordRef": extra.get("source_url")
+        or extra.get("webpage_url")
+        or fields["name"],
+        "tenantReference": os.environ.get("MEDIA_DOWNLOADER_KG_TENANT", "default"),
+        "accessPolicyReference": os.environ.get(
+            "MEDIA_DOWNLOADER_KG_ACCESS_POLICY", "private"
+        ),
+        "provenanceReference": fields["source"],
+        "extra": extra,
+    }
+
+
+def _attach_occurrence(
+    store: Any, digest: str, size: int, fields: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Record a new occurrence of an already stored blob; ``None`` if it is new."""
+    existing = store.find_media_by_digest(digest)
+    if existing is None:
+        return None
+    occurrence = store.store_media_occurrence(
+        existing.asset_id, **_occurrence_properties(fields, digest)
+    )
     logger.info(
-        "KG media ingest: stored media bytes (%s bytes) as asset %s digest %s",
-        len(data),
-        stored.asset_id,
-        stored.digest[:16],
+        "KG media ingest: digest %s already stored as asset %s; recorded occurrence",
+        digest[:16],
+        existing.asset_id,
     )
     return {
-        "asset_id": stored.asset_id,
-        "digest": stored.digest,
-        "size_bytes": len(data),
-        "media_type": media_type,
+        "asset_id": existing.asset_id,
+        "digest": digest,
+        "size_bytes": size,
+        "media_type": fields["media_type"],
+        "occurrence_id": getattr(occurrence, "occurrence_id", None),
+        "deduplicated": True,
     }
+
+
+def _iter_chunks(file_path: str, hasher) -> Iterator[memoryview | bytes]:
+    chunks = iter_buffers(file_path, _CHUNK_BYTES)
+    try:
+        for chunk in chunks:
+            hasher.update(chunk)
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def _store_streaming(store: Any, file_path: str, fields: dict[str, Any]):
+    """Hash and upload ``file_path`` in bounded chunks (peak memory ~one chunk).
+
+    Chunks are ``memoryview`` slices of the mapped file where it can be mapped,
+    so neither the hasher nor the uploader gets a copy of the bytes.
+    """
+    hasher = hashlib.sha256()
+    size = os.path.getsize(file_path)
+    chunks = _iter_chunks(file_path, hasher)
+    try:
+        stored = store.store_media_stream(chunks, size_bytes=size, **fields)
+    finally:
+        chunks.close()
+    return stored, size, getattr(stored, "digest", None) or hasher.hexdigest()
+
+
+def _store_bytes(store: Any, file_path: str, fields: dict[str, Any]):
+    """Legacy path for stores without ``store_media_stream``: whole file at once.
+
+    Files up to ``MEDIA_DOWNLOADER_KG_INLINE_MAX_MB`` (default 256) are read
+    into ``bytes``. Larger ones are handed over as a read-only ``memoryview``
+    of the mapped file, with a warning, so their pages come from the page cache
+    instead of being copied into this process; the store may still copy them.
+    """
+    size = os.path.getsize(file_path)
+    limit = _env_number("MEDIA_DOWNLOADER_KG_INLINE_MAX_MB", 256) * 1024 * 1024
+    if size <= limit:
+        with open(file_path, "rb") as fh:
+            data = fh.read()
+        stored = store.store_media(data, **fields)
+        digest = getattr(stored, "digest", None) or hashlib.sha256(data).hexdigest()
+        return stored, len(data), digest
+    logger.warning(
+        "KG media ingest: %s bytes is over the %s-byte limit for stores without"
+        " streaming upload; sending it as a memory-mapped view",
+        size,
+        int(limit),
+    )
+    with mapped_file(file_path) as data:
+        stored = store.store_media(data, **fields)
+        digest = getattr(stored, "digest", None) or hashlib.sha256(data).hexdigest()
+        return stored, len(data), digest
+
+
+def trim_info(info: dict[str, Any] | None) -> dict[str, Any]:
+    """The yt-dlp info fields ingestion records, small enough to pass around."""
+    info = info or {}
+    return {k: info[k] for k in _INFO_FIELDS if info.get(k) is not None}
+
+
+@dataclass
+class _PendingIngest:
+    file_path: str
+    info: dict[str, Any] | None
+    source_url: str
+    source: str
+    size: int
+    digest: tuple[str, int] | None = None
+    future: Future = field(default_factory=Future)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class IngestBatcher:
+    """Groups KG ingests so many downloads share one store transaction.
+
+    Submitted files are flushed together once ``max_items`` are pending
+    (``MEDIA_DOWNLOADER_KG_BATCH_ITEMS``, default 32), their sizes reach
+    ``max_bytes`` (``MEDIA_DOWNLOADER_KG_BATCH_MB``, default 64) or the oldest
+    has waited ``max_delay`` seconds (``MEDIA_DOWNLOADER_KG_BATCH_SECONDS``,
+    default 2), and committed atomically through the store's
+    ``store_media_batch``; if that commit fails, they are ingested one by one.
+    Stores without ``store_media_batch`` are not batched at all: each file is
+    ingested as it is submitted, without waiting for the window. Files larger
+    than ``max_bytes`` bypass batching and are streamed on their own.
+    Every submission returns a ``Future`` resolving to the
+    :func:`ingest_media_file` result for that file.
+    """
+
+    def __init__(
+        self,
+        media_store: Any | None = None,
+        *,
+        max_items: int | None = None,
+        max_bytes: int | None = None,
+        max_delay: float | None = None,
+    ):
+        self._media_store = media_store
+        if max_items is None:
+            max_items = int(_env_number("MEDIA_DOWNLOADER_KG_BATCH_ITEMS", 32))
+        self.max_items = max(1, max_items)
+        if max_bytes is None:
+            max_bytes = int(
+                _env_number("MEDIA_DOWNLOADER_KG_BATCH_MB", 64) * 1024 * 1024
+            )
+        self.max_bytes = max(1, max_bytes)
+        if max_delay is None:
+            max_delay = _env_number("MEDIA_DOWNLOADER_KG_BATCH_SECONDS", 2.0)
+        self.max_delay = max(0.0, max_delay)
+        self._pending: list[_PendingIngest] = []
+        self._pending_bytes = 0
+        self._oldest = 0.0
+        self._changed = threading.Condition()
+        self._timer: threading.Thread | None = None
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+
+    def submit(
+        self,
+        file_path: str | None,
+        *,
+        info: dict[str, Any] | None = None,
+        source_url: str = "",
+        source: str = "media-downloader",
+        digest: tuple[str, int] | None = None,
+    ) -> Future:
+        try:
+            size = os.path.getsize(file_path) if file_path else -1
+        except OSError:
+            size = -1
+        if (
+            size < 0
+            or size > self.max_bytes
+            or self._closed
+            or not callable(getattr(self._store(), "store_media_batch", None))
+        ):
+            future: Future = Future()
+            future.set_result(
+                ingest_media_file(
+                    file_path,
+                    info=info,
+                    source_url=source_url,
+                    source=source,
+                    media_store=self._media_store,
+                    digest=digest,
+                )
+            )
+            return future
+        item = _PendingIngest(file_path, info, source_url, source, size, digest)
+        with self._changed:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(item)
+            self._pending_bytes += size
+            full = (
+                len(self._pending) >= self.max_items
+                or self._pending_bytes >= self.max_bytes
+            )
+            batch = self._take() if full else None
+            if batch is None:
+                self._start_timer()
+                self._changed.notify_all()
+        if batch:
+            self._flush(batch)
+        return item.future
+
+    def flush(self) -> None:
+        """Ingest everything pending now, in the calling thread."""
+        with self._changed:
+            batch = self._take()
+        if batch:
+            self._flush(batch)
+
+    def close(self) -> None:
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self.flush()
+
+    def pending(self) -> int:
+        with self._changed:
+            return len(self._pending)
+
+    def _take(self) -> list[_PendingIngest]:
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        return batch
+
+    def _start_timer(self) -> None:
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(
+                target=self._flush_when_due, name="kg-ingest-batcher", daemon=True
+            )
+            self._timer.start()
+
+    def _flush_when_due(self) -> None:
+        while True:
+            with self._changed:
+                while not self._closed and (
+                    not self._pending
+                    or time.monotonic() < self._oldest + self.max_delay
+                ):
+                    timeout = (
+                        self._oldest + self.max_delay - time.monotonic()
+                        if self._pending
+                        else None
+                    )
+                    self._changed.wait(timeout)
+                if self._closed:
+                    return
+                batch = self._take()
+            self._flush(batch)
+
+    def _store(self) -> Any | None:
+        return self._media_store if self._media_store is not None else _media_store()
+
+    def _flush(self, batch: list[_PendingIngest]) -> None:
+        try:
+            store = self._store()
+            if store is None:
+                return
+            if callable(getattr(store, "store_media_batch", None)):
+                if self._commit_batch(store, batch):
+                    return
+            for item in batch:
+                if item.future.done():
+                    continue
+                item.future.set_result(
+                    ingest_media_file(
+                        item.file_path,
+                        info=item.info,
+                        source_url=item.source_url,
+                        source=item.source,
+                        media_store=self._media_store,
+                        digest=item.digest,
+                    )
+                )
+        except Exception as e:  # noqa: BLE001 — ingestion never fails a download
+            logger.warning("Operation failed: error_type=%s", type(e).__name__)
+        finally:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_result(None)
+
+    def _commit_batch(self, store: Any, batch: list[_PendingIngest]) -> bool:
+        """One ``store_media_batch`` transaction; ``False`` to retry per item.
+
+        With a dedupe-capable store, files whose digest the graph already holds
+        are resolved to occurrences first — before being read, when the digest
+        was computed during the download — and left out of the transaction.
+        Each item's ``data`` is a read-only ``memoryview`` of the mapped file,
+        valid until ``store_media_batch`` returns.
+        """
+        dedupe = _can_dedupe(store)
+        entries = []
+        with ExitStack() as mapped:
+            try:
+                for item in batch:
+                    fields = _store_fields(
+                        item.file_path, item.info, item.source_url, item.source
+                    )
+                    digest = item.digest
+                    if digest is not None and digest[1] != item.size:
+                        digest = None
+                    if dedupe and digest is not None:
+                        asset = _attach_occurrence(store, *digest, fields)
+                        if asset is not None:
+                            item.future.set_result(asset)
+                            continue
+                    try:
+                        data = mapped.enter_context(mapped_file(item.file_path))
+                    except OSError as e:
+                        logger.warning(
+                            "KG media ingest: cannot read media bytes (%s)",
+                            type(e).__name__,
+                        )
+                        item.future.set_result(None)
+                        continue
+                    if digest is None:
+                        digest = (hashlib.sha256(data).hexdigest(), len(data))
+                        if dedupe:
+                            asset = _attach_occurrence(store, *digest, fields)
+                            if asset is not None:
+                                item.future.set_result(asset)
+                                continue
+                    entries.append((item, fields, data, digest))
+                if not entries:
+                    return True
+                stored_items = store.store_media_batch(
+                    [{"data": data, **fields} for _, fields, data, _ in entries]
+                )
+            except Exception as e:  # noqa: BLE001 — fall back to per-item ingest
+                logger.warning("Operation failed: error_type=%s", type(e).__name__)
+                if self._media_store is None:
+                    _STORE_HANDLE.invalidate(store)
+                return False
+        self.batches += 1
+        self.items += len(entries)
+        for (item, fields, _, (digest, size)), stored in zip(
+            entries, stored_items, strict=False
+        ):
+            if stored is None:
+                item.future.set_result(None)
+                continue
+            item.future.set_result(
+                _asset(
+                    stored,
+                    size,
+                    getattr(stored, "digest", None) or digest,
+                    fields["media_type"],
+                )
+            )
+        return True
+
+
+_BATCHER: IngestBatcher | None = None
+_BATCHER_LOCK = threading.Lock()
+
+
+def shared_batcher() -> IngestBatcher:
+    """Return the process-wide ingest batcher, creating it on first use."""
+    global _BATCHER
+    with _BATCHER_LOCK:
+        if _BATCHER is None:
+            _BATCHER = IngestBatcher()
+            atexit.register(_BATCHER.close)
+        return _BATCHER
+
+
+class IngestQueue:
+    """Bounded background stage between finished downloads and the KG store.
+
+    :meth:`submit` returns a ``Future`` at once, so a download never waits for a
+    slow or stalled engine. At most ``max_pending`` files
+    (``MEDIA_DOWNLOADER_KG_QUEUE_SIZE``, default 256) may be waiting for
+    ingestion; beyond that ``submit`` blocks, pushing back on downloads instead
+    of queueing without bound. ``workers`` threads
+    (``MEDIA_DOWNLOADER_KG_INGEST_WORKERS``, default 2) hand files to the
+    :func:`shared_batcher` (or ``batcher``) and run the commits it triggers.
+    """
+
+    def __init__(
+        self,
+        batcher: IngestBatcher | None = None,
+        *,
+        max_pending: int | None = None,
+        workers: int | None = None,
+    ):
+        self._batcher = batcher
+        if max_pending is None:
+            max_pending = int(_env_number("MEDIA_DOWNLOADER_KG_QUEUE_SIZE", 256))
+        self.max_pending = max(1, max_pending)
+        if workers is None:
+            workers = int(_env_number("MEDIA_DOWNLOADER_KG_INGEST_WORKERS", 2))
+        self.workers = max(1, workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="kg-ingest"
+        )
+        self._changed = threading.Condition()
+        self._depth = 0
+        self._handing_off = 0
+        self.completed = 0
+
+    @property
+    def batcher(self) -> IngestBatcher:
+        return self._batcher if self._batcher is not None else shared_batcher()
+
+    def submit(self, file_path: str | None, **kwargs: Any) -> Future:
+        """Queue ``file_path`` for ingestion; ``kwargs`` as for ``IngestBatcher.submit``."""
+        self._slots.acquire()
+        with self._changed:
+            self._depth += 1
+            self._handing_off += 1
+        future: Future = Future()
+        future.add_done_callback(self._finished)
+        self._executor.submit(self._hand_off, future, file_path, kwargs)
+        return future
+
+    def _hand_off(self, future: Future, file_path: str | None, kwargs: dict) -> None:
+        try:
+            inner = self.batcher.submit(file_path, **kwargs)
+        except Exception as e:  # noqa: BLE001 — ingestion never fails a download
+            logger.warning("Operation failed: error_type=%s", type(e).__name__)
+            future.set_result(None)
+        else:
+            inner.add_done_callback(lambda done: future.set_result(done.result()))
+        finally:
+            with self._changed:
+                self._handing_off -= 1
+                self._changed.notify_all()
+
+    def _finished(self, _future: Future) -> None:
+        with self._changed:
+            self._depth -= 1
+            self.completed += 1
+            self._changed.notify_all()
+        self._slots.release()
+
+    def flush(self) -> None:
+        """Commit everything queued so far without waiting for a batch to fill."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._handing_off == 0)
+        self.batcher.flush()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Flush, then wait until every queued file is ingested."""
+        self.flush()
+        with self._changed:
+            return self._changed.wait_for(lambda: self._depth == 0, timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Wait for queued files, then stop the worker threads."""
+        self.join(timeout)
+        self._executor.shutdown(wait=False)
+
+    def depth(self) -> int:
+        """Files submitted and not yet ingested."""
+        with self._changed:
+            return self._depth
+
+    def stats(self) -> dict[str, int]:
+        with self._changed:
+            return {
+                "depth": self._depth,
+                "capacity": self.max_pending,
+                "workers": self.workers,
+                "completed": self.completed,
+            }
+
+
+_QUEUE: IngestQueue | None = None
+
+
+def ingest_queue() -> IngestQueue:
+    """Return the process-wide ingest queue, creating it on first use."""
+    global _QUEUE
+    with _BATCHER_LOCK:
+        if _QUEUE is None:
+            _QUEUE = IngestQueue()
+            atexit.register(_QUEUE.join, 30.0)
+        return _QUEUE
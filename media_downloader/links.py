@@ -0,0 +1,484 @@
+"""Batch links read from files, stdin or gzip, deduplicated as they stream.
+
+:func:`read_links` yields one link per line without loading the input:
+surrounding whitespace is stripped, blank lines and ``#`` comments are skipped,
+and lines that are not HTTP(S) URLs (see
+:func:`~media_downloader.security.parse_media_url`) are dropped and counted.
+
+:func:`unique_links` drops links that name media already seen, keyed by
+``<extractor key>:<media id>`` (:func:`media_id`), so ``youtu.be/X``,
+``youtube.com/watch?v=X&t=5`` and ``m.youtube.com/watch?v=X`` are scheduled
+once. Links without a recognisable ID are keyed by their normalised URL.
+Matching a link against yt-dlp's ~1,700 URL patterns one by one costs several
+milliseconds, so :class:`_ExtractorIndex` first narrows them to the few whose
+patterns' required literals (``rumble.com/``, ``youtu``...) occur in the link.
+Keys are remembered as 8-byte digests in a :class:`LinkSet`. For inputs of
+many millions of lines a :class:`BloomFilter` holds them in a fixed
+``MEDIA_DOWNLOADER_LINK_BLOOM_CAPACITY``-sized bit array instead, at the cost
+of skipping about one in a thousand unique links.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import math
+import os
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import takewhile
+from re import _constants as sre
+from re import _parser as sre_parse
+from urllib.parse import urlsplit, urlunsplit
+
+import yt_dlp
+from yt_dlp.utils import variadic
+
+from media_downloader.security import MediaSecurityError, parse_media_url
+
+logger = logging.getLogger("MediaDownloader.links")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _open_text(source: str | os.PathLike):
+    if source == "-":
+        return nullcontext(sys.stdin)
+    with open(source, "rb") as fh:
+        magic = fh.read(2)
+    if magic == _GZIP_MAGIC:
+        return gzip.open(source, "rt", encoding="utf-8", errors="replace")
+    return open(source, encoding="utf-8", errors="replace")
+
+
+def read_links(source: str | os.PathLike) -> Iterator[str]:
+    """Links in ``source`` (a path, gzip-compressed or not, or ``-`` for stdin)."""
+    invalid = 0
+    with _open_text(source) as fh:
+        for line in fh:
+            link = line.strip()
+            if not link or link.startswith("#"):
+                continue
+            try:
+                parse_media_url(link)
+            except MediaSecurityError:
+                invalid += 1
+                continue
+            yield link
+    if invalid:
+        logger.warning("Skipped %s invalid link(s) in %s", invalid, source)
+
+
+@lru_cache(maxsize=1)
+def _url_extractors() -> tuple:
+    """Extractors that can claim a link, in ``YoutubeDL.extract_info`` order.
+
+    Embed-only extractors (no ``_VALID_URL``) never match a link, and the
+    generic extractor matches every link without naming a media ID, so
+    neither is tried.
+    """
+    return tuple(
+        extractor
+        for extractor in yt_dlp.extractor.gen_extractor_classes()
+        if getattr(extractor, "_VALID_URL", None) and extractor.ie_key() != "Generic"
+    )
+
+
+# Literals shorter than this are too common to narrow anything down.
+_MIN_LITERAL = 3
+_REPEATS = (sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT)
+_ZERO_WIDTH = (sre.AT, sre.ASSERT, sre.ASSERT_NOT)
+
+
+def _folded_letter(items: list) -> str | None:
+    """The letter a class like ``[yY]`` matches in either case, if that is all."""
+    letters = set()
+    for op, av in items:
+        if op is not sre.LITERAL:
+            return None
+        letters.add(chr(av).lower())
+    return letters.pop() if len(letters) == 1 else None
+
+
+def _literal_options(items) -> list[frozenset[str]]:
+    """Sets of lower-cased literals; every match contains a member of each set."""
+    options: list[frozenset[str]] = []
+    run: list[str] = []
+
+    def _close():
+        if run:
+            options.append(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre.LITERAL:
+            run.append(chr(av).lower())
+            continue
+        if op is sre.IN and (letter := _folded_letter(av)) is not None:
+            run.append(letter)
+            continue
+        _close()
+        if op is sre.SUBPATTERN:
+            options += _literal_options(av[-1])
+        elif op is sre.ATOMIC_GROUP:
+            options += _literal_options(av)
+        elif op in _REPEATS and av[0] >= 1:
+            options += _literal_options(av[2])
+        elif op is sre.BRANCH:
+            branches = [_longest_option(_literal_options(b)) for b in av[1]]
+            if all(branch is not None for branch in branches):
+                options.append(frozenset().union(*branches))
+    _close()
+    return options
+
+
+def _usable(option: frozenset[str]) -> bool:
+    return min(map(len, option)) >= _MIN_LITERAL
+
+
+def _longest_option(options: list[frozenset[str]]) -> frozenset[str] | None:
+    usable = [o for o in options if _usable(o)]
+    return max(usable, key=lambda o: (min(map(len, o)), -len(o)), default=None)
+
+
+def _in_class(items: list, char: str) -> bool:
+    """Whether ``char`` may be in a parsed character class (``True`` if unsure)."""
+    variants = {char, char.lower(), char.upper()}
+    negate = False
+    for op, av in items:
+        if op is sre.NEGATE:
+            negate = True
+        elif op is sre.LITERAL:
+            if chr(av) in variants:
+                return not negate
+        elif op is sre.RANGE:
+            if any(av[0] <= ord(v) <= av[1] for v in variants):
+                return not negate
+        else:  # categories (\w, \d...): not worth modelling
+            return True
+    return negate
+
+
+def _may_begin_with(items, text: str) -> bool:
+    """``False`` only if no match of ``items`` can begin with ``text``."""
+
+    def _sequence(items, k, then):
+        if k >= len(text):
+            return True
+        if not items:
+            return then(k)
+        (op, av), rest = items[0], items[1:]
+        return _node(op, av, k, lambda k2: _sequence(rest, k2, then))
+
+    def _node(op, av, k, then):
+        if k >= len(text):
+            return True
+        char = text[k]
+        if op is sre.LITERAL:
+            return chr(av).lower() == char.lower() and then(k + 1)
+        if op is sre.IN:
+            return _in_class(av, char) and then(k + 1)
+        if op is sre.ANY:
+            return char != "\n" and then(k + 1)
+        if op in _ZERO_WIDTH:
+            return then(k)
+        if op is sre.SUBPATTERN:
+            return _sequence(list(av[-1]), k, then)
+        if op is sre.BRANCH:
+            return any(_sequence(list(b), k, then) for b in av[1])
+        if op in _REPEATS:
+            low, high, body = av[0], av[1], list(av[2])
+
+            def _repeat(count, k):
+                if k >= len(text) or (count >= low and then(k)):
+                    return True
+                return count < high and _sequence(
+                    body, k, lambda k2: _repeat(count + 1, k2) if k2 > k else then(k)
+                )
+
+            return _repeat(0, k)
+        return True  # back-references, conditionals...: assume it may
+
+    return _sequence(list(items), 0, lambda _k: True)
+
+
+def _link_options(pattern: str) -> list[frozenset[str]]:
+    """:func:`_literal_options` of ``pattern`` for links starting ``http(s):``.
+
+    ``re.match`` anchors at the start, so a leading optional group (the
+    ``https://host/`` prefix of YouTube's patterns, which also accept bare
+    IDs) must have matched when what follows it cannot begin ``http:`` or
+    ``https:``.
+    """
+    items = list(sre_parse.parse(pattern))
+    while items:
+        op, av = items[0]
+        if op in _ZERO_WIDTH:
+            items = items[1:]
+        elif op is sre.SUBPATTERN:
+            items = list(av[-1]) + items[1:]
+        elif (
+            op is sre.MAX_REPEAT
+            and (av[0], av[1]) == (0, 1)
+            and not _may_begin_with(items[1:], "http:")
+            and not _may_begin_with(items[1:], "https:")
+        ):
+            items = list(av[2]) + items[1:]
+        else:
+            break
+    return _literal_options(items)
+
+
+class _ExtractorIndex:
+    """Candidate extractors for an ``http(s)`` link, found by trigram lookup.
+
+    Each extractor is indexed by the literals one of which every link it
+    matches must contain, choosing per pattern the set least shared with
+    other extractors, and each literal under its rarest trigram. A link's
+    candidates are the extractors with such a literal in the (lower-cased)
+    link, plus the few whose patterns have none; suitability is then checked
+    on those alone, in extractor order.
+    """
+
+    def __init__(self, extractors: tuple):
+        self.extractors = extractors
+        parsed: list[list[list[frozenset[str]]] | None] = []
+        for extractor in extractors:
+            try:
+                parsed.append(
+                    [_link_options(p) for p in variadic(extractor._VALID_URL)]
+                )
+            except Exception:  # noqa: BLE001 — unparsable patterns are always tried
+                parsed.append(None)
+        shared: Counter = Counter()
+        for patterns in parsed:
+            shared.update(
+                {
+                    literal
+                    for options in patterns or ()
+                    for option in options
+                    for literal in option
+                }
+            )
+        required: list[set[str] | None] = []
+        for patterns in parsed:
+            literals: set[str] | None = set() if patterns is not None else None
+            for options in patterns or ():
+                usable = [o for o in options if _usable(o)]
+                if not usable:
+                    literals = None
+                    break
+                literals |= min(
+                    usable, key=lambda o: (max(shared[lit] for lit in o), len(o))
+                )
+            required.append(literals)
+        grams = Counter(
+            literal[i : i + 3]
+            for literals in required
+            for literal in literals or ()
+            for i in range(len(literal) - 2)
+        )
+        self.always = [i for i, literals in enumerate(required) if literals is None]
+        self.by_gram: dict[str, list[tuple[int, str]]] = {}
+        for i, literals in enumerate(required):
+            for literal in literals or ():
+                gram = min(
+                    (literal[j : j + 3] for j in range(len(literal) - 2)),
+                    key=grams.__getitem__,
+                )
+                self.by_gram.setdefault(gram, []).append((i, literal))
+
+    def candidates(self, link: str) -> Iterator:
+        lowered = link.lower()
+        found = set(self.always)
+        for i in range(len(lowered) - 2):
+            for extractor, literal in self.by_gram.get(lowered[i : i + 3], ()):
+                if literal in lowered:
+                    found.add(extractor)
+        return (self.extractors[i] for i in sorted(found))
+
+
+@lru_cache(maxsize=1)
+def _extractor_index() -> _ExtractorIndex:
+    return _ExtractorIndex(_url_extractors())
+
+
+@lru_cache(maxsize=1)
+def _youtube_extractors() -> tuple:
+    """The YouTube extractors yt-dlp tries before any other."""
+    return tuple(
+        takewhile(lambda e: e.ie_key().startswith("Youtube"), _url_extractors())
+    )
+
+
+_YOUTUBE_HOSTS = ("youtube.com", "youtu.be", "youtube-nocookie.com")
+
+
+def _is_youtube(link: str) -> bool:
+    try:
+        host = urlsplit(link).hostname or ""
+    except ValueError:
+        return False
+    return any(host == h or host.endswith("." + h) for h in _YOUTUBE_HOSTS)
+
+
+def _first_suitable(extractors: Iterable, link: str):
+    for extractor in extractors:
+        # ``suitable`` overrides only ever narrow ``_VALID_URL``, and some are
+        # slow (YoutubePlaylist first asks YoutubeTab), so match it first.
+        if extractor._match_valid_url(link) and extractor.suitable(link):
+            return extractor
+    return None
+
+
+def media_id(link: str) -> str | None:
+    """``<extractor key>:<media id>`` for a link, without any network access.
+
+    Uses the same extractor precedence as ``YoutubeDL.extract_info``; returns
+    ``None`` when no site extractor matches or the first one that does cannot
+    tell the ID from the URL. YouTube links are tried against the YouTube
+    extractors (first in that order) directly; other ``http(s)`` links only
+    against the candidates :class:`_ExtractorIndex` finds for them.
+    """
+    extractor = None
+    if _is_youtube(link):
+        extractor = _first_suitable(_youtube_extractors(), link)
+    if extractor is None:
+        if link[:8].lower().startswith(("http://", "https://")):
+            extractor = _first_suitable(_extractor_index().candidates(link), link)
+        else:
+            extractor = _first_suitable(_url_extractors(), link)
+    if extractor is None:
+        return None
+    try:
+        temp_id = extractor.get_temp_id(link)
+    except Exception:  # noqa: BLE001 — extractor-specific URL parsing
+        return None
+    return f"{extractor.ie_key()}:{temp_id}" if temp_id else None
+
+
+@lru_cache(maxsize=4096)
+def canonical_media_id(link: str) -> str | None:
+    """:func:`media_id`, cached for a download that asks for it repeatedly."""
+    return media_id(link)
+
+
+def link_key(link: str) -> str:
+    """What two links must share to download the same media."""
+    # Uncached: a stream of distinct links would only churn the cache.
+    key = media_id(link)
+    if key is not None:
+        return key
+    try:
+        parsed = parse_media_url(link)
+    except MediaSecurityError:
+        # Rejected again, with its reason, when it is downloaded.
+        return link
+    return urlunsplit(
+        (
+            parsed.scheme.lower(),
+            parsed.netloc.lower(),
+            parsed.path or "/",
+            parsed.query,
+            "",
+        )
+    )
+
+
+def _digest(key: str, size: int) -> bytes:
+    return hashlib.blake2b(key.encode(), digest_size=size).digest()
+
+
+class LinkSet:
+    """Exact set of link keys: 8-byte digests in an open-addressed array.
+
+    Kept at most two-thirds full, so it costs 12 to 24 bytes per key (a
+    ``set`` of ``int`` costs about 70).
+    """
+
+    def __init__(self):
+        self._slots = array("Q", bytes(8 * 1024))
+        self._count = 0
+
+    def _place(self, digest: int) -> bool:
+        mask = len(self._slots) - 1
+        i = digest & mask
+        while slot := self._slots[i]:
+            if slot == digest:
+                return False
+            i = (i + 1) & mask
+        self._slots[i] = digest
+        return True
+
+    def add(self, key: str) -> bool:
+        """Remember ``key``; ``False`` if it was already there."""
+        # Zero marks an empty slot.
+        digest = int.from_bytes(_digest(key, 8), "big") or 1
+        if 3 * self._count >= 2 * len(self._slots):
+            old, self._slots = self._slots, array("Q", bytes(16 * len(self._slots)))
+            for slot in old:
+                if slot:
+                    self._place(slot)
+        if not self._place(digest):
+            return False
+        self._count += 1
+        return True
+
+
+class BloomFilter:
+    """Fixed-size set of link keys that may mistake a new key for a seen one.
+
+    Sized for ``capacity`` keys at a false-positive rate of ``error_rate``:
+    about 1.8 bytes per key at the default 0.1%.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def add(self, key: str) -> bool:
+        """Remember ``key``; ``False`` if it (probably) was already there."""
+        digest = _digest(key, 16)
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        added = False
+        for i in range(self.hashes):
+            bit = (first + i * second) % self.bits
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self._array[byte] & mask:
+                self._array[byte] |= mask
+                added = True
+        return added
+
+
+def link_filter() -> LinkSet | BloomFilter:
+    """A :class:`BloomFilter` when ``MEDIA_DOWNLOADER_LINK_BLOOM_CAPACITY`` is set."""
+    try:
+        capacity = int(os.environ.get("MEDIA_DOWNLOADER_LINK_BLOOM_CAPACITY", 0))
+    except ValueError:
+        capacity = 0
+    return BloomFilter(capacity) if capacity > 0 else LinkSet()
+
+
+def unique_links(
+    links: Iterable[str], seen: LinkSet | BloomFilter | None = None
+) -> Iterator[str]:
+    """``links`` without those naming media already yielded, read lazily."""
+    seen = seen if seen is not None else link_filter()
+    duplicates = 0
+    for link in links:
+        if seen.add(link_key(link)):
+            yield link
+        else:
+            duplicates += 1
+    if duplicates:
+        logger.info("Skipped %s duplicate link(s)", duplicates)
@@ -0,0 +1,196 @@
+"""Append-only record of a batch download, for resuming it after a crash.
+
+Every link's state transitions (``queued``, ``started``, ``done``, ``failed``)
+are appended to the ``events`` table of a SQLite manifest. Nothing is updated
+in place, so the manifest is also a log of the batch. Events are buffered and
+committed together once ``MEDIA_DOWNLOADER_MANIFEST_BATCH`` (default 256) are
+pending or a second has passed. Each commit is one fsync (``synchronous=FULL``),
+so a 100k-link batch does not pay a disk flush per transition. A crash loses at
+most the uncommitted tail; those links are downloaded again on resume, and the
+download archive skips any that had in fact finished.
+
+``media-downloader --resume <manifest>`` re-queues every link whose last
+recorded state is ``queued`` or ``started``. Batches read their links lazily,
+so links the batch had not reached yet are not in the manifest; pass the
+original inputs with ``--resume`` and those it has no record of are queued too.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from media_downloader.cache import open_state_database
+
+logger = logging.getLogger("MediaDownloader.manifest")
+
+QUEUED, STARTED, DONE, FAILED = "queued", "started", "done", "failed"
+
+
+class DownloadManifest:
+    """Per-link download states of one batch, appended in committed batches."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        *,
+        batch_events: int | None = None,
+        max_delay: float = 1.0,
+    ):
+        self.path = Path(path)
+        if batch_events is None:
+            try:
+                batch_events = int(
+                    os.environ.get("MEDIA_DOWNLOADER_MANIFEST_BATCH", 256)
+                )
+            except ValueError:
+                batch_events = 256
+        self.batch_events = max(1, batch_events)
+        self.max_delay = max_delay
+        self.commits = 0
+        self._connection: sqlite3.Connection | None = None
+        self._pending: list[tuple] = []
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Worker copies never record (the parent does); they keep the settings.
+        return {
+            "path": self.path,
+            "batch_events": self.batch_events,
+            "max_delay": self.max_delay,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _open(self) -> sqlite3.Connection:
+        # One connection, used under ``_lock`` from whichever thread records.
+        if self._connection is None:
+            connection = open_state_database(self.path, check_same_thread=False)
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY,"
+                " link TEXT NOT NULL, state TEXT NOT NULL, path TEXT, error TEXT,"
+                " at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS events_by_link ON events (link, seq)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def record(
+        self,
+        link: str,
+        state: str,
+        *,
+        path: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        """Append one transition; it is committed with the next batch."""
+        with self._lock:
+            self._pending.append((link, state, path, error, time.time()))
+            if (
+                len(self._pending) >= self.batch_events
+                or time.monotonic() - self._last_commit >= self.max_delay
+            ):
+                self._commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def remove(self) -> None:
+        """Close the manifest and delete its files: nothing is left to resume."""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            self.path.with_name(self.path.name + suffix).unlink(missing_ok=True)
+
+    def _commit(self) -> None:
+        rows, self._pending = self._pending, []
+        self._last_commit = time.monotonic()
+        if not rows:
+            return
+        try:
+            connection = self._open()
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO events (link, state, path, error, at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(
+                "Download manifest unavailable: error_type=%s", type(e).__name__
+            )
+            return
+        self.commits += 1
+
+    def unfinished(self) -> list[str]:
+        """Links last seen ``queued`` or ``started``, in the order first queued."""
+        return [link for link, _ in self._latest((QUEUED, STARTED))]
+
+    def unseen(self, links: Iterable[str]) -> Iterator[str]:
+        """The ``links`` this manifest has no record of, read lazily."""
+        for link in links:
+            with self._lock:
+                if any(row[0] == link for row in self._pending):
+                    continue
+                try:
+                    seen = (
+                        self._open()
+                        .execute("SELECT 1 FROM events WHERE link = ? LIMIT 1", (link,))
+                        .fetchone()
+                    )
+                except sqlite3.Error as e:
+                    logger.warning(
+                        "Download manifest unavailable: error_type=%s", type(e).__name__
+                    )
+                    seen = None
+            if seen is None:
+                yield link
+
+    def summary(self) -> dict[str, int]:
+        """How many links are in each state."""
+        counts = dict.fromkeys((QUEUED, STARTED, DONE, FAILED), 0)
+        for _, state in self._latest((QUEUED, STARTED, DONE, FAILED)):
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def _latest(self, states: tuple[str, ...]) -> list[tuple[str, str]]:
+        marks = ", ".join("?" for _ in states)
+        with self._lock:
+            self._commit()
+            if self._connection is None and not self.path.exists():
+                return []
+            try:
+                return (
+                    self._open()
+                    .execute(
+                        "SELECT e.link, e.state FROM events e JOIN"
+                        " (SELECT link, MIN(seq) AS first, MAX(seq) AS last"
+                        "  FROM events GROUP BY link) g ON e.seq = g.last"
+                        f" WHERE e.state IN ({marks}) ORDER BY g.first",
+                        states,
+                    )
+                    .fetchall()
+                )
+            except sqlite3.Error as e:
+                logger.warning(
+                    "Download manifest unavailable: error_type=%s", type(e).__name__
+                )
+                return []
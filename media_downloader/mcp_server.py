@@ -19,6 +19,7 @@
 Wraps the MediaDownloader class using yt-dlp to download video or audio from various platforms.
 """
 
+import asyncio
 import logging
 import os
 import sys
@@ -31,7 +32,9 @@
 from fastmcp.utilities.logging import get_logger
 from pydantic import Field
 
+from media_downloader.cache import InfoCache, state_directory
 from media_downloader.media_downloader import MediaDownloader
+from media_downloader.security import resolve_output_directory
 
 __version__ = "4.0.0"
 
@@ -44,6 +47,12 @@ def get_client() -> MediaDownloader:
     return MediaDownloader(links=[])
 
 
+def _info_cache_stats() -> dict[str, int]:
+    """Info cache counters for the configured output root, read-only."""
+    root, _ = resolve_output_directory(None)
+    return InfoCache(state_directory(root) / "info.sqlite3").stats()
+
+
 def register_prompts(mcp: FastMCP):
     @mcp.prompt
     def download_video(video_url: str) -> str:
@@ -75,6 +84,10 @@ async def download_media(
         audio_only: bool = Field(
             default=False, description="Extract audio and convert to MP3"
         ),
+        use_archive: bool = Field(
+            default=True,
+            description="Skip media already in the download archive; false re-downloads",
+        ),
         ctx: Context | None = Field(
             default=None, description="MCP context for progress reporting"
         ),
@@ -90,9 +103,14 @@ async def download_media(
                 links=[video_url],
                 download_directory=download_directory,
                 audio=audio_only,
+                use_archive=use_archive,
             )
 
-            result_file = downloader.download_all()
+            # Runs on the shared download executor so this tool call never blocks
+            # the FastMCP event loop (other tools, prompts, health checks).
+            result_file = await downloader.download_all_async(
+                report_progress=ctx.report_progress if ctx else None
+            )
             if result_file and os.path.exists(result_file):
                 relative_file = os.path.relpath(
                     result_file, downloader.output_root
@@ -114,6 +132,20 @@ async def download_media(
             logger.error("Download error (%s)", type(e).__name__)
             return {"status": "error", "message": "Download request failed"}
 
+    @mcp.tool(name="download_status")
+    async def download_status() -> dict:
+        """Report download engine state: host limits, workers, info cache, KG queue."""
+        from media_downloader.kg_media import ingest_queue
+        from media_downloader.scheduling import host_scheduler
+        from media_downloader.workers import shared_pool
+
+        return {
+            "host_limits": host_scheduler().snapshot(),
+            "workers": shared_pool().stats(),
+            "info_cache": await asyncio.to_thread(_info_cache_stats),
+            "kg_ingest": ingest_queue().stats(),
+        }
+
     registered_tags = register_tool_surface(
         mcp,
         client_cls=MediaDownloader,
@@ -2,26 +2,181 @@
 
 
 import argparse
+import asyncio
 import logging
 import os
+import queue
 import re
+import shutil
 import sys
-from multiprocessing import Pool
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import chain
+from pathlib import Path
 from urllib.parse import urlsplit
 
 import yt_dlp
-
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.utils import locked_file, sanitize_filename
+
+try:
+    from yt_dlp.networking._requests import RequestsRH
+except ImportError:  # pragma: no cover
+    RequestsRH = None
+
+from media_downloader.archive import DownloadArchive
+from media_downloader.cache import (
+    InfoCache,
+    MetadataCache,
+    cacheable_info,
+    state_directory,
+)
+from media_downloader.digest import DigestPP, DigestTee
+from media_downloader.links import canonical_media_id, read_links, unique_links
+from media_downloader.manifest import (
+    DONE,
+    FAILED,
+    QUEUED,
+    STARTED,
+    DownloadManifest,
+)
+from media_downloader.retry import RetryPolicy, classify_error
+from media_downloader.scheduling import host_scheduler, is_throttle_error, link_host
 from media_downloader.security import (
     MediaSecurityError,
     contained_output_path,
+    pin_connections,
     public_source_url,
     resolve_output_directory,
     safe_metadata_get,
     validate_media_url,
 )
+from media_downloader.spool import IngestSpool
+from media_downloader.workers import shared_pool
 
 __version__ = "4.0.0"
 
+_ASYNC_EXECUTOR: ThreadPoolExecutor | None = None
+_ASYNC_EXECUTOR_LOCK = threading.Lock()
+
+
+def _async_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor that runs downloads off the event loop."""
+    global _ASYNC_EXECUTOR
+    with _ASYNC_EXECUTOR_LOCK:
+        if _ASYNC_EXECUTOR is None:
+            workers = max(
+                1, int(os.environ.get("MEDIA_DOWNLOADER_ASYNC_WORKERS", "32"))
+            )
+            _ASYNC_EXECUTOR = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="media-download"
+            )
+        return _ASYNC_EXECUTOR
+
+
+def _batch_window() -> int:
+    """Most links of one batch held at once (``MEDIA_DOWNLOADER_BATCH_WINDOW``)."""
+    try:
+        return max(1, int(os.environ.get("MEDIA_DOWNLOADER_BATCH_WINDOW", "1000")))
+    except ValueError:
+        return 1000
+
+
+def _final_download(info) -> tuple[str | None, tuple[str, int] | None]:
+    """Path and ``(sha256, size)`` of the file a processed info dict produced."""
+    if not isinstance(info, dict):
+        return None, None
+    for download in info.get("requested_downloads") or [info]:
+        if download.get("filepath"):
+            return download["filepath"], download.get("__media_digest")
+    return None, None
+
+
+def _staging_name(info) -> str:
+    """The name a download is staged under, the same for every attempt.
+
+    Derived from the extractor, media ID and format only, so a retry with a
+    different output template resumes the ``.part`` file an earlier attempt
+    left behind instead of starting over.
+    """
+    stem = "-".join(
+        str(part)
+        for part in (info.get("extractor_key"), info["id"], info.get("format_id"))
+        if part
+    )
+    return f"{sanitize_filename(stem, restricted=True)}.{info.get('ext') or 'unknown_video'}"
+
+
+@contextmanager
+def _staging_lock(staging: str, info):
+    """Hold the staging files of ``info``'s media for one download at a time.
+
+    Staged names are shared by every attempt at a media item, so two
+    concurrent downloads of it (from any process) would write the same
+    ``.part`` file. The lock file is removed by its holder; a waiter that
+    wakes up holding a lock on a removed file locks the new one instead.
+    """
+    key = sanitize_filename(
+        f"{info.get('extractor_key') or ''}-{info['id']}", restricted=True
+    )
+    path = os.path.join(staging, f".{key}.lock")
+    os.makedirs(staging, exist_ok=True)
+    while True:
+        with locked_file(path, "a", block=True) as fh:
+            try:
+                current = os.path.samestat(os.fstat(fh.fileno()), os.stat(path))
+            except FileNotFoundError:
+                current = False
+            if not current:
+                continue
+            try:
+                yield
+            finally:
+                try:
+                    os.unlink(path)
+                except OSError:  # still open elsewhere (Windows); left for reuse
+                    pass
+            return
+
+
+def _place_copy(source: Path, target: Path) -> None:
+    """Hard-link ``source`` to ``target``, copying across filesystems."""
+    try:
+        os.link(source, target)
+    except OSError:
+        try:
+            shutil.copy2(source, target)
+        except OSError:
+            target.unlink(missing_ok=True)
+            raise
+
+
+class _StagedRenamePP(PostProcessor):
+    """Last ``post_process`` step: move the staged file to its templated name.
+
+    The name comes from the output template in effect for this attempt, after
+    every other post-processor has settled the extension. If the move fails,
+    the finished file stays staged and the next attempt reuses it.
+    """
+
+    def run(self, info):
+        path, staging = info.get("filepath"), self.get_param("staging_directory")
+        if not path or not staging:
+            return [], info
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(staging):
+            return [], info
+        final = self._downloader.prepare_filename(info)
+        os.makedirs(os.path.dirname(os.path.abspath(final)), exist_ok=True)
+        shutil.move(path, final)
+        info["filepath"] = final
+        return [], info
+
 
 class YtDlpLogger:
     def __init__(self, logger):
@@ -37,8 +192,58 @@ def error(self, msg):
         self.logger.error("yt-dlp error event")
 
 
+if RequestsRH is not None:
+
+    class PinnedRequestsRH(RequestsRH):
+        """yt-dlp's requests handler, connecting only to validated addresses."""
+
+        def _create_instance(self, *args, **kwargs):
+            session = super()._create_instance(*args, **kwargs)
+            for adapter in session.adapters.values():
+                pin_connections(adapter)
+            return session
+
+else:  # pragma: no cover — yt-dlp always ships the requests backend with [default]
+    PinnedRequestsRH = None
+
+
 class SafeYoutubeDL(yt_dlp.YoutubeDL):
-    """Revalidate every URL crossing yt-dlp's central request boundary."""
+    """Revalidate every URL crossing yt-dlp's central request boundary.
+
+    Requests go through :class:`PinnedRequestsRH` only, so every connection is
+    made to an address that passed validation instead of a fresh DNS answer.
+    Downloads are hashed as they are written (see :mod:`media_downloader.digest`).
+    With a ``staging_directory`` parameter, files are downloaded there under
+    :func:`_staging_name` and only take their templated name once
+    post-processing is done; :func:`_staging_lock` keeps concurrent downloads
+    of the same media from sharing those files.
+    """
+
+    def __init__(self, params=None, auto_init=True):
+        super().__init__(params, auto_init)
+        self.digest_tee = DigestTee()
+        self.add_progress_hook(self.digest_tee.progress_hook)
+        if self.params.get("staging_directory"):
+            self.add_post_processor(_StagedRenamePP(self), when="post_process")
+        self.add_post_processor(DigestPP(self.digest_tee), when="after_move")
+
+    def process_info(self, info_dict):
+        staging = self.params.get("staging_directory")
+        if not staging or not info_dict.get("id"):
+            return super().process_info(info_dict)
+        with _staging_lock(staging, info_dict):
+            return super().process_info(info_dict)
+
+    def prepare_filename(self, info_dict, dir_type="", *, outtmpl=None, warn=False):
+        staging = self.params.get("staging_directory")
+        if dir_type == "temp" and staging and outtmpl is None and info_dict.get("id"):
+            return os.path.join(staging, _staging_name(info_dict))
+        return super().prepare_filename(info_dict, dir_type, outtmpl=outtmpl, warn=warn)
+
+    def build_request_director(self, handlers, preferences=None):
+        if PinnedRequestsRH is not None:
+            handlers = [PinnedRequestsRH]
+        return super().build_request_director(handlers, preferences)
 
     def urlopen(self, req):
         request_url = req if isinstance(req, str) else getattr(req, "url", None)
@@ -52,6 +257,29 @@ def urlopen(self, req):
         return response
 
 
+@dataclass
+class DownloadResult:
+    """Outcome of one queued link, produced as soon as that link finishes."""
+
+    link: str
+    path: str | None = None
+    size_bytes: int = 0
+    elapsed: float = 0.0
+    error: str | None = None
+    throttled: bool = False
+    kg_asset: dict | None = None
+    archived: bool = False
+    digest: str | None = None
+    # Set when KG ingestion was left to the parent (see ``download_iter``).
+    ingest_info: dict | None = None
+    # Resolves to ``kg_asset`` once the background ingest queue stored the file.
+    kg_future: Future | None = field(default=None, repr=False, compare=False)
+
+    def __getstate__(self):
+        # Futures stay in the process that created them.
+        return {**self.__dict__, "kg_future": None}
+
+
 class MediaDownloader:
     def __init__(
         self,
@@ -60,17 +288,36 @@ def __init__(
         audio: bool = False,
         ingest_to_kg: bool = True,
         output_root: str | None = None,
+        use_archive: bool = True,
+        manifest: str | os.PathLike | None = None,
     ):
         self.links = links if links is not None else []
         self.output_root, output_directory = resolve_output_directory(
             download_directory, output_root=output_root
         )
         self.download_directory = str(output_directory)
+        self.metadata_cache = MetadataCache(
+            state_directory(self.output_root) / "metadata.sqlite3"
+        )
+        self.info_cache = InfoCache(state_directory(self.output_root) / "info.sqlite3")
+        # Media already downloaded under this root is skipped before any request.
+        self.use_archive = use_archive
+        self.archive = DownloadArchive(
+            state_directory(self.output_root) / "archive.sqlite3"
+        )
+        # Downloads the KG could not ingest wait here for ``--replay-ingest``.
+        self.ingest_spool = IngestSpool(
+            state_directory(self.output_root) / "ingest-spool.sqlite3"
+        )
+        # Per-link states of each batch, for ``--resume`` after a crash.
+        self.manifest = DownloadManifest(manifest) if manifest is not None else None
         self.audio = audio
         # Native KG ingestion is on by default; it auto-no-ops when no epistemic-graph
         # engine is reachable, so it costs nothing without KG infrastructure.
         self.ingest_to_kg = ingest_to_kg
         self.last_kg_asset: dict | None = None
+        self._defer_ingest = False
+        self.results: list[DownloadResult] = []
         self.logger = logging.getLogger("MediaDownloader")
         self.progress_callback = None
 
@@ -78,19 +325,25 @@ def set_progress_callback(self, callback):
         self.progress_callback = callback
 
     def open_file(self, file):
-        youtube_urls = open(file)
-        for url in youtube_urls:
-            self.links.append(url)
-        self.links = list(dict.fromkeys(self.links))
-
-    def download_video(self, link):
+        """Queue the links in ``file`` (see :func:`read_links`), once per media."""
+        self.links = list(unique_links(chain(self.links, read_links(file))))
+
+    def download_video(self, link, result: DownloadResult | None = None):
+        started = time.time()
+        page_link = link.strip()
+        archived = self._archived_path(page_link)
+        if archived is not None:
+            self.logger.debug("Media already archived; skipping the download")
+            if result is not None:
+                result.archived = True
+            return archived
         link = validate_media_url(link.strip())
         self.logger.debug("Downloading media from host %s", urlsplit(link).hostname)
         outtmpl = f"{self.download_directory}/%(uploader)s - %(title)s.%(ext)s"
         host = (urlsplit(link).hostname or "").lower()
         if host == "rumble.com" or host.endswith(".rumble.com"):
             self.logger.debug("Processing Rumble media URL")
-            rumble_url = safe_metadata_get(link, timeout=10)
+            rumble_url = safe_metadata_get(link, timeout=10, cache=self.metadata_cache)
             for rumble_embedded_url in rumble_url.text.split(","):
                 if "embedUrl" in rumble_embedded_url:
                     rumble_embedded_url = re.sub(
@@ -110,6 +363,9 @@ def download_video(self, link):
             "restrictfilenames": True,
             "windowsfilenames": True,
             "noplaylist": True,
+            # Every attempt stages under one name per media ID and resumes its
+            # partial data; only the final rename uses the output template.
+            "staging_directory": str(state_directory(self.output_root) / "staging"),
         }
         if self.audio:
             ydl_opts["postprocessors"] = [
@@ -120,51 +376,177 @@ def download_video(self, link):
                 }
             ]
 
-        try:
-            with SafeYoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(link, download=True)
-                path = ydl.prepare_filename(info)
-                path = str(contained_output_path(path, self.output_root))
-                self._maybe_ingest(path, info, link)
-                return path
-        except Exception as e:
-            self.logger.error("Media download failed (%s)", type(e).__name__)
+        policy = RetryPolicy()
+        attempt = 1
+        while True:
             try:
-                outtmpl = f"{self.download_directory}/%(id)s.%(ext)s"
-                ydl_opts["outtmpl"] = outtmpl
-                with SafeYoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(link, download=True)
-                    path = ydl.prepare_filename(info)
-                    path = str(contained_output_path(path, self.output_root))
-                    self._maybe_ingest(path, info, link)
-                    return path
+                path = self._run_download(ydl_opts, link, result)
             except Exception as e:
-                self.logger.error("Media download retry failed (%s)", type(e).__name__)
-                return None
-
-    def _maybe_ingest(self, path, info, link):
-        """Natively store a freshly downloaded file into the knowledge graph.
+                if result is not None:
+                    result.throttled = result.throttled or is_throttle_error(e)
+                wait = policy.delay(attempt, e)
+                if wait is None:
+                    self.logger.error(
+                        "Media download failed after %s attempt(s) (%s, %s)",
+                        attempt,
+                        type(e).__name__,
+                        classify_error(e),
+                    )
+                    if result is not None:
+                        result.error = type(e).__name__
+                    return None
+                self.logger.error(
+                    "Media download failed (%s); retrying in %.1fs",
+                    type(e).__name__,
+                    wait,
+                )
+                policy.sleep(wait)
+            else:
+                if self.use_archive and path and link != page_link:
+                    # Rumble pages download through their embed URL; archive
+                    # the page's ID too, so the page link is skipped next time.
+                    self.archive.record(
+                        [canonical_media_id(page_link)],
+                        self.download_kind,
+                        path,
+                        digest=result.digest if result is not None else None,
+                    )
+                return path
+            # Info extracted by this call is reused by the retry; older info may
+            # carry expired format URLs, so it is extracted again.
+            media_id = canonical_media_id(link)
+            if media_id:
+                self.info_cache.discard(media_id, stored_before=started)
+            # Retries only change the final name; the staged partial is resumed.
+            ydl_opts["outtmpl"] = f"{self.download_directory}/%(id)s.%(ext)s"
+            attempt += 1
+
+    @property
+    def download_kind(self) -> str:
+        return "audio" if self.audio else "video"
+
+    def _archived_path(self, link: str) -> str | None:
+        if not self.use_archive:
+            return None
+        media_id = canonical_media_id(link)
+        entry = self.archive.lookup(media_id, self.download_kind) if media_id else None
+        if entry is None:
+            return None
+        try:
+            path = contained_output_path(entry.path, self.output_root)
+        except MediaSecurityError:
+            return None
+        directory = Path(self.download_directory)
+        if path.parent == directory:
+            return str(path)
+        # Archived under another directory: place it here without downloading.
+        target = directory / path.name
+        try:
+            if target.is_symlink() or target.exists():
+                # Never write over a file already here; reuse it if it matches.
+                if target.is_symlink() or target.stat().st_size != entry.size_bytes:
+                    return None
+            else:
+                _place_copy(path, target)
+        except OSError as e:
+            self.logger.debug(
+                "Cannot place archived media here: error_type=%s", type(e).__name__
+            )
+            return None
+        return str(target)
+
+    def _run_download(self, ydl_opts, link, result=None):
+        media_id = canonical_media_id(link)
+        with SafeYoutubeDL(ydl_opts) as ydl:
+            info = self.info_cache.get(media_id) if media_id else None
+            if info is None:
+                info = ydl.extract_info(link, download=False, process=False)
+                if media_id and info and cacheable_info(info):
+                    info = ydl.sanitize_info(info)
+                    self.info_cache.put(media_id, info)
+            info = ydl.process_ie_result(info, download=True)
+            path, digest = _final_download(info)
+            path = path or ydl.prepare_filename(info)
+            path = str(contained_output_path(path, self.output_root))
+        if result is not None and digest is not None:
+            result.digest = digest[0]
+        if self._defer_ingest and result is not None and self.ingest_to_kg:
+            from media_downloader.kg_media import trim_info
+
+            result.ingest_info = trim_info(info if isinstance(info, dict) else None)
+        else:
+            self._maybe_ingest(path, info, link, digest=digest, result=result)
+        if self.use_archive and isinstance(info, dict):
+            media_ids = [media_id]
+            if info.get("extractor_key") and info.get("id"):
+                media_ids.append(f"{info['extractor_key']}:{info['id']}")
+            self.archive.record(
+                media_ids,
+                self.download_kind,
+                path,
+                digest=digest[0] if digest else None,
+            )
+        return path
+
+    def _maybe_ingest(self, path, info, link, digest=None, result=None):
+        """Queue a freshly downloaded file for native knowledge-graph storage.
 
         Default-on and best-effort: no-ops when ``ingest_to_kg`` is off or no live
-        epistemic-graph engine is reachable. Records the result on
-        ``self.last_kg_asset`` (``{asset_id, digest, size_bytes, media_type}``).
+        epistemic-graph engine is reachable. The file goes to the background
+        :func:`ingest_queue`, so the download slot is released at once; the
+        returned ``Future`` (also ``result.kg_future``) resolves to the asset
+        (``{asset_id, digest, size_bytes, media_type}``), which is then recorded
+        on ``self.last_kg_asset`` and ``result.kg_asset``.
         """
         if not self.ingest_to_kg or not path:
-            return
-        from media_downloader.kg_media import ingest_media_file
+            return None
+        from media_downloader.kg_media import ingest_queue
+
+        recorded: Future = Future()
+
+        def _ingested(done):
+            asset = done.result()
+            if asset is not None:
+                self.last_kg_asset = asset
+            else:
+                self._spool_ingest(path, info, link, digest)
+            if result is not None:
+                result.kg_asset = asset
+            recorded.set_result(asset)
+
+        ingest_queue().submit(
+            path, info=info, source_url=public_source_url(link), digest=digest
+        ).add_done_callback(_ingested)
+        if result is not None:
+            result.kg_future = recorded
+        return recorded
+
+    def _spool_ingest(self, path, info, link, digest=None):
+        """Keep a download the KG did not take so it can be replayed later.
+
+        Only spooled when agent-utilities is installed: without it there is no
+        engine to replay into.
+        """
+        from media_downloader.kg_media import kg_stack_installed, trim_info
 
-        self.last_kg_asset = ingest_media_file(
-            path, info=info, source_url=public_source_url(link)
+        if not kg_stack_installed():
+            return
+        self.ingest_spool.add(
+            path,
+            info=trim_info(info if isinstance(info, dict) else None),
+            source_url=public_source_url(link),
+            digest=digest[0] if digest else None,
         )
 
     def get_channel_videos(self, channel, limit=-1):
         self.logger.debug("Fetching videos for a channel (limit=%s)", limit)
         username = channel
-        attempts = 0
-        while attempts < 3:
+        policy = RetryPolicy()
+        attempt = 1
+        while True:
             url = f"https://www.youtube.com/user/{username}/videos"
             self.logger.debug("Trying a canonical YouTube channel URL")
-            page = safe_metadata_get(url, timeout=10).content
+            page = safe_metadata_get(url, timeout=10, cache=self.metadata_cache).content
             data = str(page).split(" ")
             item = 'href="/watch?'
             vids = [
@@ -181,7 +563,9 @@ def get_channel_videos(self, channel, limit=-1):
             else:
                 url = f"https://www.youtube.com/c/{channel}/videos"
                 self.logger.debug("Trying the alternate canonical YouTube channel URL")
-                page = safe_metadata_get(url, timeout=10).content
+                page = safe_metadata_get(
+                    url, timeout=10, cache=self.metadata_cache
+                ).content
                 data = str(page).split(" ")
                 item = "https://i.ytimg.com/vi/"
                 vids = []
@@ -205,7 +589,10 @@ def get_channel_videos(self, channel, limit=-1):
                             self.links.append(vid)
                         x += 1
                     return
-            attempts += 1
+            # Neither page listed videos; ask again after a backoff.
+            if not policy.backoff(attempt):
+                break
+            attempt += 1
         self.logger.error("Could not find the requested channel")
 
     def progress_hook(self, d):
@@ -219,25 +606,267 @@ def progress_hook(self, d):
             if self.progress_callback:
                 self.progress_callback(progress=100, total=100)
 
+    def download_result(self, link) -> DownloadResult:
+        """Download one link and describe the outcome; never raises."""
+        result = DownloadResult(link=link)
+        started = time.monotonic()
+        try:
+            result.path = self.download_video(link, result=result)
+        except Exception as e:
+            self.logger.error("Media download rejected (%s)", type(e).__name__)
+            result.error = type(e).__name__
+            result.throttled = is_throttle_error(e)
+        result.elapsed = time.monotonic() - started
+        if result.path:
+            try:
+                result.size_bytes = os.path.getsize(result.path)
+            except OSError:
+                pass
+        return result
+
+    def download_iter(
+        self, links: Iterable[str] | None = None
+    ) -> Iterator[DownloadResult]:
+        """Download every queued link, yielding each result as it completes.
+
+        Results arrive in completion order, so callers can start on finished
+        files while slower links are still downloading. Links are dispatched
+        round-robin across hosts, each host bounded by its adaptive limit in the
+        shared :func:`host_scheduler`.
+
+        ``links`` (default: the queued ``self.links``) may be any iterable, such
+        as a generator over a link file. It is read lazily, and no more than
+        ``MEDIA_DOWNLOADER_BATCH_WINDOW`` links (default 1000) are held at once
+        (waiting, downloading or ingesting), so memory stays flat however long
+        the batch is.
+
+        Workers leave KG ingestion to this process, which hands finished files
+        to the background :func:`ingest_queue` (grouping them into shared store
+        transactions); a result is yielded once its file has been ingested.
+        """
+        if links is None:
+            links, self.links = self.links, []
+        source: Iterator[str] | None = iter(links)
+        window = _batch_window()
+        self.logger.debug("Downloading links, at most %s at a time", window)
+        waiting: dict[str, deque] = {}
+        # Links read from ``source`` whose result has not been yielded yet.
+        admitted = 0
+
+        def _admit():
+            nonlocal admitted, source
+            while source is not None and admitted < window:
+                try:
+                    link = next(source)
+                except StopIteration:
+                    source = None
+                    break
+                waiting.setdefault(link_host(link), deque()).append(link)
+                admitted += 1
+                if self.manifest is not None:
+                    self.manifest.record(link, QUEUED)
+
+        scheduler = host_scheduler()
+        pool = shared_pool()
+        finished: queue.SimpleQueue = queue.SimpleQueue()
+        in_flight = 0
+        ingesting = 0
+        ingest = None
+        if self.ingest_to_kg:
+            from media_downloader.kg_media import ingest_queue
+
+            ingest = ingest_queue()
+
+        def _finished(host, result):
+            # Released by the worker's callback, not the consumer: a caller that
+            # stops iterating must not strand the slots of links still running.
+            scheduler.release(
+                host, success=result.error is None, throttled=result.throttled
+            )
+            finished.put(result)
+
+        def _dispatch(host):
+            link = waiting[host].popleft()
+            if not waiting[host]:
+                del waiting[host]
+            if self.manifest is not None:
+                self.manifest.record(link, STARTED)
+            pool.submit(
+                self.download_result,
+                link,
+                partial(_finished, host),
+                lambda e: _finished(
+                    host, DownloadResult(link=link, error=type(e).__name__)
+                ),
+            )
+
+        def _ingested(result, future):
+            result.kg_asset = future.result()
+            if result.kg_asset is None:
+                self._spool_ingest(
+                    result.path,
+                    result.ingest_info,
+                    result.link,
+                    (result.digest, result.size_bytes) if result.digest else None,
+                )
+            finished.put(("ingested", result))
+
+        self._defer_ingest = ingest is not None
+        try:
+            while True:
+                _admit()
+                if not admitted:
+                    break
+                dispatched = True
+                while dispatched and waiting and in_flight < pool.processes:
+                    dispatched = False
+                    for host in list(waiting):
+                        if in_flight < pool.processes and scheduler.try_acquire(host):
+                            _dispatch(host)
+                            in_flight += 1
+                            dispatched = True
+                if waiting and not in_flight:
+                    # Every slot for our hosts is held elsewhere (other batches or
+                    # MCP calls share the scheduler); wait for one to free up.
+                    host = next(iter(waiting))
+                    scheduler.acquire(host)
+                    _dispatch(host)
+                    in_flight += 1
+                if not waiting and not in_flight:
+                    # Nothing left to download: commit the tail batch now.
+                    ingest.flush()
+                event = finished.get()
+                if isinstance(event, tuple):
+                    ingesting -= 1
+                    admitted -= 1
+                    self._record_finished(event[1])
+                    yield event[1]
+                    continue
+                result = event
+                in_flight -= 1
+                if result.ingest_info is not None and result.path:
+                    ingesting += 1
+                    ingest.submit(
+                        result.path,
+                        info=result.ingest_info,
+                        source_url=public_source_url(result.link),
+                        digest=(result.digest, result.size_bytes)
+                        if result.digest
+                        else None,
+                    ).add_done_callback(partial(_ingested, result))
+                    continue
+                admitted -= 1
+                self._record_finished(result)
+                yield result
+        finally:
+            self._defer_ingest = False
+            if self.manifest is not None:
+                self.manifest.flush()
+
+    def _record_finished(self, result: DownloadResult) -> None:
+        if self.manifest is None:
+            return
+        if result.error is None and result.path:
+            self.manifest.record(result.link, DONE, path=result.path)
+        else:
+            self.manifest.record(result.link, FAILED, error=result.error)
+
     def download_all(self):
-        self.logger.debug(f"Downloading {len(self.links)} links")
-        if len(self.links) > 1_000:
-            raise MediaSecurityError("Media link count limit exceeded")
-        max_workers = max(
-            1, min(int(os.environ.get("MEDIA_DOWNLOADER_MAX_WORKERS", "4")), 4)
-        )
-        worker_count = min(max_workers, max(1, len(self.links)))
-        pool = Pool(processes=worker_count)
+        """Download every queued link; keep all results on ``self.results``.
+
+        Returns the first downloaded file that exists, or ``None``.
+        """
+        return self._collect_results(list(self.download_iter()))
+
+    def _collect_results(self, results):
+        self.results = results
+        for result in results:
+            if result.path and os.path.exists(result.path):
+                if result.kg_asset:
+                    self.last_kg_asset = result.kg_asset
+                return result.path
+        return None
+
+    async def download_async(self, link) -> DownloadResult:
+        """Download one link off the event loop.
+
+        The host slot is awaited on the loop, so threads of the shared executor
+        only ever run downloads that already hold one: callers queued behind a
+        busy host never stall callers for other hosts.
+        """
+        host = link_host(link)
+        scheduler = host_scheduler()
+        await scheduler.acquire_async(host)
+        result = DownloadResult(link=link, error="Interrupted")
         try:
-            results = pool.map(self.download_video, self.links)
-            self.links = []
-            for result in results:
-                if result and os.path.exists(result):
-                    return result
-            return None
+            result = await asyncio.get_running_loop().run_in_executor(
+                _async_executor(), self._recorded_result, link
+            )
         finally:
-            pool.close()
-            pool.join()
+            scheduler.release(
+                host, success=result.error is None, throttled=result.throttled
+            )
+        return result
+
+    def _recorded_result(self, link) -> DownloadResult:
+        if self.manifest is not None:
+            self.manifest.record(link, STARTED)
+        result = self.download_result(link)
+        self._record_finished(result)
+        return result
+
+    async def download_all_async(self, report_progress=None, links=None):
+        """Awaitable ``download_all`` that never blocks the running event loop.
+
+        Every link runs on the shared download executor, so concurrent callers in
+        one process (e.g. MCP tool calls) do not queue behind each other.
+        ``report_progress`` may be a coroutine function such as
+        ``ctx.report_progress``; yt-dlp progress events are forwarded to it on the
+        calling loop. As in :meth:`download_iter`, ``links`` is read lazily and
+        at most ``MEDIA_DOWNLOADER_BATCH_WINDOW`` of them are in flight.
+        """
+        if links is None:
+            links, self.links = self.links, []
+        window = _batch_window()
+        self.logger.debug(
+            "Downloading links asynchronously, at most %s at a time", window
+        )
+        if report_progress is not None:
+            loop = asyncio.get_running_loop()
+
+            def _forward_progress(progress, total=None):
+                asyncio.run_coroutine_threadsafe(
+                    report_progress(progress=progress, total=total), loop
+                )
+
+            self.set_progress_callback(_forward_progress)
+        results: list[DownloadResult | None] = []
+        running: dict[asyncio.Future, int] = {}
+
+        async def _settle(when):
+            done, _ = await asyncio.wait(running, return_when=when)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+        for link in links:
+            if len(running) >= window:
+                await _settle(asyncio.FIRST_COMPLETED)
+            if self.manifest is not None:
+                self.manifest.record(link, QUEUED)
+            running[asyncio.ensure_future(self.download_async(link))] = len(results)
+            results.append(None)
+        if running:
+            await _settle(asyncio.ALL_COMPLETED)
+        pending = [r.kg_future for r in results if r.kg_future is not None]
+        if pending:
+            # Downloads are done and their slots free; commit what they queued.
+            from media_downloader.kg_media import ingest_queue
+
+            await asyncio.to_thread(ingest_queue().flush)
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending))
+        if self.manifest is not None:
+            await asyncio.to_thread(self.manifest.flush)
+        return self._collect_results(list(results))
 
 
 def media_downloader():
@@ -249,11 +878,37 @@ def media_downloader():
     )
     parser.add_argument("-c", "--channel", help="Download videos from a channel URL")
     parser.add_argument("-d", "--directory", help="Specify download directory")
-    parser.add_argument("-f", "--file", help="Read URLs from a file")
+    parser.add_argument(
+        "-f", "--file", help="Read URLs from a file, gzip file or - for stdin"
+    )
     parser.add_argument(
         "-l", "--links", help="Comma-separated list of URLs to download"
     )
 
+    parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help="Download even if the media is already in the download archive",
+    )
+
+    parser.add_argument(
+        "--replay-ingest",
+        action="store_true",
+        help="Ingest downloads spooled while the knowledge graph was unreachable",
+    )
+
+    parser.add_argument(
+        "--manifest",
+        help="Record each link's progress in this manifest (default: a new one"
+        " under .media-downloader/manifests/, removed if every link succeeds)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        metavar="MANIFEST",
+        help="Continue the unfinished links of an interrupted batch",
+    )
+
     parser.add_argument("--help", action="store_true", help="Show usage")
 
     args = parser.parse_args()
@@ -261,6 +916,9 @@ def media_downloader():
     if hasattr(args, "help") and args.help:
         parser.print_help()
         sys.exit(0)
+    if args.resume and not os.path.isfile(args.resume):
+        # A mistyped path would otherwise start a fresh batch at that path.
+        parser.error(f"--resume: no manifest at {args.resume}")
 
     logger = logging.getLogger("MediaDownloader")
     logger.setLevel(logging.DEBUG)
@@ -274,20 +932,71 @@ def media_downloader():
     )
     handler.setFormatter(formatter)
     logger.addHandler(handler)
-    video_downloader_instance = MediaDownloader(download_directory=args.directory)
+    video_downloader_instance = MediaDownloader(
+        download_directory=args.directory, manifest=args.resume or args.manifest
+    )
+
+    if args.replay_ingest:
+        from media_downloader.spool import replay_spool
+
+        stats = replay_spool(video_downloader_instance.ingest_spool)
+        logger.info(
+            "Replayed %s spooled downloads (%s failed, %s dropped, %s remaining)"
+            " in %ss",
+            stats["replayed"],
+            stats["failed"],
+            stats["dropped"],
+            stats["remaining"],
+            stats["seconds"],
+        )
+        return
 
     if args.audio:
         video_downloader_instance.audio = True
+    if args.no_archive:
+        video_downloader_instance.use_archive = False
     if args.channel:
         video_downloader_instance.get_channel_videos(args.channel)
-    if args.file:
-        video_downloader_instance.open_file(args.file)
     if args.links:
         url_list = args.links.replace(" ", "").split(",")
         video_downloader_instance.links.extend(url_list)
+    links = video_downloader_instance.links
+    if args.file:
+        # Streamed: a link file of any length is never held in memory.
+        links = chain(links, read_links(args.file))
+    links = unique_links(links)
+    manifest = video_downloader_instance.manifest
+    if args.resume:
+        logger.info(
+            "Resuming %s: %s",
+            args.resume,
+            ", ".join(f"{n} {state}" for state, n in manifest.summary().items()),
+        )
+        # Links the interrupted batch never reached are not in the manifest.
+        links = chain(manifest.unfinished(), manifest.unseen(links))
+    created = manifest is None
+    if created:
+        manifest = video_downloader_instance.manifest = DownloadManifest(
+            state_directory(video_downloader_instance.output_root)
+            / "manifests"
+            / f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.sqlite3"
+        )
+    logger.info("Recording progress in %s (resume with --resume)", manifest.path)
 
     logger.info("Kicking off downloads...")
-    video_downloader_instance.download_all()
+    done = failed = 0
+    try:
+        for result in video_downloader_instance.download_iter(links):
+            if result.path:
+                done += 1
+            else:
+                failed += 1
+    finally:
+        manifest.close()
+    logger.info("Downloaded %s links (%s failed)", done, failed)
+    if created and not failed:
+        # Nothing to resume; only batches that left work behind keep theirs.
+        manifest.remove()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+"""When and how long to wait before retrying a failed network request.
+
+Failures fall into three classes:
+
+* **permanent** — retrying cannot help: a security boundary was crossed, the
+  media is removed, private, geo-blocked or unsupported, or the host answered
+  with a client error such as 404;
+* **throttled** — the host asks us to slow down (HTTP 403/429/503, timeouts,
+  see :func:`~media_downloader.scheduling.is_throttle_error`);
+* **transient** — anything else: resets, truncated transfers, server errors.
+
+Permanent failures are never retried. The others wait an exponentially growing,
+jittered delay, doubled when throttled, and capped at ``max_delay``. A
+``Retry-After`` header stretches the wait to what the host asked for. If it
+asks for longer than ``max_retry_after``, the request is given up rather than
+holding a worker.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+from typing import Any, TypeVar
+
+from media_downloader.scheduling import error_causes, error_status, is_throttle_error
+
+logger = logging.getLogger("MediaDownloader.retry")
+
+PERMANENT, THROTTLED, TRANSIENT = "permanent", "throttled", "transient"
+
+# yt-dlp's verdicts that the media itself cannot be fetched.
+_PERMANENT_ERRORS = {"UnsupportedError", "GeoRestrictedError", "UnavailableVideoError"}
+# Transport failures that are not OSError subclasses.
+_NETWORK_ERRORS = {"TransportError", "ContentTooShortError", "IncompleteRead"}
+_PERMANENT_MESSAGE = re.compile(
+    r"unsupported url|video unavailable|private video|has been removed"
+    r"|not available in your country|geo.?restrict",
+    re.IGNORECASE,
+)
+# Client errors that may succeed later.
+_RETRYABLE_CLIENT_STATUSES = {408, 425}
+
+T = TypeVar("T")
+
+
+def classify_error(exc: BaseException) -> str:
+    """``PERMANENT``, ``THROTTLED`` or ``TRANSIENT`` for a failed request."""
+    from media_downloader.security import MediaSecurityError
+
+    causes = list(error_causes(exc))
+    if any(isinstance(cause, MediaSecurityError) for cause in causes):
+        return PERMANENT
+    statuses = {status for cause in causes if (status := error_status(cause))}
+    if is_throttle_error(exc) or 503 in statuses:
+        return THROTTLED
+    if any(
+        400 <= status < 500 and status not in _RETRYABLE_CLIENT_STATUSES
+        for status in statuses
+    ):
+        return PERMANENT
+    if statuses or any(
+        isinstance(cause, OSError) or type(cause).__name__ in _NETWORK_ERRORS
+        for cause in causes
+    ):
+        return TRANSIENT
+    # yt-dlp flags errors it expected (removed, private, ...) once a network
+    # failure is ruled out above, since it also flags those as expected.
+    if any(
+        type(cause).__name__ in _PERMANENT_ERRORS or getattr(cause, "expected", False)
+        for cause in causes
+    ) or _PERMANENT_MESSAGE.search(str(exc)):
+        return PERMANENT
+    return TRANSIENT
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds a ``Retry-After`` header on the failed response asks us to wait."""
+    for cause in error_causes(exc):
+        headers = getattr(getattr(cause, "response", None), "headers", None)
+        if headers is None:
+            headers = getattr(cause, "headers", None)
+        try:
+            value = headers.get("Retry-After") if headers is not None else None
+        except AttributeError:
+            continue
+        if not value:
+            continue
+        value = str(value).strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class RetryPolicy:
+    """Capped exponential backoff with jitter, by failure class.
+
+    ``attempts`` counts the first try (``MEDIA_DOWNLOADER_RETRY_ATTEMPTS``,
+    default 3); delays start at ``base_delay`` seconds
+    (``MEDIA_DOWNLOADER_RETRY_BASE_SECONDS``, default 1) and are capped at
+    ``max_delay`` (``MEDIA_DOWNLOADER_RETRY_MAX_SECONDS``, default 30).
+    ``Retry-After`` is honoured up to ``max_retry_after``
+    (``MEDIA_DOWNLOADER_RETRY_AFTER_MAX_SECONDS``, default 120).
+    """
+
+    def __init__(
+        self,
+        *,
+        attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        max_retry_after: float | None = None,
+        sleep: Callable[[float], Any] | None = None,
+        jitter: Callable[[], float] = random.random,
+    ):
+        if attempts is None:
+            attempts = int(_env_float("MEDIA_DOWNLOADER_RETRY_ATTEMPTS", 3))
+        if base_delay is None:
+            base_delay = _env_float("MEDIA_DOWNLOADER_RETRY_BASE_SECONDS", 1)
+        if max_delay is None:
+            max_delay = _env_float("MEDIA_DOWNLOADER_RETRY_MAX_SECONDS", 30)
+        if max_retry_after is None:
+            max_retry_after = _env_float(
+                "MEDIA_DOWNLOADER_RETRY_AFTER_MAX_SECONDS", 120
+            )
+        self.attempts = max(1, attempts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep or time.sleep
+        self.jitter = jitter
+
+    def delay(self, attempt: int, exc: BaseException | None = None) -> float | None:
+        """Seconds to wait after failed ``attempt`` (1-based); ``None`` to give up.
+
+        Without an exception (an empty answer worth asking again) the failure
+        counts as transient.
+        """
+        kind = classify_error(exc) if exc is not None else TRANSIENT
+        if kind == PERMANENT or attempt >= self.attempts:
+            return None
+        backoff = self.base_delay * 2 ** (attempt - 1)
+        if kind == THROTTLED:
+            backoff *= 2
+        backoff = min(self.max_delay, backoff)
+        # Equal jitter: at least half the backoff, so throttled hosts get a rest.
+        wait = backoff / 2 + self.jitter() * backoff / 2
+        hint = retry_after(exc) if exc is not None else None
+        if hint is not None:
+            if hint > self.max_retry_after:
+                return None
+            wait = max(wait, hint)
+        return wait
+
+    def backoff(self, attempt: int, exc: BaseException | None = None) -> bool:
+        """Sleep before the attempt after ``attempt``; ``False`` to give up."""
+        wait = self.delay(attempt, exc)
+        if wait is None:
+            return False
+        logger.debug(
+            "Retrying after attempt %s/%s (error_type=%s) in %.2fs",
+            attempt,
+            self.attempts,
+            type(exc).__name__ if exc is not None else None,
+            wait,
+        )
+        self.sleep(wait)
+        return True
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """``fn(*args, **kwargs)``, retried per this policy; re-raises the last error."""
+        attempt = 1
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.backoff(attempt, e):
+                    raise
+            attempt += 1
@@ -0,0 +1,203 @@
+"""Per-host download concurrency with AIMD backoff on throttling.
+
+Each host gets its own concurrency limit. A successful download raises the limit
+additively; a throttling signal (HTTP 429/403 or a timeout) cuts it
+multiplicatively, so one busy CDN backs off without slowing the rest of a
+mixed-host batch. Limit state is process-wide and exposed via
+:meth:`HostScheduler.snapshot` for monitoring.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import socket
+import threading
+from dataclasses import asdict, dataclass
+from urllib.parse import urlsplit
+
+_THROTTLE_STATUSES = {403, 429}
+_THROTTLE_MESSAGE = re.compile(r"HTTP Error (?:403|429)\b|timed out", re.IGNORECASE)
+# Idle hosts sitting at their initial limit are forgotten beyond this many.
+_MAX_TRACKED_HOSTS = 4096
+
+
+def link_host(link: str) -> str:
+    """The host a link's concurrency is keyed by (lower-cased, may be empty)."""
+    try:
+        return (urlsplit(str(link).strip()).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def error_causes(exc: BaseException):
+    """``exc`` and every exception it wraps, including yt-dlp's ``exc_info``."""
+    seen: set[int] = set()
+    pending = [exc]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        yield current
+        exc_info = getattr(current, "exc_info", None)
+        if isinstance(exc_info, tuple) and len(exc_info) > 1:
+            pending.append(exc_info[1])
+        pending.extend((current.__cause__, current.__context__))
+
+
+def error_status(exc: BaseException) -> int | None:
+    """The HTTP status an exception carries, if any."""
+    response = getattr(exc, "response", None)
+    for value in (
+        getattr(exc, "status", None),
+        getattr(response, "status_code", None),
+        getattr(response, "status", None),
+        getattr(exc, "code", None),
+    ):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Whether a failure means the host is asking us to slow down."""
+    for cause in error_causes(exc):
+        if isinstance(cause, (TimeoutError, socket.timeout)):
+            return True
+        if type(cause).__name__ in {"Timeout", "ReadTimeout", "ConnectTimeout"}:
+            return True
+        if error_status(cause) in _THROTTLE_STATUSES:
+            return True
+        if _THROTTLE_MESSAGE.search(str(cause)):
+            return True
+    return False
+
+
+@dataclass
+class HostLimit:
+    limit: float
+    in_flight: int = 0
+    successes: int = 0
+    throttles: int = 0
+
+
+class HostScheduler:
+    """Additive-increase / multiplicative-decrease concurrency limits per host."""
+
+    def __init__(
+        self,
+        *,
+        initial: float = 2.0,
+        minimum: float = 1.0,
+        maximum: float | None = None,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+    ):
+        if maximum is None:
+            maximum = float(
+                os.environ.get("MEDIA_DOWNLOADER_HOST_MAX_CONCURRENCY", "4")
+            )
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.initial = min(max(initial, self.minimum), self.maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self._hosts: dict[str, HostLimit] = {}
+        self._changed = threading.Condition()
+        # Futures of coroutines in ``acquire_async``, woken on every release.
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _state(self, host: str) -> HostLimit:
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= _MAX_TRACKED_HOSTS:
+                self._forget_idle_hosts()
+            state = self._hosts[host] = HostLimit(limit=self.initial)
+        return state
+
+    def _forget_idle_hosts(self) -> None:
+        for host, state in list(self._hosts.items()):
+            if not state.in_flight and state.limit >= self.initial:
+                del self._hosts[host]
+
+    def try_acquire(self, host: str) -> bool:
+        """Take a slot for ``host`` if its current limit allows one."""
+        with self._changed:
+            state = self._state(host)
+            if state.in_flight >= int(state.limit):
+                return False
+            state.in_flight += 1
+            return True
+
+    def acquire(self, host: str, timeout: float | None = None) -> bool:
+        """Block until ``host`` has a free slot (or ``timeout`` elapses)."""
+        with self._changed:
+            acquired = self._changed.wait_for(
+                lambda: self._state(host).in_flight < int(self._state(host).limit),
+                timeout=timeout,
+            )
+            if acquired:
+                self._state(host).in_flight += 1
+            return acquired
+
+    async def acquire_async(self, host: str) -> None:
+        """Wait on the running event loop until ``host`` has a free slot.
+
+        Unlike :meth:`acquire`, no thread is parked while waiting, so callers
+        on a shared executor only hand it downloads that already hold a slot.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._changed:
+                state = self._state(host)
+                if state.in_flight < int(state.limit):
+                    state.in_flight += 1
+                    return
+                freed = loop.create_future()
+                self._async_waiters.append((loop, freed))
+            await freed
+
+    def release(self, host: str, *, success: bool = True, throttled: bool = False):
+        """Return a slot and adapt the host's limit to the outcome."""
+        with self._changed:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            if throttled:
+                state.throttles += 1
+                state.limit = max(self.minimum, state.limit * self.decrease)
+            elif success:
+                state.successes += 1
+                state.limit = min(self.maximum, state.limit + self.increase)
+            self._changed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, freed in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, freed)
+            except RuntimeError:
+                # The waiting loop has been closed.
+                pass
+
+    def snapshot(self) -> dict[str, dict]:
+        """Per-host ``{limit, in_flight, successes, throttles}`` for monitoring."""
+        with self._changed:
+            return {host: asdict(state) for host, state in self._hosts.items()}
+
+
+def _wake(freed: asyncio.Future) -> None:
+    if not freed.done():
+        freed.set_result(None)
+
+
+_SCHEDULER: HostScheduler | None = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def host_scheduler() -> HostScheduler:
+    """Return the process-wide per-host scheduler."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = HostScheduler()
+        return _SCHEDULER
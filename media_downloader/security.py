@@ -2,25 +2,52 @@
 
 from __future__ import annotations
 
+import atexit
+import http.cookiejar
 import ipaddress
 import os
 import socket
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from urllib.parse import urljoin, urlsplit, urlunsplit
+from typing import TYPE_CHECKING
+from urllib.parse import SplitResult, urljoin, urlsplit, urlunsplit
 
 import requests
+import urllib3
+
+from media_downloader.retry import RetryPolicy
+
+if TYPE_CHECKING:
+    from media_downloader.cache import MetadataCache
 
 _MAX_REDIRECTS = 5
 _MAX_METADATA_BYTES = 2 * 1024 * 1024
 
 
+_IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+
+# (host, port) -> (expires_at, addresses, all_global) or (expires_at, error, None)
+_RESOLUTION_CACHE: OrderedDict[tuple[str, int], tuple] = OrderedDict()
+_RESOLUTION_CACHE_LOCK = threading.Lock()
+
+
 class MediaSecurityError(ValueError):
     """Raised when a media request crosses an administrator-defined boundary."""
 
 
-def _private_host_allowlist() -> set[str]:
+def _private_host_allowlist() -> frozenset[str]:
+    return _parse_private_host_allowlist(
+        os.environ.get("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "")
+    )
+
+
+@lru_cache(maxsize=8)
+def _parse_private_host_allowlist(raw: str) -> frozenset[str]:
     hosts: set[str] = set()
-    for item in os.environ.get("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "").split(","):
+    for item in raw.split(","):
         host = item.strip().lower().rstrip(".")
         if not host:
             continue
@@ -29,11 +56,225 @@ def _private_host_allowlist() -> set[str]:
                 "Private-host allowlist entries must be exact hosts"
             )
         hosts.add(host)
-    return hosts
+    return frozenset(hosts)
 
 
-def validate_media_url(url: str) -> str:
-    """Validate an HTTP(S) URL and resolve every address before network access."""
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def clear_resolution_cache() -> None:
+    """Forget every cached DNS answer (positive and negative)."""
+    with _RESOLUTION_CACHE_LOCK:
+        _RESOLUTION_CACHE.clear()
+
+
+def _resolve(host: str, port: int) -> tuple[tuple[_IPAddress, ...], bool]:
+    """Resolve ``host`` through a bounded LRU cache with TTL and negative entries.
+
+    Returns the parsed addresses and whether all of them are globally routable.
+    Resolution failures are cached for the (shorter) negative TTL and re-raised.
+    """
+    key = (host, port)
+    with _RESOLUTION_CACHE_LOCK:
+        entry = _RESOLUTION_CACHE.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _RESOLUTION_CACHE.move_to_end(key)
+            if entry[2] is None:
+                raise MediaSecurityError(entry[1])
+            return entry[1], entry[2]
+    try:
+        answers = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise _resolution_failure(key, "Media host could not be resolved") from exc
+    try:
+        addresses = tuple(
+            dict.fromkeys(
+                ipaddress.ip_address(str(item[4][0]).split("%", 1)[0])
+                for item in answers
+            )
+        )
+    except ValueError as exc:
+        raise _resolution_failure(
+            key, "Media host resolved to an invalid address"
+        ) from exc
+    if not addresses:
+        raise _resolution_failure(key, "Media host did not resolve")
+    all_global = all(ip.is_global for ip in addresses)
+    ttl = _env_float("MEDIA_DOWNLOADER_DNS_CACHE_TTL", 60.0)
+    _remember(key, (time.monotonic() + ttl, addresses, all_global))
+    return addresses, all_global
+
+
+def _resolution_failure(key: tuple[str, int], message: str) -> MediaSecurityError:
+    ttl = _env_float("MEDIA_DOWNLOADER_DNS_NEGATIVE_TTL", 5.0)
+    _remember(key, (time.monotonic() + ttl, message, None))
+    return MediaSecurityError(message)
+
+
+def _remember(key: tuple[str, int], entry: tuple) -> None:
+    if entry[0] <= time.monotonic():
+        return  # a zero TTL disables caching
+    limit = max(1, int(_env_float("MEDIA_DOWNLOADER_DNS_CACHE_SIZE", 1024)))
+    with _RESOLUTION_CACHE_LOCK:
+        _RESOLUTION_CACHE[key] = entry
+        _RESOLUTION_CACHE.move_to_end(key)
+        while len(_RESOLUTION_CACHE) > limit:
+            _RESOLUTION_CACHE.popitem(last=False)
+
+
+def validated_addresses(host: str, port: int) -> tuple[_IPAddress, ...]:
+    """Addresses ``host`` may be contacted at, or raise if any is off-limits.
+
+    Shares the resolution cache with :func:`validate_media_url`, so a connection
+    made right after validating its URL reuses that exact answer.
+    """
+    host = host.strip("[]").lower().rstrip(".")
+    allowed_private = host in _private_host_allowlist()
+    addresses, all_global = _resolve(host, port)
+    if not all_global and not allowed_private:
+        raise MediaSecurityError("Media URL resolves to a non-public address")
+    return addresses
+
+
+class _PinnedConnectionMixin:
+    """Connect only to addresses that passed validation for this host.
+
+    ``host`` still drives the Host header, SNI and certificate checks; only the
+    socket's destination is pinned, so DNS is not consulted a second time and a
+    changed answer cannot redirect an already-validated request.
+    """
+
+    def _new_conn(self):
+        # urllib3 derives ``host`` from ``_dns_host``; swap it only while the
+        # socket is opened so SNI, certificate and Host header keep the name.
+        hostname = self._dns_host
+        addresses = validated_addresses(self.host, self.port)
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = str(address)
+                try:
+                    return super()._new_conn()
+                except urllib3.exceptions.NewConnectionError:
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = hostname
+
+
+class _PinnedHTTPConnection(_PinnedConnectionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+
+class _PinnedHTTPSConnection(
+    _PinnedConnectionMixin, urllib3.connection.HTTPSConnection
+):
+    pass
+
+
+class _PinnedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _PinnedHTTPConnection
+
+
+class _PinnedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _PinnedHTTPSConnection
+
+
+def pin_connections(adapter: requests.adapters.HTTPAdapter) -> None:
+    """Make a requests adapter's direct connections use validated addresses."""
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": _PinnedHTTPConnectionPool,
+        "https": _PinnedHTTPSConnectionPool,
+    }
+
+
+class PinnedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """``HTTPAdapter`` whose connections go only to validated addresses."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pin_connections(self)
+
+
+_METADATA_ADAPTER: PinnedHTTPAdapter | None = None
+_METADATA_ADAPTER_LOCK = threading.Lock()
+_METADATA_SESSIONS = threading.local()
+# Bodies up to this size are read off a redirect so its connection is reused.
+_MAX_DRAIN_BYTES = 64 * 1024
+
+
+def _metadata_adapter() -> PinnedHTTPAdapter:
+    """The process-wide keep-alive connection pool shared by metadata requests.
+
+    ``MEDIA_DOWNLOADER_HTTP_POOL_HOSTS`` bounds how many hosts keep a pool and
+    ``MEDIA_DOWNLOADER_HTTP_POOL_SIZE`` how many connections each host may hold;
+    further requests to a saturated host wait for a connection to come back.
+    """
+    global _METADATA_ADAPTER
+    with _METADATA_ADAPTER_LOCK:
+        if _METADATA_ADAPTER is None:
+            _METADATA_ADAPTER = PinnedHTTPAdapter(
+                pool_connections=max(
+                    1, int(_env_float("MEDIA_DOWNLOADER_HTTP_POOL_HOSTS", 32))
+                ),
+                pool_maxsize=max(
+                    1, int(_env_float("MEDIA_DOWNLOADER_HTTP_POOL_SIZE", 8))
+                ),
+                pool_block=True,
+            )
+        return _METADATA_ADAPTER
+
+
+def _metadata_session() -> requests.Session:
+    """This thread's session over the shared pool.
+
+    Sessions are per thread because ``requests.Session`` is not thread-safe;
+    connections are still shared through one adapter. Cookies are refused so
+    no state leaks between unrelated metadata lookups.
+    """
+    session = getattr(_METADATA_SESSIONS, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = _metadata_adapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.cookies.set_policy(
+            http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+        )
+        session.headers["Accept-Encoding"] = urllib3.util.make_headers(
+            accept_encoding=True
+        )["accept-encoding"]
+        _METADATA_SESSIONS.session = session
+    return session
+
+
+def close_metadata_sessions() -> None:
+    """Drop every pooled metadata connection (new requests open fresh ones)."""
+    global _METADATA_ADAPTER
+    with _METADATA_ADAPTER_LOCK:
+        adapter, _METADATA_ADAPTER = _METADATA_ADAPTER, None
+    if adapter is not None:
+        adapter.close()
+
+
+atexit.register(close_metadata_sessions)
+
+
+def _release(response: requests.Response) -> None:
+    """Return a response's connection to the pool unless its body is large."""
+    received = 0
+    for chunk in response.iter_content(chunk_size=16 * 1024):
+        received += len(chunk)
+        if received > _MAX_DRAIN_BYTES:
+            break
+    response.close()
+
+
+def parse_media_url(url: str) -> SplitResult:
+    """Split an HTTP(S) media URL, rejecting malformed ones without network access."""
     if not isinstance(url, str) or len(url) > 8_192 or "\x00" in url:
         raise MediaSecurityError("Invalid media URL")
     parsed = urlsplit(url.strip())
@@ -46,51 +287,72 @@ def validate_media_url(url: str) -> str:
     ):
         raise MediaSecurityError("Media URLs may not contain credentials")
     try:
-        port = parsed.port or (443 if parsed.scheme.lower() == "https" else 80)
+        if parsed.port == 0:
+            raise MediaSecurityError("Invalid media URL port")
     except ValueError as exc:
         raise MediaSecurityError("Invalid media URL port") from exc
-    host = parsed.hostname.lower().rstrip(".")
-    allowed_private = host in _private_host_allowlist()
-    try:
-        addresses = {
-            str(item[4][0])
-            for item in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
-        }
-    except socket.gaierror as exc:
-        raise MediaSecurityError("Media host could not be resolved") from exc
-    if not addresses:
-        raise MediaSecurityError("Media host did not resolve")
-    for address in addresses:
-        try:
-            ip = ipaddress.ip_address(address.split("%", 1)[0])
-        except ValueError as exc:
-            raise MediaSecurityError(
-                "Media host resolved to an invalid address"
-            ) from exc
-        if not ip.is_global and not allowed_private:
-            raise MediaSecurityError("Media URL resolves to a non-public address")
+    return parsed
+
+
+def validate_media_url(url: str) -> str:
+    """Validate an HTTP(S) URL and resolve every address before network access.
+
+    Answers come from a short-lived resolution cache, so revalidating every
+    fragment request of a stream costs a dictionary lookup rather than a DNS query.
+    """
+    parsed = parse_media_url(url)
+    port = parsed.port or (443 if parsed.scheme.lower() == "https" else 80)
+    validated_addresses(parsed.hostname, port)
     return urlunsplit(
         (parsed.scheme.lower(), parsed.netloc, parsed.path or "/", parsed.query, "")
     )
 
 
-def safe_metadata_get(url: str, *, timeout: float = 10.0) -> requests.Response:
-    """GET a small metadata page with manual, revalidated redirects."""
+def safe_metadata_get(
+    url: str, *, timeout: float = 10.0, cache: MetadataCache | None = None
+) -> requests.Response:
+    """GET a small metadata page with manual, revalidated redirects.
+
+    Requests reuse pooled keep-alive connections and negotiate compression; the
+    size limit applies to the decoded body. With a ``cache``, pages carrying an
+    ``ETag`` or ``Last-Modified`` are stored and later revalidated; a ``304``
+    answer is served from the cache with status ``304``. Transient and
+    throttled failures are retried per :class:`~media_downloader.retry.RetryPolicy`.
+    """
+    return RetryPolicy().call(_metadata_get, url, timeout=timeout, cache=cache)
+
+
+def _metadata_get(
+    url: str, *, timeout: float, cache: MetadataCache | None
+) -> requests.Response:
     current = validate_media_url(url)
+    session = _metadata_session()
     for _ in range(_MAX_REDIRECTS + 1):
-        response = requests.get(
+        cached = cache.lookup(current) if cache is not None else None
+        response = session.get(
             current,
+            headers=cached.conditional_headers() if cached else None,
             timeout=timeout,
             allow_redirects=False,
             stream=True,
         )
         if response.is_redirect or response.is_permanent_redirect:
             location = response.headers.get("location")
-            response.close()
+            _release(response)
             if not location:
                 raise MediaSecurityError("Media redirect omitted its destination")
             current = validate_media_url(urljoin(current, location))
             continue
+        if response.status_code == 304 and cached is not None:
+            _release(response)
+            cache.touch(current)
+            if cached.content_type and "content-type" not in response.headers:
+                response.headers["Content-Type"] = cached.content_type
+            response._content = cached.body
+            response.url = current
+            return response
+        if not response.ok:
+            _release(response)
         response.raise_for_status()
         payload = bytearray()
         for chunk in response.iter_content(chunk_size=64 * 1024):
@@ -102,10 +364,28 @@ def safe_metadata_get(url: str, *, timeout: float = 10.0) -> requests.Response:
                 )
         response._content = bytes(payload)  # bounded body for existing callers
         response.url = current
+        if cache is not None:
+            _store_in_cache(cache, current, response)
         return response
     raise MediaSecurityError("Media redirect limit exceeded")
 
 
+def _store_in_cache(
+    cache: MetadataCache, url: str, response: requests.Response
+) -> None:
+    headers = response.headers
+    if "no-store" in str(headers.get("cache-control", "")).lower():
+        return
+    etag, last_modified = headers.get("etag"), headers.get("last-modified")
+    cache.store(
+        url,
+        response._content,
+        etag=etag if isinstance(etag, str) else None,
+        last_modified=last_modified if isinstance(last_modified, str) else None,
+        content_type=headers.get("content-type"),
+    )
+
+
 def resolve_output_directory(
     requested: str | None, *, output_root: str | None = None
 ) -> tuple[Path, Path]:
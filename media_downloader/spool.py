@@ -0,0 +1,224 @@
+"""Spool of downloads the knowledge graph has not ingested yet.
+
+When KG ingestion is skipped because no engine is reachable, or fails, the
+downloaded file is recorded here — path, trimmed yt-dlp info, public source
+origin and digest — so ``media-downloader --replay-ingest`` can store it once
+the engine is back, without downloading anything again. Replays go through the
+regular batched ingest path, whose digest lookup keeps them idempotent.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from media_downloader.cache import open_state_database
+from media_downloader.kg_media import (
+    IngestBatcher,
+    IngestQueue,
+    media_store_available,
+)
+
+logger = logging.getLogger("MediaDownloader.spool")
+
+
+@dataclass(frozen=True)
+class SpoolEntry:
+    path: str
+    info: dict[str, Any]
+    source_url: str
+    digest: str | None
+    size_bytes: int
+    attempts: int
+
+    def intact(self) -> bool:
+        """Whether the spooled file is still there, unchanged in size."""
+        try:
+            return os.path.getsize(self.path) == self.size_bytes
+        except OSError:
+            return False
+
+
+class IngestSpool:
+    """Persistent queue of files awaiting KG ingestion, keyed by path.
+
+    Holds at most ``max_entries`` files (``MEDIA_DOWNLOADER_KG_SPOOL_MAX``,
+    default 100000; 0 disables spooling); files spooled beyond that are logged
+    and dropped.
+    """
+
+    def __init__(self, path: str | os.PathLike, *, max_entries: int | None = None):
+        self.path = Path(path)
+        if max_entries is None:
+            try:
+                max_entries = int(
+                    os.environ.get("MEDIA_DOWNLOADER_KG_SPOOL_MAX", 100_000)
+                )
+            except ValueError:
+                max_entries = 100_000
+        self.max_entries = max_entries
+
+    def _open(self) -> sqlite3.Connection:
+        connection = open_state_database(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS spool (path TEXT PRIMARY KEY,"
+            " info TEXT NOT NULL, source_url TEXT NOT NULL, digest TEXT,"
+            " size INTEGER NOT NULL, spooled REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        return connection
+
+    def add(
+        self,
+        path: str,
+        *,
+        info: dict[str, Any] | None = None,
+        source_url: str = "",
+        digest: str | None = None,
+    ) -> bool:
+        """Spool ``path``; ``False`` when it is missing or the spool is full."""
+        if self.max_entries <= 0:
+            return False
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        try:
+            with closing(self._open()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                (count,) = connection.execute("SELECT COUNT(*) FROM spool").fetchone()
+                known = connection.execute(
+                    "SELECT 1 FROM spool WHERE path = ?", (path,)
+                ).fetchone()
+                if count >= self.max_entries and known is None:
+                    connection.execute("ROLLBACK")
+                    logger.warning("KG ingest spool is full; not spooling a download")
+                    return False
+                connection.execute(
+                    "INSERT OR REPLACE INTO spool VALUES (?, ?, ?, ?, ?, ?, 0)",
+                    (
+                        path,
+                        json.dumps(info or {}, default=str),
+                        source_url,
+                        digest,
+                        size,
+                        time.time(),
+                    ),
+                )
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.debug("Ingest spool unavailable: error_type=%s", type(e).__name__)
+            return False
+        return True
+
+    def entries(self, *, after: str = "", limit: int = 256) -> list[SpoolEntry]:
+        """Up to ``limit`` entries in path order, starting after ``after``."""
+        if not self.path.exists():
+            return []
+        try:
+            with closing(self._open()) as connection:
+                rows = connection.execute(
+                    "SELECT path, info, source_url, digest, size, attempts"
+                    " FROM spool WHERE path > ? ORDER BY path LIMIT ?",
+                    (after, limit),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug("Ingest spool unavailable: error_type=%s", type(e).__name__)
+            return []
+        return [
+            SpoolEntry(path, json.loads(info), source_url, digest, size, attempts)
+            for path, info, source_url, digest, size, attempts in rows
+        ]
+
+    def remove(self, paths: list[str]) -> None:
+        self._executemany("DELETE FROM spool WHERE path = ?", paths)
+
+    def mark_failed(self, paths: list[str]) -> None:
+        self._executemany(
+            "UPDATE spool SET attempts = attempts + 1 WHERE path = ?", paths
+        )
+
+    def _executemany(self, query: str, paths: list[str]) -> None:
+        if not paths:
+            return
+        try:
+            with closing(self._open()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(query, [(path,) for path in paths])
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.debug("Ingest spool unavailable: error_type=%s", type(e).__name__)
+
+    def count(self) -> int:
+        if not self.path.exists():
+            return 0
+        try:
+            with closing(self._open()) as connection:
+                return connection.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.debug("Ingest spool unavailable: error_type=%s", type(e).__name__)
+            return 0
+
+
+def replay_spool(
+    spool: IngestSpool,
+    *,
+    media_store: Any | None = None,
+    workers: int | None = None,
+    batch_items: int | None = None,
+    page_size: int = 256,
+) -> dict[str, Any]:
+    """Ingest every spooled file, ``workers`` batches at a time.
+
+    Ingested files leave the spool; files that vanished or changed size since
+    they were spooled are dropped; failures stay spooled with their attempt
+    count raised. Returns ``{replayed, failed, dropped, remaining, seconds}``,
+    with nothing replayed when no engine is reachable.
+    """
+    stats: dict[str, Any] = {"replayed": 0, "failed": 0, "dropped": 0}
+    started = time.monotonic()
+    if media_store is None and not media_store_available():
+        logger.warning("KG ingest replay: no reachable engine")
+    else:
+        queue = IngestQueue(
+            IngestBatcher(media_store, max_items=batch_items), workers=workers
+        )
+        try:
+            after = ""
+            while page := spool.entries(after=after, limit=page_size):
+                after = page[-1].path
+                _replay_page(spool, queue, page, stats)
+        finally:
+            queue.close()
+    stats["remaining"] = spool.count()
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    return stats
+
+
+def _replay_page(spool, queue, page: list[SpoolEntry], stats: dict) -> None:
+    dropped, submitted = [], []
+    for entry in page:
+        if not entry.intact():
+            dropped.append(entry.path)
+            continue
+        digest = (entry.digest, entry.size_bytes) if entry.digest else None
+        future = queue.submit(
+            entry.path, info=entry.info, source_url=entry.source_url, digest=digest
+        )
+        submitted.append((entry, future))
+    queue.flush()
+    done, failed = [], []
+    for entry, future in submitted:
+        (done if future.result() is not None else failed).append(entry.path)
+    spool.remove(done + dropped)
+    spool.mark_failed(failed)
+    stats["replayed"] += len(done)
+    stats["failed"] += len(failed)
+    stats["dropped"] += len(dropped)
@@ -0,0 +1,219 @@
+"""Long-lived download worker processes shared across batches and MCP calls.
+
+Creating a ``multiprocessing.Pool`` per batch makes every worker re-import yt-dlp
+(and its extractor registry) before it can start a download; for short clips that
+start-up dominates. :class:`WorkerPool` keeps one pool alive for the process,
+starts workers from a ``forkserver`` that has already imported yt-dlp, and
+recycles workers after a bounded number of tasks or when one reports a resident
+set above the configured threshold. Scripts that start downloads at their top
+level, without an ``if __name__ == "__main__":`` guard, get forked workers
+instead, since a forkserver worker would run the script again.
+"""
+
+from __future__ import annotations
+
+import ast
+import atexit
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger("MediaDownloader.workers")
+
+# Imported once by the forkserver so every forked worker starts warm. Only
+# yt-dlp: any ``media_downloader`` module would import the package, and with
+# it the CLI module, a second time under ``python -m``.
+_PRELOAD_MODULES = ["yt_dlp", "yt_dlp.extractor.extractors"]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (0 when unknown)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Peak rather than current RSS, reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _measured_call(func: Callable[[Any], Any], item: Any) -> tuple[Any, int]:
+    return func(item), _rss_bytes()
+
+
+def _is_main_guard(test: ast.expr) -> bool:
+    return (
+        isinstance(test, ast.Compare)
+        and isinstance(test.left, ast.Name)
+        and test.left.id == "__name__"
+        and len(test.comparators) == 1
+        and isinstance(test.comparators[0], ast.Constant)
+        and test.comparators[0].value == "__main__"
+    )
+
+
+def _main_is_guarded() -> bool:
+    """Whether a worker may re-import ``__main__`` without re-running the script.
+
+    ``forkserver`` and ``spawn`` workers import the main script again; one that
+    starts a batch at its top level, outside ``if __name__ == "__main__":``,
+    would start it again in every worker. True when there is no script
+    (REPL, ``-c``) or its top level calls nothing outside such a guard.
+    """
+    path = getattr(sys.modules.get("__main__"), "__file__", None)
+    if not path:
+        return True
+    try:
+        with open(path, "rb") as fh:
+            tree = ast.parse(fh.read())
+    except (OSError, SyntaxError, ValueError):
+        return False
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(node, ast.If) and _is_main_guard(node.test):
+            continue
+        if any(isinstance(child, ast.Call) for child in ast.walk(node)):
+            return False
+    return True
+
+
+def _worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    if "forkserver" in methods and _main_is_guarded():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(_PRELOAD_MODULES)
+        return context
+    if "fork" in methods and sys.platform != "darwin":
+        # Unguarded scripts: forked workers inherit this process's imports
+        # (yt-dlp included) instead of re-running the script.
+        logger.debug("Main script is not guarded; forking download workers")
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+class WorkerPool:
+    """A reusable, pre-warmed process pool for download tasks.
+
+    Workers are replaced after ``max_tasks_per_child`` tasks by the pool itself.
+    When a worker reports an RSS above ``max_rss_bytes`` the pool is retired:
+    running tasks finish on the old workers and the next batch gets fresh ones.
+    ``pool_factory`` builds the underlying pool (tests pass ``ThreadPool``).
+    """
+
+    def __init__(
+        self,
+        processes: int | None = None,
+        *,
+        max_tasks_per_child: int | None = None,
+        max_rss_bytes: int | None = None,
+        pool_factory: Callable[..., Any] | None = None,
+    ):
+        if processes is None:
+            processes = min(_env_int("MEDIA_DOWNLOADER_MAX_WORKERS", 8), 32)
+        self.processes = max(1, processes)
+        if max_tasks_per_child is None:
+            max_tasks_per_child = _env_int("MEDIA_DOWNLOADER_WORKER_MAX_TASKS", 50)
+        self.max_tasks_per_child = max_tasks_per_child or None
+        if max_rss_bytes is None:
+            max_rss_bytes = (
+                _env_int("MEDIA_DOWNLOADER_WORKER_MAX_RSS_MB", 1024) * 1024 * 1024
+            )
+        self.max_rss_bytes = max_rss_bytes or None
+        self._pool_factory = pool_factory
+        self._pool: Any | None = None
+        self._retire = False
+        self._lock = threading.Lock()
+        self.tasks_completed = 0
+        self.recycles = 0
+
+    def _new_pool(self) -> Any:
+        if self._pool_factory is not None:
+            return self._pool_factory(processes=self.processes)
+        return _worker_context().Pool(
+            processes=self.processes, maxtasksperchild=self.max_tasks_per_child
+        )
+
+    def _current_pool(self) -> Any:
+        with self._lock:
+            if self._pool is not None and self._retire:
+                retired, self._pool = self._pool, None
+                retired.close()
+                # Let in-flight tasks of the retired pool drain in the background.
+                threading.Thread(target=retired.join, daemon=True).start()
+                self.recycles += 1
+                logger.debug("Recycled download workers above the RSS limit")
+            self._retire = False
+            if self._pool is None:
+                self._pool = self._new_pool()
+            return self._pool
+
+    def submit(
+        self,
+        func: Callable[[Any], Any],
+        item: Any,
+        callback: Callable[[Any], Any],
+        error_callback: Callable[[BaseException], Any],
+    ) -> None:
+        """Run ``func(item)`` on a warm worker and hand its result to ``callback``.
+
+        Callbacks run on the pool's result thread and must not block.
+        """
+
+        def _on_result(measured: tuple[Any, int]) -> None:
+            result, rss = measured
+            self.tasks_completed += 1
+            if self.max_rss_bytes and rss > self.max_rss_bytes:
+                self._retire = True
+            callback(result)
+
+        self._current_pool().apply_async(
+            _measured_call,
+            (func, item),
+            callback=_on_result,
+            error_callback=error_callback,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "running": self._pool is not None,
+            "tasks_completed": self.tasks_completed,
+            "recycles": self.recycles,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+_SHARED_POOL: WorkerPool | None = None
+_SHARED_POOL_LOCK = threading.Lock()
+
+
+def shared_pool() -> WorkerPool:
+    """Return the process-wide warm worker pool, creating it on first use."""
+    global _SHARED_POOL
+    with _SHARED_POOL_LOCK:
+        if _SHARED_POOL is None:
+            _SHARED_POOL = WorkerPool()
+            atexit.register(_SHARED_POOL.close)
+        return _SHARED_POOL
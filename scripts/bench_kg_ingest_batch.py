@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""KG ingest throughput: one store transaction per file vs ``IngestBatcher``.
+
+The fake store charges a fixed cost per transaction (the commit and its fsync,
+``--commit-ms``) plus nothing per item, which is where a real graph store spends
+its time on small files. "per file" is the previous behaviour, one
+``ingest_media_file`` call per download; "batched" submits every file to an
+``IngestBatcher`` and flushes the tail.
+
+    python scripts/bench_kg_ingest_batch.py [files] [commit_ms]
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from media_downloader.kg_media import IngestBatcher, ingest_media_file
+
+
+@dataclass
+class _Stored:
+    asset_id: str
+    digest: str
+
+
+class _TransactionalStore:
+    def __init__(self, commit_seconds):
+        self.commit_seconds = commit_seconds
+        self.transactions = 0
+
+    def _commit(self):
+        self.transactions += 1
+        time.sleep(self.commit_seconds)
+
+    def _stored(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        return _Stored(asset_id=f"media:{digest[:8]}", digest=digest)
+
+    def store_media(self, data, **_kw):
+        self._commit()
+        return self._stored(data)
+
+    def store_media_batch(self, items):
+        self._commit()
+        return [self._stored(item["data"]) for item in items]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    commit_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(count):
+            path = os.path.join(directory, f"clip{i}.m4a")
+            with open(path, "wb") as fh:
+                fh.write(os.urandom(64 * 1024))
+            paths.append(path)
+
+        print(f"{count} files of 64 KiB, {commit_ms:g} ms per commit")
+        print(f"{'strategy':<12}{'commits':>10}{'seconds':>10}{'files/s':>10}")
+
+        store = _TransactionalStore(commit_ms / 1000)
+        started = time.perf_counter()
+        for path in paths:
+            ingest_media_file(path, media_store=store)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{'per file':<12}{store.transactions:>10}{elapsed:>10.2f}"
+            f"{count / elapsed:>10.0f}"
+        )
+
+        store = _TransactionalStore(commit_ms / 1000)
+        batcher = IngestBatcher(store)
+        started = time.perf_counter()
+        futures = [batcher.submit(path) for path in paths]
+        batcher.flush()
+        assert all(future.result() for future in futures)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{'batched':<12}{store.transactions:>10}{elapsed:>10.2f}"
+            f"{count / elapsed:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Peak Python memory of ``ingest_media_file``: bytes API vs streaming API.
+
+Both stores behave like the test ``_FakeMediaStore``: they hash what they are
+given and keep nothing. The bytes store receives the whole file at once (the
+fallback path); the streaming store receives bounded chunks.
+
+    python scripts/bench_kg_ingest_memory.py [size_mb]
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from media_downloader.kg_media import ingest_media_file
+
+
+@dataclass
+class _Stored:
+    asset_id: str
+    digest: str
+
+
+class _BytesStore:
+    def store_media(self, data, **_kw):
+        digest = hashlib.sha256(data).hexdigest()
+        return _Stored(asset_id=f"media:{digest[:8]}", digest=digest)
+
+
+class _StreamingStore:
+    def store_media_stream(self, chunks, **_kw):
+        hasher = hashlib.sha256()
+        for chunk in chunks:
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        return _Stored(asset_id=f"media:{digest[:8]}", digest=digest)
+
+
+def _measure(path, store):
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        ingest_media_file(path, media_store=store)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "clip.mp4")
+        block = os.urandom(1024 * 1024)
+        with open(path, "wb") as fh:
+            for _ in range(size_mb):
+                fh.write(block)
+
+        print(f"{size_mb} MiB file")
+        print(f"{'store API':<14}{'peak MiB':>12}{'seconds':>10}")
+        for label, store in (
+            ("bytes", _BytesStore()),
+            ("streaming", _StreamingStore()),
+        ):
+            peak, elapsed = _measure(path, store)
+            print(f"{label:<14}{peak / 1024 / 1024:>12.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""RSS and CPU per GiB ingested: memory-mapped views vs ``read()`` copies.
+
+Each mode ingests the same file through ``ingest_media_file`` into a streaming
+store that hashes what it is given (like the test ``_FakeStreamingMediaStore``),
+then verifies it with ``file_digest``. ``read`` forces the fallback used where a
+file cannot be memory-mapped. Every mode runs in a fresh interpreter so peak RSS
+(``ru_maxrss``) is its own; the file is read once beforehand so both modes hash
+from the page cache.
+
+    python scripts/bench_kg_ingest_zero_copy.py [size_mb]
+"""
+
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class _Stored:
+    asset_id: str
+    digest: str
+
+
+class _StreamingStore:
+    def store_media_stream(self, chunks, **_kw):
+        hasher = hashlib.sha256()
+        for chunk in chunks:
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        return _Stored(asset_id=f"media:{digest[:8]}", digest=digest)
+
+
+def _child(mode, path):
+    from media_downloader import digest
+    from media_downloader.kg_media import ingest_media_file
+
+    if mode == "read":
+        digest._map_readonly = lambda fh: None
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu, started = time.process_time(), time.perf_counter()
+    ingest_media_file(path, media_store=_StreamingStore())
+    digest.file_digest(path)
+    print(
+        json.dumps(
+            {
+                "cpu": time.process_time() - cpu,
+                "wall": time.perf_counter() - started,
+                "rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                - baseline,
+            }
+        )
+    )
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "clip.mp4")
+        block = os.urandom(1024 * 1024)
+        with open(path, "wb") as fh:
+            for _ in range(size_mb):
+                fh.write(block)
+        with open(path, "rb") as fh:
+            while fh.read(1024 * 1024):
+                pass
+
+        gib = size_mb / 1024
+        print(f"{size_mb} MiB file, ingested and verified (two full passes)")
+        print(f"{'reader':<8}{'peak RSS MiB':>14}{'CPU s/GiB':>11}{'wall s/GiB':>12}")
+        for mode in ("read", "mmap"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, path],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(out)
+            print(
+                f"{mode:<8}{result['rss_kib'] / 1024:>14.1f}"
+                f"{result['cpu'] / gib:>11.2f}{result['wall'] / gib:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        _child(sys.argv[2], sys.argv[3])
+    else:
+        main()
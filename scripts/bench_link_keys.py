@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Cost of ``link_key`` per link, indexed vs a scan of every extractor.
+
+The scan column tries every site extractor in order, as ``media_id`` did
+before :class:`~media_downloader.links._ExtractorIndex`; the index column is
+``link_key`` as it runs now. Index build time (once per process) is reported
+separately.
+
+    python scripts/bench_link_keys.py [--repeat 200]
+"""
+
+import argparse
+import time
+
+from media_downloader import links
+
+_LINKS = {
+    "youtube": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "youtu.be": "https://youtu.be/dQw4w9WgXcQ",
+    "rumble page": "https://rumble.com/v4abcd-some-title.html",
+    "rumble embed": "https://rumble.com/embed/v4xyz/",
+    "generic": "https://cdn.example.test/videos/2024/05/clip.mp4",
+}
+
+
+def _scan(link):
+    for extractor in links._url_extractors():
+        if extractor.suitable(link):
+            return extractor.ie_key()
+    return None
+
+
+def _per_call(fn, link, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(link)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    links._extractor_index()
+    print(f"index build: {time.perf_counter() - started:.2f}s; µs per link")
+    print(f"{'link':>14}{'scan':>10}{'index':>10}")
+    for name, link in _LINKS.items():
+        _scan(link), links.link_key(link)
+        scan = _per_call(_scan, link, max(1, args.repeat // 20))
+        indexed = _per_call(links.link_key, link, args.repeat)
+        print(f"{name:>14}{scan:>10.0f}{indexed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
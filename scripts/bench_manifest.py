@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Download manifest throughput by commit batch size.
+
+Each run records a ``queued``, a ``started`` and a ``done`` transition for
+each of ``links`` links, and finally asks which links are unfinished (the
+``--resume`` query). Batch size 1 commits, and fsyncs, every transition; it is
+run on at most 5,000 links since it is only there for comparison.
+
+    python scripts/bench_manifest.py [--links 100000] [--batches 1,64,256,1024]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from media_downloader.manifest import DONE, QUEUED, STARTED, DownloadManifest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--batches", default="1,64,256,1024")
+    args = parser.parse_args()
+
+    print(f"{'batch':>6}{'links':>9}{'commits':>9}{'events/s':>10}{'resume s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for batch in (int(b) for b in args.batches.split(",")):
+            count = min(args.links, 5_000) if batch == 1 else args.links
+            links = [f"https://example.test/watch?v={i:011d}" for i in range(count)]
+            manifest = DownloadManifest(
+                os.path.join(directory, f"batch-{batch}.sqlite3"),
+                batch_events=batch,
+                max_delay=3600,
+            )
+            started = time.perf_counter()
+            for link in links:
+                manifest.record(link, QUEUED)
+            for link in links:
+                manifest.record(link, STARTED)
+                manifest.record(link, DONE)
+            manifest.flush()
+            rate = 3 * count / (time.perf_counter() - started)
+            started = time.perf_counter()
+            manifest.unfinished()
+            resume = time.perf_counter() - started
+            manifest.close()
+            print(
+                f"{batch:>6}{count:>9}{manifest.commits:>9}{rate:>10.0f}{resume:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Per-call latency of ``safe_metadata_get``: a fresh session vs the shared pool.
+
+A local HTTPS server with a throwaway self-signed certificate stands in for the
+embed and channel pages; every call follows one redirect hop, like the Rumble
+embed lookups. "fresh session" is the previous behaviour (a new connection and
+TLS handshake per request); "pooled session" is the current one. Requires the
+``openssl`` command line tool.
+
+    python scripts/bench_metadata_session.py [requests]
+"""
+
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+
+from media_downloader import security
+
+_BODY = b'{"video": {"url": "https://example.test/clip.mp4"}}' * 200
+
+
+class _MetadataHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/embed":
+            self.send_response(302)
+            self.send_header("Location", "/embed/info.json")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def log_message(self, *_args):
+        pass
+
+
+def _self_signed(directory: Path) -> tuple[str, str]:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-days", "1", "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )  # fmt: skip
+    return str(cert), str(key)
+
+
+def _fresh_session():
+    session = requests.Session()
+    adapter = security.PinnedHTTPAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _timed(url):
+    started = time.perf_counter()
+    security.safe_metadata_get(url)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = _self_signed(Path(directory))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _MetadataHandler)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["REQUESTS_CA_BUNDLE"] = cert
+        os.environ["MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS"] = "localhost"
+        url = f"https://localhost:{server.server_address[1]}/embed"
+
+        rows = []
+        with patch.object(security, "_metadata_session", _fresh_session):
+            rows.append(("fresh session", [_timed(url) for _ in range(requests_count)]))
+        _timed(url)  # open the pooled connection once
+        rows.append(("pooled session", [_timed(url) for _ in range(requests_count)]))
+        server.shutdown()
+
+    print(f"{'strategy':<18}{'median ms':>12}{'p95 ms':>12}")
+    for label, samples in rows:
+        p95 = sorted(samples)[max(0, int(len(samples) * 0.95) - 1)]
+        print(f"{label:<18}{statistics.median(samples):>12.2f}{p95:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Throughput of ``tree_digest`` by file size and thread count, vs flat SHA-256.
+
+The flat column is ``file_digest`` (one core); ``tree xN`` is ``sha256-tree1``
+with N hashing threads over a memory map, as ``--verify`` checks large files;
+``both xN`` is ``file_and_tree_digest``, as backfill hashes them.
+Each file is hashed once before timing so every run reads from the page cache.
+Thread counts above ``os.cpu_count()`` are still run, but cannot go faster.
+
+    python scripts/bench_tree_digest.py [size_mb ...] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from media_downloader.digest import file_and_tree_digest, file_digest, tree_digest
+
+
+def _write(path, size_mb):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as fh:
+        for _ in range(size_mb):
+            fh.write(block)
+
+
+def _rate(size_mb, fn, *args, **kwargs):
+    started = time.perf_counter()
+    fn(*args, **kwargs)
+    return size_mb / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[64, 512, 2048])
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+    workers = [int(w) for w in args.workers.split(",")]
+
+    print(f"cpu_count={os.cpu_count()}; MiB/s, higher is better")
+    header = f"{'size MiB':>9}{'flat':>9}" + "".join(
+        f"{f'tree x{w}':>10}{f'both x{w}':>10}" for w in workers
+    )
+    print(header)
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in args.sizes:
+            path = os.path.join(directory, "clip.mp4")
+            _write(path, size_mb)
+            file_digest(path)
+            row = f"{size_mb:>9}{_rate(size_mb, file_digest, path):>9.0f}"
+            for w in workers:
+                row += f"{_rate(size_mb, tree_digest, path, workers=w):>10.0f}"
+                row += f"{_rate(size_mb, file_and_tree_digest, path, workers=w):>10.0f}"
+            print(row)
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
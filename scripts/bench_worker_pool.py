@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Per-request latency: a fresh Pool per batch vs the shared warm WorkerPool.
+
+Each "request" runs one task that builds a ``SafeYoutubeDL`` — the work a
+download does before its first network byte. Cold pools use the ``forkserver``
+start method without preloading, which is what a fresh ``Pool`` does on Python
+3.14+ (and ``spawn`` on macOS): every worker imports yt-dlp from scratch.
+
+    python scripts/bench_worker_pool.py [requests]
+"""
+
+import multiprocessing
+import queue
+import statistics
+import sys
+import time
+
+from media_downloader.workers import WorkerPool
+
+
+def _prepare_downloader(_):
+    from media_downloader.media_downloader import SafeYoutubeDL
+
+    with SafeYoutubeDL({"quiet": True}):
+        pass
+    return True
+
+
+def _timed(run):
+    started = time.perf_counter()
+    run()
+    return (time.perf_counter() - started) * 1000
+
+
+def _cold_request(method):
+    pool = multiprocessing.get_context(method).Pool(processes=1)
+    try:
+        pool.map(_prepare_downloader, [0])
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _warm_request(pool):
+    done = queue.Queue()
+    pool.submit(_prepare_downloader, 0, done.put, done.put)
+    done.get()
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rows = []
+    for method in ("forkserver", "fork"):
+        samples = [_timed(lambda m=method: _cold_request(m)) for _ in range(requests)]
+        rows.append((f"fresh Pool ({method})", samples))
+
+    warm = WorkerPool(1)
+    try:
+        # The first request starts the shared pool's worker.
+        warm_ms = _timed(lambda: _warm_request(warm))
+        samples = [_timed(lambda: _warm_request(warm)) for _ in range(requests)]
+    finally:
+        warm.close()
+    rows.append(("warm WorkerPool", samples))
+
+    print(f"{'strategy':<26}{'median ms':>12}{'p95 ms':>12}")
+    for label, samples in rows:
+        p95 = sorted(samples)[max(0, int(len(samples) * 0.95) - 1)]
+        print(f"{label:<26}{statistics.median(samples):>12.1f}{p95:>12.1f}")
+    print(f"(first request on the shared pool: {warm_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,19 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("MEDIA_URL", "https://test.example.com")
     monkeypatch.setenv("MEDIA_TOKEN", "test-token-12345")
     monkeypatch.setenv("MEDIA_SSL_VERIFY", "False")
+
+
+@pytest.fixture(autouse=True)
+def fresh_resolution_cache():
+    """Tests patch DNS answers per host; never let one test's answer leak."""
+    from media_downloader.security import clear_resolution_cache
+
+    clear_resolution_cache()
+    yield
+    clear_resolution_cache()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_backoff(monkeypatch):
+    """Retries happen at once in tests; tests of the backoff itself set their own."""
+    monkeypatch.setenv("MEDIA_DOWNLOADER_RETRY_BASE_SECONDS", "0")
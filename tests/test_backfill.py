@@ -0,0 +1,144 @@
+"""Bulk backfill of an existing output root into the knowledge graph."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+
+from media_downloader import backfill as backfill_module
+from media_downloader import kg_media
+from media_downloader.backfill import backfill, iter_media_files, verify
+
+
+@dataclass
+class _Stored:
+    asset_id: str
+    digest: str
+
+
+class _BatchStore:
+    def __init__(self):
+        self.items = []
+
+    def store_media_batch(self, items):
+        self.items.extend(items)
+        return [_Stored(f"media:{item['name']}", "d") for item in items]
+
+
+def _media_tree(root, outside):
+    (root / "sub").mkdir()
+    (root / ".media-downloader").mkdir()
+    (root / "a.mp4").write_bytes(b"a" * 10)
+    (root / "a.info.json").write_text(
+        json.dumps(
+            {
+                "id": "abc",
+                "title": "Clip A",
+                "webpage_url": "https://www.youtube.com/watch?v=abc",
+                "formats": [{"url": "https://cdn.test/a"}],
+            }
+        )
+    )
+    (root / "sub" / "b.m4a").write_bytes(b"b" * 20)
+    (root / "sub" / "b.jpg").write_bytes(b"thumbnail")
+    (root / "c.mp4.part").write_bytes(b"partial")
+    (root / ".media-downloader" / "x.mp4").write_bytes(b"state")
+    (outside / "secret.mp4").write_bytes(b"secret")
+    os.symlink(outside / "secret.mp4", root / "link.mp4")
+
+
+def test_walk_only_yields_contained_media(tmp_path):
+    root, outside = tmp_path / "root", tmp_path / "outside"
+    root.mkdir(), outside.mkdir()
+    _media_tree(root, outside)
+    assert [p.relative_to(root).as_posix() for p in iter_media_files(root, root)] == [
+        "a.mp4",
+        "sub/b.m4a",
+    ]
+
+
+def test_backfill_ingests_with_sidecar_metadata_and_resumes(tmp_path):
+    root, outside = tmp_path / "root", tmp_path / "outside"
+    root.mkdir(), outside.mkdir()
+    _media_tree(root, outside)
+    store = _BatchStore()
+
+    stats = backfill(root, root, workers=2, media_store=store)
+
+    assert stats["files"] == 2 and stats["bytes"] == 30 and stats["failed"] == 0
+    assert stats["files_per_second"] > 0 and "mb_per_second" in stats
+    by_name = {item["name"]: item for item in store.items}
+    assert set(by_name) == {"Clip A", "b"}
+    clip = by_name["Clip A"]
+    assert clip["source"] == "media-downloader-backfill"
+    assert clip["extra"]["id"] == "abc"
+    assert clip["extra"]["source_url"] == "https://www.youtube.com"
+
+    again = backfill(root, root, workers=2, media_store=store)
+    assert again["files"] == 0 and again["skipped"] == 2
+
+    (root / "sub" / "b.m4a").write_bytes(b"b" * 21)
+    changed = backfill(root, root, workers=2, media_store=store)
+    assert changed["files"] == 1 and changed["skipped"] == 1
+
+
+def test_files_vanishing_during_the_walk_are_counted_not_fatal(monkeypatch, tmp_path):
+    (tmp_path / "a.mp4").write_bytes(b"a")
+    walk = backfill_module.iter_media_files
+
+    def _walk_with_a_vanished_file(directory, root):
+        yield tmp_path / "gone.mp4"
+        yield from walk(directory, root)
+
+    monkeypatch.setattr(backfill_module, "iter_media_files", _walk_with_a_vanished_file)
+    stats = backfill(tmp_path, tmp_path, media_store=_BatchStore())
+    assert stats["files"] == 1 and stats["failed"] == 1
+
+
+def test_backfill_without_an_engine_ingests_nothing(monkeypatch, tmp_path):
+    monkeypatch.setattr(kg_media, "_connect_media_store", lambda: None)
+    monkeypatch.setattr(kg_media, "_STORE_HANDLE", kg_media._MediaStoreHandle())
+    (tmp_path / "a.mp4").write_bytes(b"a")
+    assert backfill(tmp_path, tmp_path)["files"] == 0
+    assert not (tmp_path / ".media-downloader" / "backfill.sqlite3").exists()
+
+
+def test_large_files_record_a_tree_digest_that_verify_checks(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_TREE_DIGEST_MIN_MB", str(15 / 1024 / 1024))
+    root, outside = tmp_path / "root", tmp_path / "outside"
+    root.mkdir(), outside.mkdir()
+    _media_tree(root, outside)
+    store = _BatchStore()
+
+    backfill(root, root, workers=2, media_store=store)
+
+    by_name = {item["name"]: item for item in store.items}
+    assert "tree_digest" not in by_name["Clip A"]["extra"]
+    assert by_name["b"]["extra"]["tree_digest"].startswith("sha256-tree1:")
+    assert verify(root)["verified"] == 2
+
+    # Same size and modification time, different bytes.
+    clip = root / "sub" / "b.m4a"
+    stamp = clip.stat()
+    clip.write_bytes(b"c" * 20)
+    os.utime(clip, ns=(stamp.st_atime_ns, stamp.st_mtime_ns))
+    (root / "a.mp4").unlink()
+    stats = verify(root)
+    assert stats["mismatched"] == 1 and stats["mismatched_paths"] == ["sub/b.m4a"]
+    assert stats["missing"] == 1 and stats["verified"] == 0
+
+
+def test_checkpoints_without_digest_columns_are_upgraded(tmp_path):
+    state = tmp_path / ".media-downloader"
+    state.mkdir()
+    with sqlite3.connect(state / "backfill.sqlite3") as connection:
+        connection.execute(
+            "CREATE TABLE done (path TEXT PRIMARY KEY, size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL, asset_id TEXT) WITHOUT ROWID"
+        )
+    (tmp_path / "a.mp4").write_bytes(b"a")
+
+    assert backfill(tmp_path, tmp_path, media_store=_BatchStore())["files"] == 1
+    assert verify(tmp_path)["verified"] == 1
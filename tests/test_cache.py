@@ -0,0 +1,149 @@
+"""On-disk caches under the media output root."""
+
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from media_downloader.cache import (
+    InfoCache,
+    MetadataCache,
+    cacheable_info,
+    state_directory,
+)
+from media_downloader.security import MediaSecurityError, safe_metadata_get
+
+_PAGE = b"<html>" + b"x" * 50_000 + b"</html>"
+
+
+class _ChannelPageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen: list[tuple[str, str | None]] = []
+
+    def do_GET(self):
+        etag = '"v1"'
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/volatile":
+            body, headers = _PAGE, {}
+        elif self.path == "/private":
+            body, headers = _PAGE, {"ETag": etag, "Cache-Control": "no-store"}
+        elif self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        else:
+            body, headers = _PAGE, {"ETag": etag}
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def page_server(monkeypatch):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "127.0.0.1")
+    _ChannelPageHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChannelPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_page_is_revalidated_and_served_from_cache(page_server, tmp_path):
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    first = safe_metadata_get(f"{page_server}/channel", cache=cache)
+    second = safe_metadata_get(f"{page_server}/channel", cache=cache)
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.content == first.content == _PAGE
+    assert second.text.startswith("<html>")
+    assert _ChannelPageHandler.requests_seen == [
+        ("/channel", None),
+        ("/channel", '"v1"'),
+    ]
+
+
+def test_pages_without_validators_or_marked_no_store_are_not_cached(
+    page_server, tmp_path
+):
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    for path in ("/volatile", "/private"):
+        safe_metadata_get(f"{page_server}{path}", cache=cache)
+        safe_metadata_get(f"{page_server}{path}", cache=cache)
+        assert cache.lookup(f"{page_server}{path}") is None
+    assert all(validator is None for _, validator in _ChannelPageHandler.requests_seen)
+
+
+def test_metadata_cache_evicts_least_recently_used(tmp_path):
+    cache = MetadataCache(tmp_path / "metadata.sqlite3", max_bytes=250)
+    for name in ("a", "b"):
+        cache.store(f"https://x.test/{name}", b"x" * 100, etag=name, last_modified=None)
+    cache.touch("https://x.test/a")
+    cache.store("https://x.test/c", b"x" * 100, etag="c", last_modified=None)
+
+    assert cache.lookup("https://x.test/b") is None
+    assert cache.lookup("https://x.test/a").etag == "a"
+    assert cache.lookup("https://x.test/c").conditional_headers() == {
+        "If-None-Match": "c"
+    }
+
+
+def test_metadata_cache_can_be_disabled(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_METADATA_CACHE_MB", "0")
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    cache.store("https://x.test/a", b"x", etag="a", last_modified=None)
+    assert cache.lookup("https://x.test/a") is None
+    assert not (tmp_path / "metadata.sqlite3").exists()
+
+
+def test_state_directory_refuses_symlink(tmp_path):
+    (tmp_path / "elsewhere").mkdir()
+    (tmp_path / ".media-downloader").symlink_to(tmp_path / "elsewhere")
+    with pytest.raises(MediaSecurityError, match="symbolic"):
+        state_directory(tmp_path)
+
+
+def test_info_cache_expires_entries_and_counts_lookups(tmp_path):
+    cache = InfoCache(tmp_path / "info.sqlite3", ttl=60)
+    cache.put("Youtube:a", {"id": "a", "formats": [{"url": "https://x.test/a"}]})
+    assert cache.get("Youtube:a")["id"] == "a"
+    assert cache.get("Youtube:b") is None
+
+    expired = InfoCache(tmp_path / "info.sqlite3", ttl=1e-9)
+    assert expired.get("Youtube:a") is None
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 2}
+
+
+def test_info_cache_evicts_least_recently_used(tmp_path):
+    cache = InfoCache(tmp_path / "info.sqlite3", ttl=60)
+    cache.put("a", {"id": "a", "title": "a" * 200})
+    entry_size = cache.stats()["bytes"]
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    for name in ("b", "c"):
+        cache.put(name, {"id": name, "title": name * 200})
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("a") is None
+    assert cache.get("c")["title"] == "c" * 200
+
+
+def test_only_replayable_info_is_cacheable():
+    video = {"id": "a", "formats": [{"url": "https://x.test/a"}]}
+    assert cacheable_info(video)
+    assert not cacheable_info({**video, "_type": "playlist"})
+    assert not cacheable_info({"id": "a", "formats": [{"cookies": "sid=1"}]})
+    assert not cacheable_info(
+        {"id": "a", "formats": [{"fragments": (f for f in range(3))}]}
+    )
@@ -17,6 +17,7 @@
     YtDlpLogger,
     media_downloader,
 )
+from media_downloader.workers import WorkerPool
 
 # =====================================================================
 # Global Auto-use Mocks for database-independent fast execution
@@ -111,6 +112,13 @@ def extract_info(self, url, download=True, **kwargs):
             "ext": "mp4",
         }
 
+    def process_ie_result(self, info, download=True):
+        return info
+
+    @staticmethod
+    def sanitize_info(info):
+        return info
+
     def prepare_filename(self, info):
         if "%(id)s" in self.opts.get("outtmpl", ""):
             return "/tmp/downloads/abc123xyz.mp4"
@@ -138,6 +146,20 @@ def __init__(self, processes=None, **kwargs):
     def map(self, func, iterable):
         return [func(x) for x in iterable]
 
+    def imap_unordered(self, func, iterable):
+        return (func(x) for x in iterable)
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        try:
+            result = func(*args)
+        except Exception as e:
+            error_callback(e)
+        else:
+            callback(result)
+
+    def terminate(self):
+        pass
+
     def close(self):
         pass
 
@@ -201,9 +223,7 @@ def test_open_file():
         downloader.open_file("mock_file.txt")
 
     # Assert duplicates are removed and newlines stripped
-    assert len(downloader.links) == 2
-    assert "https://youtube.com/1\n" in downloader.links
-    assert "https://youtube.com/2\n" in downloader.links
+    assert downloader.links == ["https://youtube.com/1", "https://youtube.com/2"]
 
 
 @patch("media_downloader.media_downloader.SafeYoutubeDL", MockYoutubeDL)
@@ -334,7 +354,10 @@ def test_progress_hook():
     callback.assert_called_with(progress=100, total=100)
 
 
-@patch("media_downloader.media_downloader.Pool", MockPool)
+@patch(
+    "media_downloader.media_downloader.shared_pool",
+    lambda: WorkerPool(pool_factory=MockPool),
+)
 @patch.object(MediaDownloader, "download_video")
 @patch("os.path.exists", return_value=True)
 def test_download_all(_mock_exists, mock_download):
@@ -344,9 +367,13 @@ def test_download_all(_mock_exists, mock_download):
     result = downloader.download_all()
     assert result == "/tmp/downloads/video.mp4"
     assert downloader.links == []  # Cleared after download_all
+    assert [r.link for r in downloader.results] == ["http://link1", "http://link2"]
 
 
-@patch("media_downloader.media_downloader.Pool", MockPool)
+@patch(
+    "media_downloader.media_downloader.shared_pool",
+    lambda: WorkerPool(pool_factory=MockPool),
+)
 @patch.object(MediaDownloader, "download_video")
 def test_download_all_no_valid_files(mock_download):
     mock_download.return_value = None
@@ -374,6 +401,10 @@ def test_cli_media_downloader(mock_args, mock_downloader_class):
         directory="/tmp/test_dir",
         file="mock_file.txt",
         links="link1,link2",
+        no_archive=True,
+        replay_ingest=False,
+        manifest=None,
+        resume=None,
         help=False,
     )
     mock_args.return_value = args
@@ -381,24 +412,37 @@ def test_cli_media_downloader(mock_args, mock_downloader_class):
     with patch("sys.exit") as mock_exit:
         media_downloader()
         assert mock_instance.audio is True
+        assert mock_instance.use_archive is False
         mock_instance.get_channel_videos.assert_called_once_with("test_channel")
-        mock_downloader_class.assert_called_with(download_directory="/tmp/test_dir")
-        mock_instance.open_file.assert_called_once_with("mock_file.txt")
+        mock_downloader_class.assert_called_with(
+            download_directory="/tmp/test_dir", manifest=None
+        )
+        # The link file is streamed to download_iter, not loaded up front.
+        mock_instance.open_file.assert_not_called()
         mock_instance.links.extend.assert_called()
-        mock_instance.download_all.assert_called_once()
+        mock_instance.download_iter.assert_called_once()
         mock_exit.assert_not_called()
 
     # 2. Test help branch
     mock_instance.reset_mock()
     args_help = argparse.Namespace(
-        audio=False, channel=None, directory=None, file=None, links=None, help=True
+        audio=False,
+        channel=None,
+        directory=None,
+        file=None,
+        links=None,
+        no_archive=False,
+        replay_ingest=False,
+        manifest=None,
+        resume=None,
+        help=True,
     )
     mock_args.return_value = args_help
     with patch("sys.exit", side_effect=SystemExit) as mock_exit:
         with pytest.raises(SystemExit):
             media_downloader()
         mock_exit.assert_called_once_with(0)
-        mock_instance.download_all.assert_not_called()
+        mock_instance.download_iter.assert_not_called()
 
 
 # =====================================================================
@@ -436,7 +480,9 @@ async def test_mcp_tool_download_media_success(_mock_exists, mock_downloader_cla
     download_media_func = download_media_tool.fn
 
     mock_downloader_instance = MagicMock()
-    mock_downloader_instance.download_all.return_value = "/tmp/downloads/video.mp4"
+    mock_downloader_instance.download_all_async = AsyncMock(
+        return_value="/tmp/downloads/video.mp4"
+    )
     mock_downloader_instance.output_root = "/tmp/downloads"
     mock_downloader_class.return_value = mock_downloader_instance
 
@@ -446,15 +492,20 @@ async def test_mcp_tool_download_media_success(_mock_exists, mock_downloader_cla
         video_url="https://youtube.com/watch?v=123",
         download_directory="/tmp/downloads",
         audio_only=True,
+        use_archive=False,
         ctx=mock_ctx,
     )
 
     assert result == {"status": "success", "file": "video.mp4"}
+    mock_downloader_instance.download_all_async.assert_awaited_once_with(
+        report_progress=mock_ctx.report_progress
+    )
     mock_ctx.info.assert_called_with("Download complete")
     mock_downloader_class.assert_called_once_with(
         links=["https://youtube.com/watch?v=123"],
         download_directory="/tmp/downloads",
         audio=True,
+        use_archive=False,
     )
 
 
@@ -466,7 +517,7 @@ async def test_mcp_tool_download_media_failure(mock_downloader_class):
     download_media_func = download_media_tool.fn
 
     mock_downloader_instance = MagicMock()
-    mock_downloader_instance.download_all.return_value = None
+    mock_downloader_instance.download_all_async = AsyncMock(return_value=None)
     mock_downloader_class.return_value = mock_downloader_instance
 
     result = await download_media_func(
@@ -504,6 +555,28 @@ async def test_mcp_tool_download_media_exception(mock_downloader_class):
     }
 
 
+@pytest.mark.asyncio
+async def test_mcp_tool_download_status():
+    mcp, _, _, _ = get_mcp_instance()
+    status_tool = await mcp.get_tool("download_status")
+
+    with patch("media_downloader.scheduling.host_scheduler") as mock_scheduler:
+        mock_scheduler.return_value.snapshot.return_value = {
+            "cdn.example": {
+                "limit": 1.0,
+                "in_flight": 1,
+                "successes": 3,
+                "throttles": 1,
+            }
+        }
+        result = await status_tool.fn()
+
+    assert result["host_limits"]["cdn.example"]["throttles"] == 1
+    assert result["workers"]["processes"] >= 1
+    assert set(result["info_cache"]) == {"entries", "bytes", "hits", "misses"}
+    assert result["kg_ingest"]["depth"] == 0
+
+
 @patch("media_downloader.mcp_server.get_mcp_instance")
 def test_mcp_server_entrypoint(mock_get_instance):
     mock_mcp = MagicMock()
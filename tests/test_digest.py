@@ -0,0 +1,182 @@
+"""Digests computed while media downloads, not by reading the file back."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from yt_dlp.postprocessor.common import PostProcessor
+
+from media_downloader import digest as digest_module
+from media_downloader.digest import (
+    DigestTee,
+    file_and_tree_digest,
+    iter_buffers,
+    tree_chunk_size,
+    tree_digest,
+)
+from media_downloader.media_downloader import SafeYoutubeDL
+
+_MEDIA = os.urandom(3 * 1024 * 1024 + 17)
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(_MEDIA)))
+        self.end_headers()
+        self.wfile.write(_MEDIA)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def media_server(monkeypatch):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "127.0.0.1")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+    server.shutdown()
+    server.server_close()
+
+
+def _no_read_back(path):
+    raise AssertionError("the downloaded file was read back to hash it")
+
+
+def _download(url, tmp_path, postprocessors=()):
+    opts = {"outtmpl": str(tmp_path / "%(id)s.%(ext)s"), "quiet": True}
+    with SafeYoutubeDL(opts) as ydl:
+        for pp in postprocessors:
+            ydl.add_post_processor(pp, when="post_process")
+        info = ydl.extract_info(url, download=True)
+    (download,) = info["requested_downloads"]
+    return download["filepath"], download["__media_digest"]
+
+
+def test_tee_hashes_a_growing_part_file(tmp_path):
+    tee = DigestTee()
+    final, part = tmp_path / "clip.mp4", tmp_path / "clip.mp4.part"
+    with open(part, "wb") as fh:
+        for block in (b"a" * 1000, b"b" * 5000, b"c"):
+            fh.write(block)
+            fh.flush()
+            tee.progress_hook(
+                {
+                    "status": "downloading",
+                    "filename": str(final),
+                    "tmpfilename": str(part),
+                }
+            )
+        fh.write(b"tail")
+    part.rename(final)
+    tee.progress_hook({"status": "finished", "filename": str(final)})
+
+    data = final.read_bytes()
+    assert tee.digest_of(str(final)) == (hashlib.sha256(data).hexdigest(), len(data))
+    with open(final, "ab") as fh:
+        fh.write(b"rewritten")
+    assert tee.digest_of(str(final)) is None
+
+
+def test_download_digest_is_streamed(media_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(digest_module, "file_digest", _no_read_back)
+    path, (sha256, size) = _download(media_server, tmp_path)
+
+    assert sha256 == hashlib.sha256(_MEDIA).hexdigest() and size == len(_MEDIA)
+    assert open(path, "rb").read() == _MEDIA
+
+
+class _Transcode(PostProcessor):
+    """Stands in for an audio transcode: replaces the file under a new name."""
+
+    def run(self, info):
+        source = info["filepath"]
+        target = os.path.splitext(source)[0] + ".mp3"
+        with open(source, "rb") as fh, open(target, "wb") as out:
+            out.write(b"ID3" + fh.read()[:1024])
+        os.remove(source)
+        info["filepath"], info["ext"] = target, "mp3"
+        return [], info
+
+
+def test_transcoded_download_digest_is_of_the_final_file(media_server, tmp_path):
+    path, (sha256, size) = _download(media_server, tmp_path, [_Transcode()])
+    final = open(path, "rb").read()
+
+    assert path.endswith(".mp3")
+    assert sha256 == hashlib.sha256(final).hexdigest() and size == len(final)
+
+
+def test_iter_buffers_hands_out_views_of_the_mapped_file(tmp_path, monkeypatch):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(_MEDIA)
+    chunks = list(iter_buffers(str(f)))
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert b"".join(chunks) == _MEDIA
+
+    def _no_mmap(*_args, **_kwargs):
+        raise OSError("mmap unsupported")
+
+    monkeypatch.setattr(digest_module.mmap, "mmap", _no_mmap)
+    chunks = list(iter_buffers(str(f)))
+    assert all(isinstance(chunk, bytes) for chunk in chunks)
+    assert b"".join(chunks) == _MEDIA
+
+
+def test_iter_buffers_of_an_empty_file(tmp_path):
+    f = tmp_path / "empty.mp4"
+    f.write_bytes(b"")
+    assert list(iter_buffers(str(f))) == []
+
+
+def _reference_tree_digest(data: bytes, chunk_size: int) -> str:
+    leaves = b"".join(
+        hashlib.sha256(data[i : i + chunk_size]).digest()
+        for i in range(0, max(len(data), 1), chunk_size)
+    )
+    root = hashlib.sha256(
+        b"sha256-tree1\0"
+        + chunk_size.to_bytes(8, "big")
+        + len(data).to_bytes(8, "big")
+        + leaves
+    )
+    return f"sha256-tree1:{chunk_size}:{root.hexdigest()}"
+
+
+@pytest.mark.parametrize("data", [b"", b"x" * 1000, _MEDIA])
+def test_tree_digest_matches_its_documented_format(tmp_path, data):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(data)
+    chunk = 256 * 1024
+    expected = _reference_tree_digest(data, chunk)
+    for workers in (1, 4):
+        assert tree_digest(str(f), chunk_size=chunk, workers=workers) == expected
+        assert file_and_tree_digest(str(f), chunk_size=chunk, workers=workers) == (
+            (hashlib.sha256(data).hexdigest(), len(data)),
+            expected,
+        )
+    assert tree_chunk_size(expected) == chunk
+
+
+def test_tree_digest_reads_slices_when_mmap_is_unavailable(tmp_path, monkeypatch):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(_MEDIA)
+
+    def _no_mmap(*_args, **_kwargs):
+        raise OSError("mmap unsupported")
+
+    monkeypatch.setattr(digest_module.mmap, "mmap", _no_mmap)
+    expected = _reference_tree_digest(_MEDIA, 512 * 1024)
+    assert tree_digest(str(f), chunk_size=512 * 1024, workers=3) == expected
+    assert file_and_tree_digest(str(f), chunk_size=512 * 1024, workers=3) == (
+        (hashlib.sha256(_MEDIA).hexdigest(), len(_MEDIA)),
+        expected,
+    )
@@ -0,0 +1,603 @@
+"""Download engine scheduling: async dispatch, streaming results and batching."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import importlib
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.pool import ThreadPool
+from types import SimpleNamespace
+
+import pytest
+
+from media_downloader.media_downloader import MediaDownloader
+from media_downloader.scheduling import HostScheduler
+from media_downloader.workers import WorkerPool
+
+# The package re-exports a ``media_downloader`` function that shadows the module.
+engine = importlib.import_module("media_downloader.media_downloader")
+
+
+@pytest.fixture(autouse=True)
+def media_output_root(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_OUTPUT_ROOT", str(tmp_path))
+    return tmp_path
+
+
+async def test_download_all_async_keeps_event_loop_responsive(monkeypatch, tmp_path):
+    release = threading.Event()
+    target = tmp_path / "clip.mp4"
+    target.write_bytes(b"x")
+
+    def _blocking_download(self, link, result=None):
+        release.wait(5)
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _blocking_download)
+    first = MediaDownloader(links=["https://example.test/a"])
+    second = MediaDownloader(links=["https://example.test/b"])
+    pending = asyncio.gather(first.download_all_async(), second.download_all_async())
+
+    # Both downloads are parked in worker threads; the loop still runs other work.
+    started = time.monotonic()
+    await asyncio.sleep(0.05)
+    assert time.monotonic() - started < 1
+    assert not pending.done()
+
+    release.set()
+    assert await pending == [str(target), str(target)]
+    assert first.results[0].path == str(target)
+    assert first.links == [] and second.links == []
+
+
+async def test_download_all_async_bounds_links_in_flight(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_BATCH_WINDOW", "3")
+    lock = threading.Lock()
+    running = peak = 0
+
+    def _download(self, link, result=None):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.005)
+        with lock:
+            running -= 1
+        target = tmp_path / f"{link.rsplit('/', 1)[-1]}.mp4"
+        target.write_bytes(b"x")
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    links = [f"https://example.test/{i}" for i in range(40)]
+    downloader = MediaDownloader()
+    assert await downloader.download_all_async(links=iter(links)) == str(
+        tmp_path / "0.mp4"
+    )
+    assert [r.link for r in downloader.results] == links
+    assert peak <= 3
+
+
+async def test_calls_waiting_for_a_busy_host_do_not_hold_executor_threads(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr(engine, "_ASYNC_EXECUTOR", ThreadPoolExecutor(2))
+    scheduler = HostScheduler(initial=1, maximum=1)
+    monkeypatch.setattr(engine, "host_scheduler", lambda: scheduler)
+    release = threading.Event()
+    target = tmp_path / "clip.mp4"
+    target.write_bytes(b"x")
+
+    def _download(self, link, result=None):
+        if "busy.example" in link:
+            release.wait(5)
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    busy = [
+        asyncio.ensure_future(
+            MediaDownloader().download_async(f"https://busy.example/{i}")
+        )
+        for i in range(4)
+    ]
+    await asyncio.sleep(0.05)
+    # One busy download holds the host's only slot; the others wait on the
+    # loop, leaving the second executor thread free for another host.
+    calm = await asyncio.wait_for(
+        MediaDownloader().download_async("https://calm.example/a"), 2
+    )
+    assert calm.path == str(target)
+    assert not any(future.done() for future in busy)
+
+    release.set()
+    assert all(r.path == str(target) for r in await asyncio.gather(*busy))
+    assert scheduler.snapshot()["busy.example"]["in_flight"] == 0
+
+
+async def test_download_all_async_forwards_progress_to_the_loop(monkeypatch):
+    reports = []
+
+    async def _report_progress(progress, total=None):
+        reports.append((progress, total))
+
+    def _download(self, link, result=None):
+        self.progress_hook({"status": "finished"})
+        return None
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    downloader = MediaDownloader(links=["https://example.test/a"])
+    assert await downloader.download_all_async(report_progress=_report_progress) is None
+    await asyncio.sleep(0)
+    assert reports == [(100, 100)]
+
+
+def test_download_iter_yields_every_result_in_completion_order(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(pool_factory=ThreadPool)
+    )
+    slow_started = threading.Event()
+    finished = []
+
+    def _download(self, link, result=None):
+        if link.endswith("slow"):
+            slow_started.set()
+            # Hold the slow link until the fast one has been consumed.
+            while not finished:
+                time.sleep(0.01)
+            raise RuntimeError("simulated extractor crash")
+        slow_started.wait(5)
+        target = tmp_path / "fast.mp4"
+        target.write_bytes(b"12345")
+        if result is not None:
+            result.kg_asset = {"asset_id": "media:fast"}
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    downloader = MediaDownloader(
+        links=["https://example.test/slow", "https://example.test/fast"]
+    )
+    results = []
+    for result in downloader.download_iter():
+        finished.append(result.link)
+        results.append(result)
+
+    assert [r.link for r in results] == [
+        "https://example.test/fast",
+        "https://example.test/slow",
+    ]
+    fast, slow = results
+    assert fast.path == str(tmp_path / "fast.mp4")
+    assert fast.size_bytes == 5
+    assert fast.kg_asset == {"asset_id": "media:fast"}
+    assert fast.error is None and fast.elapsed >= 0
+    assert slow.path is None and slow.error == "RuntimeError"
+
+
+def test_download_all_keeps_every_result(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(pool_factory=ThreadPool)
+    )
+    target = tmp_path / "ok.mp4"
+    target.write_bytes(b"x")
+
+    def _download(self, link, result=None):
+        if link.endswith("bad"):
+            if result is not None:
+                result.error = "DownloadError"
+            return None
+        if result is not None:
+            result.kg_asset = {"asset_id": "media:ok"}
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    downloader = MediaDownloader(
+        links=["https://example.test/bad", "https://example.test/ok"]
+    )
+    assert downloader.download_all() == str(target)
+    assert len(downloader.results) == 2
+    assert downloader.last_kg_asset == {"asset_id": "media:ok"}
+    errors = {r.link: r.error for r in downloader.results}
+    assert errors["https://example.test/bad"] == "DownloadError"
+
+
+def test_download_iter_reads_links_lazily_within_a_bounded_window(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_BATCH_WINDOW", "8")
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(4, pool_factory=ThreadPool)
+    )
+    scheduler = HostScheduler(initial=4, maximum=4)
+    monkeypatch.setattr(engine, "host_scheduler", lambda: scheduler)
+    target = tmp_path / "ok.mp4"
+    target.write_bytes(b"x")
+    monkeypatch.setattr(
+        MediaDownloader, "download_video", lambda self, link, result=None: str(target)
+    )
+    read = 0
+
+    def _links():
+        nonlocal read
+        for i in range(5_000):
+            read += 1
+            yield f"https://host{i % 3}.example/{i}"
+
+    downloader = MediaDownloader()
+    yielded = 0
+    ahead = 0
+    for result in downloader.download_iter(_links()):
+        yielded += 1
+        ahead = max(ahead, read - yielded)
+        assert result.path == str(target)
+
+    assert yielded == 5_000
+    # Never more than the window read ahead of what has been handed back.
+    assert ahead < 8
+
+
+def test_download_iter_backs_off_a_throttling_host(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(4, pool_factory=ThreadPool)
+    )
+    scheduler = HostScheduler(initial=2, maximum=4)
+    monkeypatch.setattr(engine, "host_scheduler", lambda: scheduler)
+    target = tmp_path / "ok.mp4"
+    target.write_bytes(b"x")
+
+    def _download(self, link, result=None):
+        if "busy.example" in link:
+            result.throttled = True
+            result.error = "DownloadError"
+            return None
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    downloader = MediaDownloader(
+        links=[f"https://busy.example/{i}" for i in range(3)]
+        + [f"https://calm.example/{i}" for i in range(3)]
+    )
+    results = list(downloader.download_iter())
+
+    assert len(results) == 6
+    limits = scheduler.snapshot()
+    assert limits["busy.example"]["limit"] == 1
+    assert limits["busy.example"]["throttles"] == 3
+    assert limits["calm.example"]["limit"] == 3.5
+    assert all(state["in_flight"] == 0 for state in limits.values())
+
+
+def test_stopping_download_iter_early_frees_every_host_slot(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(4, pool_factory=ThreadPool)
+    )
+    scheduler = HostScheduler(initial=4, maximum=4)
+    monkeypatch.setattr(engine, "host_scheduler", lambda: scheduler)
+    release = threading.Event()
+    target = tmp_path / "ok.mp4"
+    target.write_bytes(b"x")
+
+    def _download(self, link, result=None):
+        if not link.endswith("/0"):
+            release.wait(5)
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    downloader = MediaDownloader(links=[f"https://busy.example/{i}" for i in range(4)])
+    for _ in downloader.download_iter():
+        break
+
+    # The other three are still downloading; their slots come back when they end.
+    release.set()
+    deadline = time.monotonic() + 5
+    while scheduler.snapshot()["busy.example"]["in_flight"] and (
+        time.monotonic() < deadline
+    ):
+        time.sleep(0.01)
+    assert scheduler.snapshot()["busy.example"]["in_flight"] == 0
+    assert scheduler.acquire("busy.example", timeout=1)
+
+
+def _fake_extractor(monkeypatch, tmp_path, *, fail_downloads=0):
+    """Count extractions and fail the first ``fail_downloads`` downloads."""
+    calls = {"extract": 0, "download": 0}
+    public = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 443))]
+    monkeypatch.setattr(socket, "getaddrinfo", lambda *_args, **_kwargs: public)
+
+    def _extract_info(self, url, download=True, process=True, **kwargs):
+        calls["extract"] += 1
+        return {
+            "id": "dQw4w9WgXcQ",
+            "title": "Clip",
+            "extractor_key": "Youtube",
+            "formats": [{"format_id": "18", "url": "https://cdn.example/18.mp4"}],
+            "automatic_captions": {"en": [{"url": "https://cdn.example/en.vtt"}]},
+        }
+
+    def _process_ie_result(self, info, download=True, extra_info=None):
+        calls["download"] += 1
+        if calls["download"] <= fail_downloads:
+            raise engine.yt_dlp.utils.DownloadError("ERROR: unable to write file")
+        return info
+
+    monkeypatch.setattr(engine.SafeYoutubeDL, "extract_info", _extract_info)
+    monkeypatch.setattr(engine.SafeYoutubeDL, "process_ie_result", _process_ie_result)
+    monkeypatch.setattr(
+        engine.SafeYoutubeDL,
+        "prepare_filename",
+        lambda self, info: str(tmp_path / f"{info['id']}.mp4"),
+    )
+    return calls
+
+
+def test_repeat_requests_reuse_cached_info(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path)
+    link = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    downloader = MediaDownloader(ingest_to_kg=False)
+
+    assert downloader.download_video(link) == str(tmp_path / "dQw4w9WgXcQ.mp4")
+    assert MediaDownloader(ingest_to_kg=False).download_video(f"{link}&t=5")
+    assert calls == {"extract": 1, "download": 2}
+    stats = downloader.info_cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+    cached = downloader.info_cache.get("Youtube:dQw4w9WgXcQ")
+    assert "automatic_captions" not in cached and cached["formats"]
+
+
+def test_fallback_template_reuses_info_from_the_failed_attempt(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path, fail_downloads=1)
+    downloader = MediaDownloader(ingest_to_kg=False)
+    assert downloader.download_video("https://youtu.be/dQw4w9WgXcQ")
+    assert calls == {"extract": 1, "download": 2}
+
+
+def test_failed_download_from_older_cached_info_extracts_again(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path)
+    link = "https://youtu.be/dQw4w9WgXcQ"
+    MediaDownloader(ingest_to_kg=False).download_video(link)
+    calls["download"] = -1  # the next download fails once more
+
+    def _failing_once(self, info, download=True, extra_info=None):
+        calls["download"] += 1
+        if calls["download"] == 0:
+            raise engine.yt_dlp.utils.DownloadError("HTTP Error 403: Forbidden")
+        return info
+
+    monkeypatch.setattr(engine.SafeYoutubeDL, "process_ie_result", _failing_once)
+    assert MediaDownloader(ingest_to_kg=False).download_video(link)
+    assert calls["extract"] == 2
+
+
+def test_archived_media_is_skipped_before_any_request(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path)
+    (tmp_path / "dQw4w9WgXcQ.mp4").write_bytes(b"video")
+    first = MediaDownloader(ingest_to_kg=False)
+    path = first.download_video("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+    def _no_network(*_args, **_kwargs):
+        raise AssertionError("archived media must not touch the network")
+
+    monkeypatch.setattr(socket, "getaddrinfo", _no_network)
+    monkeypatch.setattr(engine.SafeYoutubeDL, "extract_info", _no_network)
+    result = engine.DownloadResult(link="https://youtu.be/dQw4w9WgXcQ")
+    again = MediaDownloader(ingest_to_kg=False, links=[result.link])
+    assert again.download_video(result.link, result) == path
+    assert result.archived
+    assert calls["download"] == 1
+
+
+def test_archive_can_be_bypassed_and_forgets_missing_files(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path)
+    target = tmp_path / "dQw4w9WgXcQ.mp4"
+    target.write_bytes(b"video")
+    link = "https://youtu.be/dQw4w9WgXcQ"
+    MediaDownloader(ingest_to_kg=False).download_video(link)
+
+    MediaDownloader(ingest_to_kg=False, use_archive=False).download_video(link)
+    assert calls["download"] == 2
+
+    target.unlink()
+    downloader = MediaDownloader(ingest_to_kg=False)
+    assert downloader.archive.lookup("Youtube:dQw4w9WgXcQ", "video") is None
+    downloader.download_video(link)
+    assert calls["download"] == 3
+
+
+def test_archive_hit_places_the_file_in_the_requested_directory(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path)
+    (tmp_path / "dQw4w9WgXcQ.mp4").write_bytes(b"video")
+    link = "https://youtu.be/dQw4w9WgXcQ"
+    MediaDownloader(ingest_to_kg=False).download_video(link)
+
+    clips = MediaDownloader(download_directory="clips", ingest_to_kg=False)
+    path = clips.download_video(link)
+
+    assert path == str(tmp_path / "clips" / "dQw4w9WgXcQ.mp4")
+    assert open(path, "rb").read() == b"video"
+    assert calls["download"] == 1
+
+
+def test_rumble_pages_are_archived_under_their_own_id(monkeypatch, tmp_path):
+    calls = _fake_extractor(monkeypatch, tmp_path)
+    (tmp_path / "dQw4w9WgXcQ.mp4").write_bytes(b"video")
+    pages = []
+
+    def _page(url, **_kwargs):
+        pages.append(url)
+        return SimpleNamespace(text='"embedUrl":"https://rumble.com/embed/v4xyz/"')
+
+    monkeypatch.setattr(engine, "safe_metadata_get", _page)
+    link = "https://rumble.com/v4abcd-clip.html"
+    path = MediaDownloader(ingest_to_kg=False).download_video(link)
+
+    downloader = MediaDownloader(ingest_to_kg=False)
+    assert downloader.archive.lookup("Rumble:v4abcd-clip.html", "video").path == path
+    # The page link is answered from the archive, without fetching the page.
+    assert downloader.download_video(link) == path
+    assert len(pages) == 1 and calls["download"] == 1
+
+
+class _Stored:
+    def __init__(self, asset_id):
+        self.asset_id = asset_id
+        self.digest = None
+
+
+def test_download_iter_ingests_finished_files_in_one_batch(monkeypatch, tmp_path):
+    from media_downloader import kg_media
+
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(pool_factory=ThreadPool)
+    )
+    _fake_extractor(monkeypatch, tmp_path)
+
+    def _extract_info(self, url, download=True, process=True, **kwargs):
+        video_id = url.rsplit("/", 1)[-1]
+        return {"id": video_id, "title": video_id, "extractor_key": "Youtube"}
+
+    def _process_ie_result(self, info, download=True, extra_info=None):
+        (tmp_path / f"{info['id']}.mp4").write_bytes(info["id"].encode())
+        return info
+
+    monkeypatch.setattr(engine.SafeYoutubeDL, "extract_info", _extract_info)
+    monkeypatch.setattr(engine.SafeYoutubeDL, "process_ie_result", _process_ie_result)
+
+    batches = []
+
+    class _BatchStore:
+        def store_media_batch(self, items):
+            batches.append([item["name"] for item in items])
+            return [_Stored(f"media:{item['name']}") for item in items]
+
+    monkeypatch.setattr(
+        kg_media, "_BATCHER", kg_media.IngestBatcher(_BatchStore(), max_delay=60)
+    )
+    ids = ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"]
+    downloader = MediaDownloader(links=[f"https://youtu.be/{i}" for i in ids])
+    results = list(downloader.download_iter())
+
+    assert len(batches) == 1 and sorted(batches[0]) == ids
+    assert sorted(r.kg_asset["asset_id"] for r in results) == [
+        f"media:{i}" for i in ids
+    ]
+    assert not downloader._defer_ingest
+
+
+def test_download_returns_while_a_stalled_engine_ingests(monkeypatch, tmp_path):
+    from media_downloader import kg_media
+
+    _fake_extractor(monkeypatch, tmp_path)
+    (tmp_path / "dQw4w9WgXcQ.mp4").write_bytes(b"video")
+    release = threading.Event()
+
+    class _StalledStore:
+        def store_media(self, data, **kw):
+            assert release.wait(5)
+            return _Stored("media:late")
+
+    batcher = kg_media.IngestBatcher(_StalledStore(), max_items=1)
+    monkeypatch.setattr(kg_media, "_QUEUE", kg_media.IngestQueue(batcher))
+    downloader = MediaDownloader(use_archive=False)
+    result = engine.DownloadResult(link="https://youtu.be/dQw4w9WgXcQ")
+
+    assert downloader.download_video(result.link, result)
+    assert result.kg_asset is None and kg_media.ingest_queue().depth() == 1
+    release.set()
+    assert result.kg_future.result(timeout=5)["asset_id"] == "media:late"
+    assert result.kg_asset == downloader.last_kg_asset
+
+
+class _FlakyMediaServer(ThreadingHTTPServer):
+    """Serves one file with range support, cutting the first ``drops`` responses."""
+
+    media = os.urandom(3 * 1024 * 1024 + 17)
+
+    def __init__(self, drops):
+        super().__init__(("127.0.0.1", 0), _FlakyMediaHandler)
+        self.drops = drops
+        self.starts: list[int] = []
+
+
+class _FlakyMediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        media = self.server.media
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        start = int(match.group(1)) if match else 0
+        self.server.starts.append(start)
+        if match:
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(media) - 1}/{len(media)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(media) - start))
+        self.end_headers()
+        if self.server.drops > 0:
+            self.server.drops -= 1
+            self.wfile.write(media[start : start + 256 * 1024])
+            self.close_connection = True
+            return
+        self.wfile.write(media[start:])
+
+    def log_message(self, *_args):
+        pass
+
+
+def test_retry_resumes_the_staged_partial_instead_of_starting_over(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "127.0.0.1")
+    # The extraction probe and the first transfer are cut mid-stream, failing
+    # the first attempt; the fallback-template attempt has to finish the file.
+    server = _FlakyMediaServer(drops=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+        result = engine.DownloadResult(link=url)
+        path = MediaDownloader(ingest_to_kg=False).download_video(url, result)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert path == str(tmp_path / "clip.mp4")
+    with open(path, "rb") as fh:
+        assert fh.read() == server.media
+    assert result.digest == hashlib.sha256(server.media).hexdigest()
+    # The completing request picked up where the cut transfer stopped.
+    assert server.starts[-1] >= 128 * 1024
+    assert not list((tmp_path / ".media-downloader" / "staging").iterdir())
+
+
+def test_concurrent_downloads_of_one_media_take_turns_with_its_staged_files(
+    tmp_path,
+):
+    staging = str(tmp_path / "staging")
+    clip = {"extractor_key": "Generic", "id": "clip"}
+    order = []
+
+    def _download(info, name):
+        with engine._staging_lock(staging, info):
+            order.append(name)
+
+    with engine._staging_lock(staging, clip):
+        other = threading.Thread(target=_download, args=({"id": "other"}, "other"))
+        same = threading.Thread(target=_download, args=(clip, "same"))
+        other.start(), same.start()
+        other.join(5)
+        time.sleep(0.2)
+        order.append("first")
+    same.join(5)
+
+    # Other media is not held up; the same media waits for the first download.
+    assert order == ["other", "first", "same"]
+    assert not os.listdir(staging)
@@ -6,9 +6,14 @@
 
 from __future__ import annotations
 
+import hashlib
 import os
+import threading
+import tracemalloc
 from dataclasses import dataclass
+from types import SimpleNamespace
 
+from media_downloader import kg_media
 from media_downloader.kg_media import ingest_media_file
 
 
@@ -29,6 +34,23 @@ def store_media(self, data, **kw):
         return _Stored(asset_id="media:deadbeef", digest="deadbeef")
 
 
+class _FakeStreamingMediaStore:
+    """A store exposing ``store_media_stream``; hashes chunks without keeping them."""
+
+    def __init__(self):
+        self.calls = []
+        self.chunk_sizes = []
+
+    def store_media_stream(self, chunks, **kw):
+        hasher = hashlib.sha256()
+        for chunk in chunks:
+            self.chunk_sizes.append(len(chunk))
+            hasher.update(chunk)
+        self.calls.append(kw)
+        digest = hasher.hexdigest()
+        return _Stored(asset_id=f"media:{digest[:8]}", digest=digest)
+
+
 def test_ingest_media_file_stores_bytes_and_metadata(tmp_path):
     f = tmp_path / "clip.mp4"
     f.write_bytes(b"\x00\x01video-bytes\x02")
@@ -91,8 +113,27 @@ def test_ingest_media_file_noops_on_missing_file():
     assert ingest_media_file("/no/such/file.mp4", media_store=_FakeMediaStore()) is None
 
 
+def test_legacy_store_gets_files_over_the_inline_limit_memory_mapped(
+    monkeypatch, tmp_path, caplog
+):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_KG_INLINE_MAX_MB", "1")
+    f = tmp_path / "long.mp4"
+    data = b"v" * (1024 * 1024 + 1)
+    f.write_bytes(data)
+    store = _FakeMediaStore()
+
+    # Ingested (never spooled), from the page cache rather than a bytes copy.
+    res = ingest_media_file(str(f), media_store=store)
+    assert res is not None and res["size_bytes"] == len(data)
+    assert isinstance(store.calls[0][0], memoryview)
+    assert "memory-mapped view" in caplog.text
+    f.write_bytes(b"v" * (1024 * 1024))
+    assert ingest_media_file(str(f), media_store=store) is not None
+    assert isinstance(store.calls[1][0], bytes)
+
+
 def test_download_video_invokes_native_ingest(monkeypatch, tmp_path):
-    """The download path natively calls ingestion and records the asset."""
+    """The download path natively queues ingestion and records the asset."""
     from media_downloader.media_downloader import MediaDownloader
 
     dl = MediaDownloader(
@@ -108,8 +149,10 @@ def _fake_ingest(path, **kw):
         return {"asset_id": "media:x", "digest": "x", "size_bytes": 1, "media_type": "video"}
 
     monkeypatch.setattr("media_downloader.kg_media.ingest_media_file", _fake_ingest)
-    dl._maybe_ingest("/tmp/out.mp4", {"id": "z"}, "https://example.test/z")
+    queued = dl._maybe_ingest("/tmp/out.mp4", {"id": "z"}, "https://example.test/z")
 
+    # Ingestion runs on the background queue; the future resolves to the asset.
+    assert queued.result(timeout=5)["asset_id"] == "media:x"
     assert captured["path"] == "/tmp/out.mp4"
     assert dl.last_kg_asset == {
         "asset_id": "media:x",
@@ -130,3 +173,298 @@ def test_ingest_disabled_when_flag_off(tmp_path):
     dl._maybe_ingest("/tmp/out.mp4", {}, "u")
     assert dl.last_kg_asset is None
     assert os.path.basename(__file__) == "test_kg_media.py"
+
+
+def test_ingest_streams_large_files_in_bounded_chunks(tmp_path):
+    f = tmp_path / "long.mp4"
+    with open(f, "wb") as fh:
+        for _ in range(16):
+            fh.write(os.urandom(1024 * 1024))
+    store = _FakeStreamingMediaStore()
+
+    tracemalloc.start()
+    try:
+        res = ingest_media_file(str(f), info={"title": "Long"}, media_store=store)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert res["digest"] == hashlib.sha256(f.read_bytes()).hexdigest()
+    assert res["size_bytes"] == 16 * 1024 * 1024
+    assert max(store.chunk_sizes) <= 1024 * 1024
+    assert peak < 4 * 1024 * 1024
+    kw = store.calls[0]
+    assert kw["size_bytes"] == 16 * 1024 * 1024
+    assert kw["name"] == "Long" and kw["mime_type"] == "video/mp4"
+
+
+def test_streaming_ingest_uploads_views_of_the_file(tmp_path):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"v" * (3 * 1024 * 1024))
+    seen = []
+
+    class _Store(_FakeStreamingMediaStore):
+        def store_media_stream(self, chunks, **kw):
+            return super().store_media_stream(
+                (seen.append(type(chunk)) or chunk for chunk in chunks), **kw
+            )
+
+    res = ingest_media_file(str(f), media_store=_Store())
+    assert seen == [memoryview] * 3
+    assert res["digest"] == hashlib.sha256(f.read_bytes()).hexdigest()
+
+
+class _FakeEngine:
+    _client = object()
+
+
+def test_store_handle_connects_once_for_a_whole_batch(monkeypatch, tmp_path):
+    connects = []
+
+    def _connect():
+        connects.append(1)
+        return _FakeEngine(), _FakeMediaStore()
+
+    monkeypatch.setattr(kg_media, "_connect_media_store", _connect)
+    monkeypatch.setattr(kg_media, "_STORE_HANDLE", kg_media._MediaStoreHandle())
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"x")
+    for _ in range(500):
+        assert ingest_media_file(str(f))["asset_id"] == "media:deadbeef"
+    assert len(connects) == 1
+
+
+def test_store_handle_caches_unavailability_and_reconnects(monkeypatch, tmp_path):
+    engine, store = _FakeEngine(), _FakeMediaStore()
+    answers = [None, (engine, store)]
+    now = [1000.0]
+    monkeypatch.setattr(kg_media, "_connect_media_store", lambda: answers.pop(0))
+    monkeypatch.setattr(kg_media.time, "monotonic", lambda: now[0])
+    handle = kg_media._MediaStoreHandle(retry_interval=60)
+
+    assert handle.get() is None
+    now[0] += 30
+    assert handle.get() is None  # still inside the retry interval: no probe
+    assert handle.connects == 1
+    now[0] += 31
+    assert handle.get() is store
+    assert handle.get() is store and handle.connects == 2
+
+    engine._client = None  # the engine lost its connection
+    answers.append((_FakeEngine(), _FakeMediaStore()))
+    assert handle.get() is not store
+    assert handle.connects == 3
+
+
+class _FakeBatchMediaStore(_FakeMediaStore):
+    """Adds ``store_media_batch``: every item of a batch in one transaction."""
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.batches = []
+
+    def store_media_batch(self, items):
+        if self.fail:
+            raise RuntimeError("transaction aborted")
+        # ``data`` is a view of the mapped file, released once this returns.
+        self.batches.append([{**item, "data": bytes(item["data"])} for item in items])
+        return [
+            _Stored(asset_id=f"media:{item['name']}", digest=f"d-{item['name']}")
+            for item in items
+        ]
+
+
+def _clips(tmp_path, count):
+    paths = []
+    for i in range(count):
+        f = tmp_path / f"clip{i}.mp4"
+        f.write_bytes(b"x" * (i + 1))
+        paths.append(str(f))
+    return paths
+
+
+def test_batcher_commits_full_batches_in_one_transaction(tmp_path):
+    store = _FakeBatchMediaStore()
+    batcher = kg_media.IngestBatcher(store, max_items=4, max_delay=60)
+    futures = [
+        batcher.submit(path, info={"title": f"clip{i}"})
+        for i, path in enumerate(_clips(tmp_path, 6))
+    ]
+    assert [len(batch) for batch in store.batches] == [4]
+    assert batcher.pending() == 2
+    batcher.flush()
+
+    assert [len(batch) for batch in store.batches] == [4, 2]
+    assets = [future.result(timeout=1) for future in futures]
+    assert [a["asset_id"] for a in assets] == [f"media:clip{i}" for i in range(6)]
+    assert assets[2] == {
+        "asset_id": "media:clip2",
+        "digest": "d-clip2",
+        "size_bytes": 3,
+        "media_type": "video",
+    }
+    assert store.batches[0][0]["data"] == b"x" and not store.calls
+
+
+def test_batcher_flushes_after_the_time_window(tmp_path):
+    store = _FakeBatchMediaStore()
+    batcher = kg_media.IngestBatcher(store, max_delay=0.05)
+    (path,) = _clips(tmp_path, 1)
+    future = batcher.submit(path, info={"title": "clip0"})
+    assert future.result(timeout=5)["asset_id"] == "media:clip0"
+    assert len(store.batches) == 1
+
+
+def test_batcher_ingests_at_once_for_stores_without_batches(tmp_path):
+    store = _FakeMediaStore()
+    batcher = kg_media.IngestBatcher(store, max_delay=60)
+    (path,) = _clips(tmp_path, 1)
+
+    # Nothing would share a transaction, so nothing waits for the window.
+    future = batcher.submit(path)
+    assert future.done() and future.result()["asset_id"] == "media:deadbeef"
+    assert batcher.pending() == 0 and len(store.calls) == 1
+
+
+def test_batcher_falls_back_to_single_ingests(tmp_path):
+    store = _FakeBatchMediaStore(fail=True)
+    batcher = kg_media.IngestBatcher(store, max_items=3, max_bytes=2)
+    small, large, _ = _clips(tmp_path, 3)
+
+    # Larger than a whole batch: ingested on its own, never held in a batch.
+    assert batcher.submit(large).result(timeout=1)["size_bytes"] == 2
+    futures = [batcher.submit(small), batcher.submit(str(tmp_path / "gone.mp4"))]
+    batcher.close()
+    assert futures[0].result(timeout=1)["asset_id"] == "media:deadbeef"
+    assert futures[1].result(timeout=1) is None
+    assert len(store.calls) == 2 and not store.batches
+
+
+class _FakeDedupingMediaStore(_FakeStreamingMediaStore):
+    """Content-addressed store that can look blobs up by digest."""
+
+    def __init__(self, known=()):
+        super().__init__()
+        self.known = {hashlib.sha256(data).hexdigest() for data in known}
+        self.occurrences = []
+        self.batches = []
+
+    def find_media_by_digest(self, digest):
+        if digest in self.known:
+            return _Stored(asset_id=f"media:{digest[:8]}", digest=digest)
+        return None
+
+    def store_media_occurrence(self, asset_id, **properties):
+        self.occurrences.append((asset_id, properties))
+        return SimpleNamespace(occurrence_id=f"occ:{len(self.occurrences)}")
+
+    def store_media_batch(self, items):
+        self.batches.append([{**item, "data": bytes(item["data"])} for item in items])
+        return [
+            _Stored(asset_id="media:new", digest=hashlib.sha256(i["data"]).hexdigest())
+            for i in items
+        ]
+
+
+def test_known_digest_records_an_occurrence_without_uploading(tmp_path):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"popular-video" * 1000)
+    store = _FakeDedupingMediaStore(known=[f.read_bytes()])
+    digest = hashlib.sha256(f.read_bytes()).hexdigest()
+
+    res = ingest_media_file(
+        str(f),
+        info={"title": "Clip"},
+        source_url="https://example.test/watch?v=abc123",
+        media_store=store,
+    )
+
+    assert not store.calls and not store.chunk_sizes
+    assert res["deduplicated"] and res["occurrence_id"] == "occ:1"
+    assert res["asset_id"] == f"media:{digest[:8]}" and res["digest"] == digest
+    asset_id, properties = store.occurrences[0]
+    assert asset_id == res["asset_id"]
+    assert properties["mediaDigest"] == digest
+    assert properties["sourceRecordRef"] == "https://example.test"
+    assert properties["provenanceReference"] == "media-downloader"
+    assert properties["tenantReference"] and properties["accessPolicyReference"]
+
+
+def test_unknown_digest_is_uploaded(tmp_path):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"fresh-video")
+    store = _FakeDedupingMediaStore()
+    res = ingest_media_file(str(f), media_store=store)
+    assert len(store.calls) == 1 and not store.occurrences
+    assert "deduplicated" not in res
+
+
+def test_batcher_only_commits_bytes_the_graph_lacks(tmp_path):
+    known, fresh = _clips(tmp_path, 2)
+    with open(known, "rb") as fh:
+        store = _FakeDedupingMediaStore(known=[fh.read()])
+    batcher = kg_media.IngestBatcher(store, max_items=2, max_delay=60)
+    first, second = batcher.submit(known), batcher.submit(fresh)
+
+    assert first.result(timeout=1)["deduplicated"]
+    assert second.result(timeout=1)["asset_id"] == "media:new"
+    assert [len(batch) for batch in store.batches] == [1]
+    assert store.batches[0][0]["data"] == b"xx"
+
+
+def test_digest_from_the_download_spares_re_reading_for_dedupe(tmp_path, monkeypatch):
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"popular-video")
+    store = _FakeDedupingMediaStore(known=[f.read_bytes()])
+    digest = (hashlib.sha256(f.read_bytes()).hexdigest(), f.stat().st_size)
+
+    def _no_read_back(path):
+        raise AssertionError("digest was recomputed")
+
+    monkeypatch.setattr(kg_media, "file_digest", _no_read_back)
+    assert ingest_media_file(str(f), media_store=store, digest=digest)["deduplicated"]
+    batcher = kg_media.IngestBatcher(store, max_items=1)
+    assert batcher.submit(str(f), digest=digest).result(timeout=1)["deduplicated"]
+
+
+class _StalledMediaStore(_FakeMediaStore):
+    """A store whose commits hang until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def store_media(self, data, **kw):
+        assert self.release.wait(5)
+        return super().store_media(data, **kw)
+
+
+def test_ingest_queue_returns_at_once_and_reports_depth(tmp_path):
+    store = _StalledMediaStore()
+    queue = kg_media.IngestQueue(kg_media.IngestBatcher(store, max_items=1))
+    futures = [queue.submit(path) for path in _clips(tmp_path, 3)]
+
+    assert queue.depth() == 3 and not any(f.done() for f in futures)
+    store.release.set()
+    assert all(f.result(timeout=5)["asset_id"] == "media:deadbeef" for f in futures)
+    assert queue.join(timeout=5)
+    assert queue.stats() == {"depth": 0, "capacity": 256, "workers": 2, "completed": 3}
+
+
+def test_ingest_queue_pushes_back_when_full(tmp_path):
+    store = _StalledMediaStore()
+    queue = kg_media.IngestQueue(
+        kg_media.IngestBatcher(store, max_items=1), max_pending=2
+    )
+    first, second, third = _clips(tmp_path, 3)
+    queue.submit(first), queue.submit(second)
+    blocked = threading.Thread(target=queue.submit, args=(third,))
+    blocked.start()
+    blocked.join(0.2)
+
+    assert blocked.is_alive() and queue.depth() == 2
+    store.release.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    assert queue.join(timeout=5) and queue.stats()["completed"] == 3
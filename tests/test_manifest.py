@@ -0,0 +1,192 @@
+"""Batch download manifest: per-link states, batched commits and resume."""
+
+from __future__ import annotations
+
+import importlib
+import pickle
+import sys
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+from media_downloader.manifest import DONE, FAILED, QUEUED, STARTED, DownloadManifest
+from media_downloader.media_downloader import MediaDownloader
+from media_downloader.scheduling import HostScheduler
+from media_downloader.workers import WorkerPool
+
+engine = importlib.import_module("media_downloader.media_downloader")
+
+
+@pytest.fixture(autouse=True)
+def media_output_root(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_OUTPUT_ROOT", str(tmp_path))
+    monkeypatch.setattr(
+        engine, "shared_pool", lambda: WorkerPool(1, pool_factory=ThreadPool)
+    )
+    scheduler = HostScheduler(initial=1, maximum=1)
+    monkeypatch.setattr(engine, "host_scheduler", lambda: scheduler)
+    return tmp_path
+
+
+def test_unfinished_links_are_those_last_queued_or_started(tmp_path):
+    manifest = DownloadManifest(tmp_path / "batch.sqlite3")
+    links = [f"https://example.test/{i}" for i in range(5)]
+    for link in links:
+        manifest.record(link, QUEUED)
+    manifest.flush()
+    manifest.record(links[0], STARTED)
+    manifest.record(links[0], DONE, path="/media/0.mp4")
+    manifest.record(links[1], STARTED)
+    manifest.record(links[2], STARTED)
+    manifest.record(links[2], FAILED, error="DownloadError")
+    manifest.record(links[3], STARTED)
+
+    # Transitions wait for their batch (or a flush) to be committed.
+    reopened = DownloadManifest(manifest.path)
+    assert reopened.unfinished() == links
+    manifest.flush()
+    assert reopened.unfinished() == [links[1], links[3], links[4]]
+    assert reopened.summary() == {"queued": 1, "started": 2, "done": 1, "failed": 1}
+
+
+def test_transitions_are_committed_in_batches(tmp_path):
+    manifest = DownloadManifest(tmp_path / "batch.sqlite3", max_delay=3600)
+    links = [f"https://example.test/{i}" for i in range(100_000)]
+    for link in links:
+        manifest.record(link, QUEUED)
+        manifest.record(link, STARTED)
+        manifest.record(link, DONE)
+    for link in links[-3:]:
+        manifest.record(link, FAILED, error="DownloadError")
+
+    # One commit per 256 transitions; the last few are still pending.
+    assert manifest.commits == 300_003 // 256
+    assert manifest.unfinished() == []
+    assert manifest.summary()["failed"] == 3
+
+
+def test_resume_downloads_only_unfinished_links(monkeypatch, tmp_path):
+    downloaded = []
+
+    def _download(self, link, result=None):
+        downloaded.append(link)
+        target = tmp_path / f"{link.rsplit('/', 1)[-1]}.mp4"
+        target.write_bytes(b"x")
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    path = tmp_path / "batch.sqlite3"
+    links = [f"https://example.test/{i}" for i in range(4)]
+    downloader = MediaDownloader(links=list(links), manifest=path)
+    results = downloader.download_iter()
+    assert next(results).link == links[0]
+    # The process dies before the rest of the batch runs.
+    results.close()
+
+    assert DownloadManifest(path).unfinished() == links[1:]
+    monkeypatch.setattr(
+        sys, "argv", ["media-downloader", "--resume", str(path), "-d", str(tmp_path)]
+    )
+    engine.media_downloader()
+
+    assert downloaded == links
+    assert DownloadManifest(path).summary()["done"] == 4
+
+
+def test_resume_also_queues_inputs_the_batch_never_reached(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_BATCH_WINDOW", "2")
+    downloaded = []
+
+    def _download(self, link, result=None):
+        downloaded.append(link)
+        target = tmp_path / f"{link.rsplit('/', 1)[-1]}.mp4"
+        target.write_bytes(b"x")
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    path = tmp_path / "batch.sqlite3"
+    links = [f"https://example.test/{i}" for i in range(6)]
+    results = MediaDownloader(manifest=path).download_iter(iter(links))
+    assert next(results).link == links[0]
+    results.close()
+
+    # Only the window was read before the batch stopped.
+    assert DownloadManifest(path).unfinished() == [links[1]]
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["media-downloader", "--resume", str(path), "-d", str(tmp_path)]
+        + ["-l", ",".join(links)],
+    )
+    engine.media_downloader()
+
+    assert downloaded == links
+    assert DownloadManifest(path).summary()["done"] == 6
+
+
+def test_resume_without_a_manifest_errors_out(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(MediaDownloader, "download_video", pytest.fail)
+    path = tmp_path / "missing.sqlite3"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["media-downloader", "--resume", str(path), "-d", str(tmp_path)]
+        + ["-l", "https://example.test/a"],
+    )
+    with pytest.raises(SystemExit) as exited:
+        engine.media_downloader()
+
+    assert exited.value.code == 2
+    assert "no manifest at" in capsys.readouterr().err
+    assert not path.exists()
+
+
+def test_batches_record_a_manifest_by_default(monkeypatch, tmp_path):
+    def _download(self, link, result=None):
+        if result is not None:
+            result.error = "DownloadError"
+        return None
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["media-downloader", "-l", "https://example.test/a", "-d", str(tmp_path)],
+    )
+    engine.media_downloader()
+
+    (path,) = (tmp_path / ".media-downloader" / "manifests").glob("*.sqlite3")
+    manifest = DownloadManifest(path)
+    assert manifest.summary() == {"queued": 0, "started": 0, "done": 0, "failed": 1}
+    assert manifest.unfinished() == []
+
+
+def test_batches_without_failures_remove_their_manifest(monkeypatch, tmp_path):
+    def _download(self, link, result=None):
+        target = tmp_path / "a.mp4"
+        target.write_bytes(b"x")
+        return str(target)
+
+    monkeypatch.setattr(MediaDownloader, "download_video", _download)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["media-downloader", "-l", "https://example.test/a", "-d", str(tmp_path)],
+    )
+    engine.media_downloader()
+
+    # Nothing to resume, so nothing is left under manifests/.
+    assert not list((tmp_path / ".media-downloader" / "manifests").iterdir())
+
+
+def test_downloader_with_a_manifest_pickles_into_workers(tmp_path):
+    manifest = DownloadManifest(tmp_path / "batch.sqlite3", batch_events=8)
+    manifest.record("https://example.test/a", STARTED)
+    downloader = MediaDownloader(manifest=manifest.path)
+    downloader.manifest = manifest
+
+    copy = pickle.loads(pickle.dumps(downloader.download_result)).__self__
+
+    assert copy.manifest.path == manifest.path
+    assert copy.manifest.batch_events == 8
+    assert copy.manifest.unfinished() == []
@@ -0,0 +1,172 @@
+"""Retry classification, backoff and the network paths that share them."""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import yt_dlp
+
+from media_downloader import retry, security
+from media_downloader.retry import (
+    PERMANENT,
+    THROTTLED,
+    TRANSIENT,
+    RetryPolicy,
+    classify_error,
+    retry_after,
+)
+from media_downloader.security import MediaSecurityError, safe_metadata_get
+
+engine = importlib.import_module("media_downloader.media_downloader")
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def _wrapped(exc):
+    """``exc`` as yt-dlp reports it: a DownloadError carrying its exc_info."""
+    try:
+        raise exc
+    except Exception:
+        return yt_dlp.utils.DownloadError("ERROR: download failed", sys.exc_info())
+
+
+@pytest.mark.parametrize(
+    ("exc", "kind"),
+    [
+        (MediaSecurityError("Media URL resolves to a non-public address"), PERMANENT),
+        (_wrapped(yt_dlp.utils.UnsupportedError("https://example.test")), PERMANENT),
+        (_wrapped(yt_dlp.utils.GeoRestrictedError("blocked")), PERMANENT),
+        (
+            _wrapped(yt_dlp.utils.ExtractorError("Private video", expected=True)),
+            PERMANENT,
+        ),
+        (_http_error(404), PERMANENT),
+        (_http_error(429), THROTTLED),
+        (_http_error(503), THROTTLED),
+        (_wrapped(TimeoutError("read timed out")), THROTTLED),
+        (_http_error(500), TRANSIENT),
+        (requests.ConnectionError("connection reset"), TRANSIENT),
+        (_wrapped(yt_dlp.utils.ContentTooShortError(10, 20)), TRANSIENT),
+        (RuntimeError("unexpected"), TRANSIENT),
+    ],
+)
+def test_errors_are_classified(exc, kind):
+    assert classify_error(exc) == kind
+
+
+def test_backoff_grows_exponentially_with_jitter_and_is_capped():
+    policy = RetryPolicy(attempts=10, base_delay=1, max_delay=8, jitter=lambda: 1.0)
+    transient = RuntimeError("reset")
+    assert [policy.delay(n, transient) for n in range(1, 6)] == [1, 2, 4, 8, 8]
+    assert policy.delay(1, _http_error(429)) == 2
+    low = RetryPolicy(attempts=3, base_delay=4, jitter=lambda: 0.0)
+    assert low.delay(1, transient) == 2
+    assert low.delay(3, transient) is None
+    assert low.delay(1, _http_error(404)) is None
+
+
+def test_retry_after_is_honoured_within_limits():
+    policy = RetryPolicy(base_delay=0, max_retry_after=60)
+    assert retry_after(_http_error(429, {"Retry-After": "7"})) == 7
+    assert policy.delay(1, _http_error(429, {"Retry-After": "7"})) == 7
+    dated = _http_error(503, {"Retry-After": formatdate(usegmt=True)})
+    assert 0 <= retry_after(dated) <= 1
+    assert policy.delay(1, _http_error(429, {"Retry-After": "3600"})) is None
+
+
+def test_download_video_does_not_retry_permanent_failures(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_OUTPUT_ROOT", str(tmp_path))
+    calls = []
+
+    def _run_download(self, ydl_opts, link, result=None):
+        calls.append(ydl_opts["outtmpl"])
+        raise errors.pop(0)
+
+    monkeypatch.setattr(engine.MediaDownloader, "_run_download", _run_download)
+    monkeypatch.setattr(engine, "validate_media_url", lambda url: url)
+    link = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    errors = [_wrapped(yt_dlp.utils.ExtractorError("Video unavailable", expected=True))]
+    result = engine.DownloadResult(link=link)
+    assert (
+        engine.MediaDownloader(ingest_to_kg=False).download_video(link, result) is None
+    )
+    assert len(calls) == 1 and result.error == "DownloadError"
+
+    calls.clear()
+    errors = [_http_error(429), _http_error(500), _http_error(500)]
+    result = engine.DownloadResult(link=link)
+    assert (
+        engine.MediaDownloader(ingest_to_kg=False).download_video(link, result) is None
+    )
+    assert len(calls) == 3 and result.throttled
+    assert all("%(id)s" in outtmpl for outtmpl in calls[1:])
+
+
+class _BusyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    busy = 0
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        status = 503 if type(self).busy > 0 else 200
+        type(self).busy -= 1
+        body = b"busy" if status == 503 else b"metadata"
+        self.send_response(status)
+        if status == 503:
+            self.send_header("Retry-After", "5")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def busy_server(monkeypatch):
+    monkeypatch.setenv("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "127.0.0.1")
+    _BusyHandler.busy, _BusyHandler.requests = 0, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BusyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/info"
+    server.shutdown()
+    server.server_close()
+
+
+def test_metadata_requests_wait_out_retry_after(busy_server, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry.time, "sleep", sleeps.append)
+    _BusyHandler.busy = 1
+    assert safe_metadata_get(busy_server).text == "metadata"
+    assert _BusyHandler.requests == 2 and sleeps == [5]
+
+    _BusyHandler.busy, _BusyHandler.requests = 10, 0
+    with pytest.raises(requests.HTTPError):
+        safe_metadata_get(busy_server)
+    assert _BusyHandler.requests == RetryPolicy().attempts
+
+
+def test_metadata_requests_do_not_retry_missing_pages(monkeypatch):
+    calls = []
+
+    def _get(url, *, timeout, cache):
+        calls.append(url)
+        raise _http_error(404)
+
+    monkeypatch.setattr(security, "_metadata_get", _get)
+    with pytest.raises(requests.HTTPError):
+        safe_metadata_get("https://example.test/missing")
+    assert len(calls) == 1
@@ -0,0 +1,78 @@
+"""Per-host AIMD concurrency limits."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import requests
+from yt_dlp.utils import DownloadError
+
+from media_downloader.scheduling import HostScheduler, is_throttle_error, link_host
+
+
+def test_limits_grow_additively_and_shrink_multiplicatively():
+    scheduler = HostScheduler(initial=2, maximum=4, increase=1, decrease=0.5)
+    assert scheduler.try_acquire("cdn.example")
+    assert scheduler.try_acquire("cdn.example")
+    assert not scheduler.try_acquire("cdn.example")
+    # Other hosts are unaffected by a saturated one.
+    assert scheduler.try_acquire("other.example")
+
+    scheduler.release("cdn.example")
+    assert scheduler.snapshot()["cdn.example"]["limit"] == 3
+    scheduler.release("cdn.example", success=False, throttled=True)
+    state = scheduler.snapshot()["cdn.example"]
+    assert state == {"limit": 1.5, "in_flight": 0, "successes": 1, "throttles": 1}
+
+    for _ in range(5):
+        scheduler.release("cdn.example", success=False, throttled=True)
+    assert scheduler.snapshot()["cdn.example"]["limit"] == 1
+    for _ in range(10):
+        scheduler.release("cdn.example")
+    assert scheduler.snapshot()["cdn.example"]["limit"] == 4
+
+
+def test_plain_failures_release_without_changing_the_limit():
+    scheduler = HostScheduler(initial=2, maximum=4)
+    assert scheduler.try_acquire("cdn.example")
+    scheduler.release("cdn.example", success=False)
+    assert scheduler.snapshot()["cdn.example"]["limit"] == 2
+
+
+def test_acquire_waits_for_a_released_slot():
+    scheduler = HostScheduler(initial=1, maximum=1)
+    assert scheduler.try_acquire("cdn.example")
+    assert not scheduler.acquire("cdn.example", timeout=0.01)
+    threading.Timer(0.05, scheduler.release, args=("cdn.example",)).start()
+    assert scheduler.acquire("cdn.example", timeout=5)
+
+
+async def test_acquire_async_waits_on_the_loop_for_a_released_slot():
+    scheduler = HostScheduler(initial=1, maximum=1)
+    assert scheduler.try_acquire("cdn.example")
+    waiting = asyncio.ensure_future(scheduler.acquire_async("cdn.example"))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    threading.Timer(0.01, scheduler.release, args=("cdn.example",)).start()
+    await asyncio.wait_for(waiting, 5)
+    assert scheduler.snapshot()["cdn.example"]["in_flight"] == 1
+
+
+def test_throttle_signals_are_recognised():
+    response = requests.Response()
+    response.status_code = 429
+    assert is_throttle_error(requests.HTTPError(response=response))
+    assert is_throttle_error(DownloadError("ERROR: unable to download: HTTP Error 403"))
+    try:
+        raise TimeoutError("read timed out")
+    except TimeoutError as e:
+        wrapped = DownloadError("ERROR: download failed", exc_info=(type(e), e, None))
+    assert is_throttle_error(wrapped)
+    assert not is_throttle_error(DownloadError("ERROR: Video unavailable"))
+
+
+def test_link_host_is_lower_cased():
+    assert link_host(" https://CDN.Example/v?id=1\n") == "cdn.example"
+    assert link_host("not a url") == ""
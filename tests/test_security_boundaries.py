@@ -1,12 +1,15 @@
 """Adversarial source tests for media egress and output containment."""
 
 import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from media_downloader.security import (
     MediaSecurityError,
+    _metadata_session,
     resolve_output_directory,
     safe_metadata_get,
     validate_media_url,
@@ -37,15 +40,20 @@ def test_redirect_target_is_revalidated_before_second_request():
     response.headers = {"location": "http://127.0.0.1/admin"}
 
     def resolve(host, *_args, **_kwargs):
-        return _addr("93.184.216.34") if host == "public.example" else _addr("127.0.0.1")
+        return (
+            _addr("93.184.216.34") if host == "public.example" else _addr("127.0.0.1")
+        )
+
+    session = MagicMock()
+    session.get.return_value = response
 
     with (
         patch("socket.getaddrinfo", side_effect=resolve),
-        patch("media_downloader.security.requests.get", return_value=response) as get,
+        patch("media_downloader.security._metadata_session", return_value=session),
     ):
         with pytest.raises(MediaSecurityError, match="non-public"):
             safe_metadata_get("https://public.example/video")
-    get.assert_called_once()
+    session.get.assert_called_once()
 
 
 def test_output_directory_rejects_parent_and_symlink_escape(tmp_path):
@@ -59,3 +67,142 @@ def test_output_directory_rejects_parent_and_symlink_escape(tmp_path):
     (root / "link").symlink_to(outside, target_is_directory=True)
     with pytest.raises(MediaSecurityError, match="outside|symbolic"):
         resolve_output_directory("link", output_root=str(root))
+
+
+def test_resolution_cache_serves_repeat_validations():
+    with patch("socket.getaddrinfo", return_value=_addr("93.184.216.34")) as lookup:
+        for index in range(50):
+            validate_media_url(f"https://cdn.example/frag-{index}.ts")
+    lookup.assert_called_once()
+
+
+def test_cached_private_answer_stays_rejected_unless_allowlisted(monkeypatch):
+    with patch("socket.getaddrinfo", return_value=_addr("10.0.0.8")) as lookup:
+        for _ in range(2):
+            with pytest.raises(MediaSecurityError, match="non-public"):
+                validate_media_url("https://nas.example/video")
+        monkeypatch.setenv("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "nas.example")
+        assert validate_media_url("https://nas.example/video")
+        with pytest.raises(MediaSecurityError, match="non-public"):
+            validate_media_url("https://other.example/video")
+    assert lookup.call_count == 2
+
+
+def test_resolution_failures_are_cached_negatively():
+    with patch("socket.getaddrinfo", side_effect=socket.gaierror) as lookup:
+        for _ in range(3):
+            with pytest.raises(MediaSecurityError, match="could not be resolved"):
+                validate_media_url("https://missing.example/video")
+    lookup.assert_called_once()
+
+
+def test_resolution_cache_is_bounded_and_can_be_disabled(monkeypatch):
+    from media_downloader import security
+
+    monkeypatch.setenv("MEDIA_DOWNLOADER_DNS_CACHE_SIZE", "2")
+    with patch("socket.getaddrinfo", return_value=_addr("93.184.216.34")):
+        for host in ("a.example", "b.example", "c.example"):
+            validate_media_url(f"https://{host}/video")
+    assert [key[0] for key in security._RESOLUTION_CACHE] == ["b.example", "c.example"]
+
+    security.clear_resolution_cache()
+    monkeypatch.setenv("MEDIA_DOWNLOADER_DNS_CACHE_TTL", "0")
+    with patch("socket.getaddrinfo", return_value=_addr("93.184.216.34")) as lookup:
+        validate_media_url("https://a.example/video")
+        validate_media_url("https://a.example/video")
+    assert lookup.call_count == 2
+
+
+class _EchoHostHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections: list[int] = []
+
+    def setup(self):
+        super().setup()
+        self.connections.append(self.client_address[1])
+
+    def do_GET(self):
+        if self.path == "/hop":
+            self.send_response(302)
+            self.send_header("Location", "/info")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.headers.get("Host", "").encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def pinned_server(monkeypatch):
+    """A loopback server reachable as ``pinned.test`` via a patched resolver."""
+    _EchoHostHandler.connections = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHostHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("MEDIA_DOWNLOADER_ALLOW_PRIVATE_HOSTS", "pinned.test")
+    answers = {"pinned.test": "127.0.0.1"}
+    lookups = []
+    real_getaddrinfo = socket.getaddrinfo
+
+    def resolve(host, *args, **kwargs):
+        if host in answers:
+            lookups.append(host)
+            return _addr(answers[host])
+        return real_getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolve)
+    yield server.server_address[1], answers, lookups
+    server.shutdown()
+    server.server_close()
+
+
+def test_metadata_request_connects_to_the_validated_address(pinned_server):
+    port, _answers, lookups = pinned_server
+    response = safe_metadata_get(f"http://pinned.test:{port}/info")
+    assert response.text == f"pinned.test:{port}"
+    assert lookups == ["pinned.test"]
+
+
+def test_changed_dns_answer_cannot_redirect_a_validated_request(pinned_server):
+    port, answers, lookups = pinned_server
+    validate_media_url(f"http://pinned.test:{port}/info")
+    # A rebinding resolver now points elsewhere; the validated answer is reused.
+    answers["pinned.test"] = "10.0.0.1"
+    response = safe_metadata_get(f"http://pinned.test:{port}/info")
+    assert response.text == f"pinned.test:{port}"
+    assert lookups == ["pinned.test"]
+
+
+def test_pinned_connection_refuses_unvalidated_private_answer(pinned_server):
+    port, answers, _lookups = pinned_server
+    answers["loopback.test"] = "127.0.0.1"
+    session = _metadata_session()
+    with pytest.raises(MediaSecurityError, match="non-public"):
+        session.get(f"http://loopback.test:{port}/info", timeout=5)
+
+
+def test_yt_dlp_requests_use_the_pinned_transport(pinned_server):
+    port, answers, lookups = pinned_server
+    from media_downloader.media_downloader import SafeYoutubeDL
+
+    with SafeYoutubeDL({"quiet": True}) as ydl:
+        validate_media_url(f"http://pinned.test:{port}/info")
+        answers["pinned.test"] = "10.0.0.1"
+        with ydl.urlopen(f"http://pinned.test:{port}/info") as response:
+            assert response.read() == f"pinned.test:{port}".encode()
+    assert lookups == ["pinned.test"]
+
+
+def test_metadata_requests_reuse_pooled_connections(pinned_server):
+    port, _answers, _lookups = pinned_server
+    for _ in range(3):
+        response = safe_metadata_get(f"http://pinned.test:{port}/hop")
+        assert response.text == f"pinned.test:{port}"
+    # Three redirect hops and three pages over one keep-alive connection.
+    assert len(_EchoHostHandler.connections) == 1
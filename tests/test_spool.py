@@ -0,0 +1,92 @@
+"""Downloads the KG could not ingest are spooled and replayed later."""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+
+import pytest
+
+from media_downloader import kg_media
+from media_downloader.media_downloader import MediaDownloader
+from media_downloader.spool import IngestSpool, replay_spool
+
+
+@dataclass
+class _Stored:
+    asset_id: str
+    digest: str
+
+
+class _BatchStore:
+    def __init__(self):
+        self.batches = []
+
+    def store_media_batch(self, items):
+        self.batches.append([item["name"] for item in items])
+        return [
+            _Stored(f"media:{item['name']}", hashlib.sha256(item["data"]).hexdigest())
+            for item in items
+        ]
+
+
+@pytest.fixture
+def no_engine(monkeypatch):
+    monkeypatch.setattr(kg_media, "kg_stack_installed", lambda: True)
+    monkeypatch.setattr(kg_media, "_connect_media_store", lambda: None)
+    monkeypatch.setattr(kg_media, "_STORE_HANDLE", kg_media._MediaStoreHandle())
+
+
+def test_unreachable_engine_spools_the_download(no_engine, tmp_path):
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"video")
+    downloader = MediaDownloader(output_root=str(tmp_path))
+    queued = downloader._maybe_ingest(
+        str(clip),
+        {"id": "abc", "title": "Clip", "formats": [{"url": "https://cdn.test/x"}]},
+        "https://example.test/watch?v=abc",
+        digest=("d" * 64, 5),
+    )
+
+    assert queued.result(timeout=5) is None
+    (entry,) = downloader.ingest_spool.entries()
+    assert entry.path == str(clip) and entry.size_bytes == 5
+    assert entry.info == {"id": "abc", "title": "Clip"}
+    assert entry.source_url == "https://example.test"
+    assert entry.digest == "d" * 64
+
+
+def test_replay_ingests_in_batches_and_drains_the_spool(tmp_path):
+    spool = IngestSpool(tmp_path / "spool.sqlite3")
+    for name in ("a", "b", "c", "gone"):
+        (tmp_path / f"{name}.mp4").write_bytes(name.encode())
+        spool.add(str(tmp_path / f"{name}.mp4"), info={"title": name})
+    (tmp_path / "gone.mp4").unlink()
+    store = _BatchStore()
+
+    stats = replay_spool(spool, media_store=store, batch_items=2)
+
+    assert stats["replayed"] == 3 and stats["dropped"] == 1
+    assert stats["failed"] == 0 and stats["remaining"] == 0
+    assert sorted(name for batch in store.batches for name in batch) == ["a", "b", "c"]
+    assert replay_spool(spool, media_store=store)["replayed"] == 0
+
+
+def test_replay_without_an_engine_keeps_the_spool(no_engine, tmp_path):
+    spool = IngestSpool(tmp_path / "spool.sqlite3")
+    (tmp_path / "a.mp4").write_bytes(b"a")
+    spool.add(str(tmp_path / "a.mp4"))
+
+    assert replay_spool(spool)["remaining"] == 1
+
+
+def test_full_or_disabled_spool_refuses_new_files(tmp_path):
+    (tmp_path / "a.mp4").write_bytes(b"a")
+    (tmp_path / "b.mp4").write_bytes(b"b")
+    spool = IngestSpool(tmp_path / "spool.sqlite3", max_entries=1)
+    assert spool.add(str(tmp_path / "a.mp4"))
+    assert spool.add(str(tmp_path / "a.mp4"))  # re-spooling the same file
+    assert not spool.add(str(tmp_path / "b.mp4"))
+    assert not IngestSpool(tmp_path / "off.sqlite3", max_entries=0).add(
+        str(tmp_path / "a.mp4")
+    )
@@ -0,0 +1,150 @@
+"""Warm worker pool reuse and recycling."""
+
+from __future__ import annotations
+
+import operator
+import os
+import queue
+import subprocess
+import sys
+import textwrap
+import types
+from multiprocessing.pool import ThreadPool
+
+from media_downloader import workers
+from media_downloader.workers import WorkerPool, _rss_bytes
+
+
+def _double(value):
+    return value * 2
+
+
+def _run(pool, func, items):
+    done = queue.Queue()
+    for item in items:
+        pool.submit(func, item, done.put, done.put)
+    return [done.get(timeout=30) for _ in items]
+
+
+def test_worker_pool_is_reused_across_batches():
+    created = []
+
+    def _factory(processes):
+        created.append(processes)
+        return ThreadPool(processes)
+
+    pool = WorkerPool(2, pool_factory=_factory)
+    try:
+        assert sorted(_run(pool, _double, [1, 2, 3])) == [2, 4, 6]
+        assert _run(pool, _double, [4]) == [8]
+    finally:
+        pool.close()
+    assert created == [2]
+    assert pool.stats()["tasks_completed"] == 4
+    assert pool.stats()["recycles"] == 0
+
+
+def test_worker_pool_recycles_after_rss_threshold():
+    created = []
+
+    def _factory(processes):
+        created.append(processes)
+        return ThreadPool(processes)
+
+    pool = WorkerPool(1, max_rss_bytes=1, pool_factory=_factory)
+    try:
+        assert _run(pool, _double, [1]) == [2]
+        assert _run(pool, _double, [2]) == [4]
+    finally:
+        pool.close()
+    assert len(created) == 2
+    assert pool.recycles == 1
+
+
+def test_worker_pool_starts_preloaded_processes():
+    pool = WorkerPool(1, max_tasks_per_child=2)
+    try:
+        pids = _run(pool, operator.call, [os.getpid] * 3)
+    finally:
+        pool.close()
+    assert os.getpid() not in pids
+    assert _rss_bytes() > 0
+
+
+def _fake_main(monkeypatch, tmp_path, source):
+    script = tmp_path / "script.py"
+    script.write_text(textwrap.dedent(source))
+    main = types.ModuleType("__main__")
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+    return script
+
+
+def test_guarded_scripts_keep_the_forkserver(monkeypatch, tmp_path):
+    _fake_main(
+        monkeypatch,
+        tmp_path,
+        """
+        import sys
+        def main():
+            return 0
+        if __name__ == "__main__":
+            sys.exit(main())
+        """,
+    )
+    assert workers._main_is_guarded()
+    assert workers._worker_context().get_start_method() == "forkserver"
+
+
+def test_unguarded_scripts_fork_their_workers(monkeypatch, tmp_path):
+    _fake_main(
+        monkeypatch,
+        tmp_path,
+        """
+        from media_downloader import MediaDownloader
+        MediaDownloader(links=["x"]).download_all()
+        """,
+    )
+    assert not workers._main_is_guarded()
+    assert workers._worker_context().get_start_method() == "fork"
+
+
+_UNGUARDED_SCRIPT = """
+import os
+import queue
+
+from media_downloader.workers import WorkerPool
+
+
+def pid(_):
+    return os.getpid()
+
+
+print("started", flush=True)
+pool = WorkerPool(2)
+done = queue.Queue()
+for _ in range(3):
+    pool.submit(pid, None, done.put, done.put)
+print([type(done.get(timeout=20)).__name__ for _ in range(3)])
+pool.close()
+"""
+
+
+def test_unguarded_script_runs_its_batch_once(tmp_path):
+    script = tmp_path / "unguarded.py"
+    script.write_text(_UNGUARDED_SCRIPT)
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    result = subprocess.run(
+        [sys.executable, str(script)],
+        capture_output=True,
+        text=True,
+        timeout=60,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["started", "['int', 'int', 'int']"]
+
+
+def test_forkserver_preloads_only_yt_dlp():
+    # Preloading a package module would import the CLI module twice under -m.
+    assert all(name.split(".")[0] == "yt_dlp" for name in workers._PRELOAD_MODULES)